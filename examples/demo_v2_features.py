@@ -57,7 +57,7 @@ def run_demo():
         console_output=True,
     ) as logger_async:
         logger_async.info(
-            "This message was processed via a background QueueListener thread!"
+            "This message was processed on a background sink writer thread!"
         )
         logger_async.info(
             "It does not block your main event loop or thread for file/network I/O."
@@ -5,8 +5,10 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import re
 import sys
 from pathlib import Path
+from typing import Optional
 
 
 def _print_rich(msg: str) -> None:
@@ -125,9 +127,139 @@ def cmd_init(_args: argparse.Namespace) -> None:
     )
 
 
+_PROM_LINE = re.compile(r"^([a-zA-Z_:][\w:]*)(?:\{(.*)\})?\s+(\S+)$")
+_PROM_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+_PROM_ESCAPE = re.compile(r"\\(.)")
+
+
+def _unescape(match: re.Match[str]) -> str:
+    return "\n" if match.group(1) == "n" else match.group(1)
+
+
+_Sample = dict[tuple[str, tuple[tuple[str, str], ...]], float]
+
+
+def _parse_prometheus(text: str) -> _Sample:
+    """Parse Prometheus text exposition into ``{(name, labels): value}``."""
+    samples: _Sample = {}
+    for line in text.splitlines():
+        match = _PROM_LINE.match(line)
+        if match is None:
+            continue
+        name, raw_labels, value = match.groups()
+        labels = tuple(
+            sorted(
+                (k, _PROM_ESCAPE.sub(_unescape, v))
+                for k, v in _PROM_LABEL.findall(raw_labels or "")
+            )
+        )
+        try:
+            samples[(name, labels)] = float(value)
+        except ValueError:
+            continue
+    return samples
+
+
+def _render_live(
+    url: str, cur: _Sample, prev: Optional[_Sample], elapsed: float
+) -> None:
+    def by(name: str, label: str, sample: _Sample) -> dict[str, float]:
+        return {
+            dict(labels).get(label, ""): value
+            for (n, labels), value in sample.items()
+            if n == name
+        }
+
+    def rate(name: str, label: str, key: str) -> str:
+        if prev is None or elapsed <= 0:
+            return "-"
+        delta = by(name, label, cur).get(key, 0.0) - by(name, label, prev).get(key, 0.0)
+        return f"{delta / elapsed:.1f}"
+
+    quantiles: dict[str, float] = {}
+    for (name, labels), value in cur.items():
+        lab = dict(labels)
+        if name == "fastlogger_timer_milliseconds" and lab.get("quantile") == "0.99":
+            quantiles[lab.get("name", "")] = value
+
+    def p99(metric: str) -> str:
+        return f"{quantiles[metric]:.3f}ms" if metric in quantiles else "-"
+
+    _print_rich(f"\n[bold cyan]Live pipeline stats: {url}[/bold cyan]\n")
+    levels: dict[str, float] = {}
+    for (name, labels), value in cur.items():
+        if name == "fastlogger_records_total":
+            level = dict(labels).get("level", "?")
+            levels[level] = levels.get(level, 0.0) + value
+    for level in ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]:
+        if level in levels:
+            per_s = rate("fastlogger_records_total", "level", level)
+            _print_rich(f"  {level:<10} {int(levels[level]):>10} records  {per_s}/s")
+
+    records = by("fastlogger_sink_records_total", "sink", cur)
+    if records:
+        nbytes = by("fastlogger_sink_bytes_total", "sink", cur)
+        _print_rich(
+            f"\n  {'sink':<24}{'records':>10}{'rec/s':>9}{'KiB':>10}"
+            f"{'format p99':>13}{'emit p99':>12}{'flush p99':>12}"
+        )
+        for sink in sorted(records):
+            _print_rich(
+                f"  {sink:<24}{int(records[sink]):>10}"
+                f"{rate('fastlogger_sink_records_total', 'sink', sink):>9}"
+                f"{nbytes.get(sink, 0.0) / 1024:>10.1f}"
+                f"{p99('pipeline.format.' + sink):>13}"
+                f"{p99('pipeline.emit.' + sink):>12}"
+                f"{p99('pipeline.flush.' + sink):>12}"
+            )
+    depth = by("fastlogger_queue_depth", "logger", cur)
+    high = by("fastlogger_queue_high_water", "logger", cur)
+    for name in sorted(depth):
+        _print_rich(
+            f"\n  queue {name}: depth={int(depth[name])} "
+            f"high-water={int(high.get(name, 0))}"
+        )
+    _print_rich(f"\n  preprocess p99 {p99('pipeline.preprocess')}")
+
+
+def _stats_live(args: argparse.Namespace) -> None:
+    """Poll a ``logger.metrics.serve()`` endpoint and redraw pipeline stats."""
+    import time
+    import urllib.request
+
+    prev: Optional[_Sample] = None
+    last = time.monotonic()
+    polls = 0
+    while True:
+        try:
+            with urllib.request.urlopen(args.url, timeout=5) as resp:
+                cur = _parse_prometheus(resp.read().decode("utf-8"))
+        except OSError as exc:
+            _print_rich(f"[red]Error: cannot read {args.url}: {exc}[/red]")
+            sys.exit(1)
+        now = time.monotonic()
+        if sys.stdout.isatty():
+            print("\033[2J\033[H", end="")
+        _render_live(args.url, cur, prev, now - last)
+        prev, last = cur, now
+        polls += 1
+        if args.count and polls >= args.count:
+            return
+        try:
+            time.sleep(args.interval)
+        except KeyboardInterrupt:
+            return
+
+
 def cmd_stats(args: argparse.Namespace) -> None:
     """Show log level counts and top messages from a .fl or .log file."""
+    if getattr(args, "live", False):
+        _stats_live(args)
+        return
     filepath = args.file
+    if filepath is None:
+        _print_rich("[red]Error: pass a log file, or --live to poll metrics.[/red]")
+        sys.exit(1)
     if not os.path.exists(filepath):
         _print_rich(f"[red]Error: File '{filepath}' not found.[/red]")
         sys.exit(1)
@@ -261,11 +393,62 @@ def cmd_timeline(args: argparse.Namespace) -> None:
         sys.exit(1)
 
 
-def cmd_benchmark(_args: argparse.Namespace) -> None:
-    """Run a microbenchmark comparing fast-logger vs logging vs loguru."""
-    import timeit
+def cmd_flame(args: argparse.Namespace) -> None:
+    """Build a flamegraph from a JSON log, .fl session or collapsed file."""
+    from .flame import read_stacks, write_flamegraph
 
-    _print_rich("\n[bold cyan]FastLogger Benchmark[/bold cyan]\n")
+    try:
+        with open(args.file, "r", encoding="utf-8") as f:
+            stacks = read_stacks(f)
+    except FileNotFoundError:
+        _print_rich(f"[red]Error: '{args.file}' not found.[/red]")
+        sys.exit(1)
+    if not stacks:
+        _print_rich(
+            "[yellow]No call stacks found. Enable logger.record_calls() "
+            "and log as JSON.[/yellow]"
+        )
+        sys.exit(1)
+    if args.output == "-":
+        for stack, value in sorted(stacks.items(), key=lambda kv: -kv[1]):
+            print(f"{stack} {value}")
+        return
+    output = args.output or str(
+        Path(args.file).with_suffix(".svg" if args.svg else ".collapsed")
+    )
+    if output == args.file:
+        output += ".svg" if args.svg else ".collapsed"
+    write_flamegraph(stacks, output, title=args.title or "", unit=args.unit)
+    _print_rich(f"[green]Wrote {len(stacks)} stacks to {output}[/green]")
+
+
+def cmd_requests(args: argparse.Namespace) -> None:
+    """Rank the slowest requests of a JSON log and show their waterfalls."""
+    from .waterfall import analyze_file, format_report
+
+    try:
+        report = analyze_file(
+            args.file,
+            top=args.top,
+            max_open=args.max_open,
+            idle_s=args.idle,
+            spill_dir=args.spill_dir,
+        )
+    except FileNotFoundError:
+        _print_rich(f"[red]Error: '{args.file}' not found.[/red]")
+        sys.exit(1)
+    if not report.requests:
+        _print_rich(
+            "[yellow]No records with a correlation_id found "
+            "(requests are grouped from JSON logs).[/yellow]"
+        )
+        return
+    print(format_report(report, waterfalls=args.waterfalls))
+
+
+def _bench_logging() -> None:
+    """Compare fast-logger vs logging vs loguru for plain debug() calls."""
+    import timeit
 
     results = []
 
@@ -319,6 +502,321 @@ _lu.add(os.path.join(_tmpdir, 'bench.log'), level='DEBUG', enqueue=False)
         _print_rich(
             f"  [cyan]{name:<20}[/cyan]  [green]{per_call_us:>6.2f}µs[/green]  [dim]{bar}[/dim]"
         )
+
+
+def _print_overhead(label: str, results: list[tuple[str, float]], number: int) -> None:
+    """Print per-call timings followed by the overhead relative to the first entry."""
+    _print_rich(f"  {label}:\n")
+    baseline = results[0][1]
+    for name, elapsed in results:
+        per_call_us = (elapsed / number) * 1_000_000
+        extra = (elapsed - baseline) / number * 1_000_000
+        note = "" if elapsed is baseline else f"  [dim](+{extra:.2f}µs)[/dim]"
+        _print_rich(
+            f"  [cyan]{name:<28}[/cyan]  [green]{per_call_us:>7.2f}µs[/green]{note}"
+        )
+
+
+def _bench_dbapi() -> None:
+    """Per-query overhead of the DB-API plugin on an in-memory sqlite3 database."""
+    import timeit
+
+    number = 20_000
+    setup = """
+import sqlite3, tempfile
+from fast_logger import FastLogger
+_logger = FastLogger('bench_dbapi', base_path=tempfile.mkdtemp(), console_output=False)
+_raw = sqlite3.connect(':memory:').cursor()
+_inst = _logger.patch_dbapi(sqlite3.connect(':memory:'), sample_rate=0.0).cursor()
+"""
+    stmt = "{}.execute('SELECT ?', (1,)).fetchall()"
+    results = [
+        ("sqlite3 (raw)", timeit.timeit(stmt.format("_raw"), setup, number=number)),
+        (
+            "sqlite3 + dbapi plugin",
+            timeit.timeit(stmt.format("_inst"), setup, number=number),
+        ),
+    ]
+    _print_overhead(f"{number:,} execute()+fetchall() calls", results, number)
+
+
+def _bench_wsgi() -> None:
+    """Per-request overhead of the WSGI middleware, driven by an in-process client."""
+    import timeit
+
+    number = 20_000
+    setup = """
+import tempfile
+from wsgiref.util import setup_testing_defaults
+from fast_logger import FastLogger
+_logger = FastLogger('bench_wsgi', base_path=tempfile.mkdtemp(), console_output=False)
+
+def app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'hello ', b'world']
+
+def client(wsgi_app):
+    environ = {}
+    setup_testing_defaults(environ)
+    body = wsgi_app(environ, lambda status, headers, exc_info=None: None)
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+
+_sampled = _logger.patch_wsgi(app, sample_2xx=0.0)
+_logged = _logger.patch_wsgi(app)
+"""
+    results = [
+        ("bare WSGI app", timeit.timeit("client(app)", setup, number=number)),
+        (
+            "middleware, 2xx sampled out",
+            timeit.timeit("client(_sampled)", setup, number=number),
+        ),
+        (
+            "middleware, every request",
+            timeit.timeit("client(_logged)", setup, number=number),
+        ),
+    ]
+    _print_overhead(f"{number:,} requests", results, number)
+
+
+def _bench_trace() -> None:
+    """Per-call overhead of ``@trace`` when its lines are suppressed."""
+    import timeit
+
+    number = 200_000
+    setup = """
+import tempfile
+from fast_logger import FastLogger
+_logger = FastLogger('bench_trace', base_path=tempfile.mkdtemp(), console_output=False)
+
+def plain(x, y=1):
+    return x + y
+
+disabled = _logger.trace(plain)
+unsampled = _logger.trace(plain, level='INFO', sample_rate=0.0)
+"""
+    stmt = "{}(1, y=2)"
+    results = [
+        ("plain function", timeit.timeit(stmt.format("plain"), setup, number=number)),
+        (
+            "@trace, DEBUG disabled",
+            timeit.timeit(stmt.format("disabled"), setup, number=number),
+        ),
+        (
+            "@trace, sample_rate=0",
+            timeit.timeit(stmt.format("unsampled"), setup, number=number),
+        ),
+    ]
+    _print_overhead(f"{number:,} calls", results, number)
+
+
+def _bench_spans() -> None:
+    """Per-span cost of the built-in tracer, sampled and unsampled."""
+    import timeit
+
+    number = 200_000
+    setup = """
+import tempfile
+from fast_logger import FastLogger
+_logger = FastLogger('bench_spans', base_path=tempfile.mkdtemp(), console_output=False)
+_logger.enable_tracing(sample_rate=0.0, capacity=1000)
+_sampled = FastLogger('bench_spans', base_path=tempfile.mkdtemp(), console_output=False)
+_sampled.enable_tracing(sample_rate=1.0, capacity=1000)
+"""
+    results = [
+        ("no span", timeit.timeit("pass", setup, number=number)),
+        (
+            "span, unsampled",
+            timeit.timeit("with _logger.span('op'): pass", setup, number=number),
+        ),
+        (
+            "span, sampled",
+            timeit.timeit("with _sampled.span('op'): pass", setup, number=number),
+        ),
+    ]
+    _print_overhead(f"{number:,} spans", results, number)
+
+
+def _bench_context() -> None:
+    """Per-submission cost of carrying the logging context into executors."""
+    import pickle
+    import timeit
+
+    number = 100_000
+    setup = """
+from concurrent.futures import Executor, Future
+from fast_logger.context import ContextExecutor, _call_in_context, snapshot
+from fast_logger.fastapi import request_id_ctx_var
+request_id_ctx_var.set('9f1c2a7e')
+
+class Inline(Executor):
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+_plain = Inline()
+_carried = ContextExecutor(_plain)
+_fn = lambda: None
+"""
+    results = [
+        ("submit", timeit.timeit("_plain.submit(_fn)", setup, number=number)),
+        (
+            "submit, thread context",
+            timeit.timeit("_carried.submit(_fn)", setup, number=number),
+        ),
+        (
+            "submit, process snapshot",
+            timeit.timeit(
+                "_plain.submit(_call_in_context, snapshot(), _fn, (), {})",
+                setup,
+                number=number,
+            ),
+        ),
+    ]
+    _print_overhead(f"{number:,} submissions (inline executor)", results, number)
+
+    from .context import snapshot
+    from .fastapi import request_id_ctx_var
+
+    token = request_id_ctx_var.set("9f1c2a7e")
+    try:
+        size = len(pickle.dumps(snapshot()))
+    finally:
+        request_id_ctx_var.reset(token)
+    _print_rich(f"\n  Pickled snapshot for process pools: {size} bytes")
+
+    number = 20_000
+    setup = """
+import tempfile
+from fast_logger import FastLogger
+_fields = {f'field{i}': f'value{i}' for i in range(10)}
+_logger = FastLogger('bench_ctx', base_path=tempfile.mkdtemp(), console_output=False,
+                     json_format=True)
+_bound = _logger.bind(**_fields)
+"""
+    scoped = setup + "_logger.contextualize(**_fields).__enter__()\n"
+    results = [
+        ("info()", timeit.timeit("_logger.info('m')", setup, number=number)),
+        (
+            "info(), 10 bound fields",
+            timeit.timeit("_bound.info('m')", setup, number=number),
+        ),
+        (
+            "info(), 10 scope fields",
+            timeit.timeit("_logger.info('m')", scoped, number=number),
+        ),
+    ]
+    _print_rich("")
+    _print_overhead(f"{number:,} JSON records", results, number)
+
+
+def _bench_routing() -> None:
+    """Caller-side cost per record: one handler per sink vs the sink router."""
+    import timeit
+
+    number = 20_000
+    setup = """
+import logging, os, tempfile
+from fast_logger import JsonFormatter
+from fast_logger.routing import FileWriter, Route, Router, Sink
+_dir = tempfile.mkdtemp()
+
+def _logger(name, handlers):
+    logger = logging.getLogger(name)
+    logger.handlers[:] = handlers
+    logger.propagate = False
+    return logger
+
+def _file(name):
+    handler = logging.FileHandler(os.path.join(_dir, name))
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+_router = Router({'json': JsonFormatter()})
+for i in range(3):
+    _router.add_sink(Sink(f's{i}', FileWriter(os.path.join(_dir, f's{i}.log')), 'json'))
+_router.add_route(Route(('s0', 's1', 's2')))
+_none = _logger('bench_route_none', [logging.NullHandler()])
+_one = _logger('bench_route_one', [_file('one.log')])
+_three = _logger('bench_route_three', [_file(f'h{i}.log') for i in range(3)])
+_routed = _logger('bench_route_router', [_router])
+"""
+    stmt = "{}.warning('m')"
+    results = [
+        ("NullHandler", timeit.timeit(stmt.format("_none"), setup, number=number)),
+        (
+            "1 JSON FileHandler",
+            timeit.timeit(stmt.format("_one"), setup, number=number),
+        ),
+        (
+            "3 JSON FileHandlers",
+            timeit.timeit(stmt.format("_three"), setup, number=number),
+        ),
+        (
+            "router, 3 JSON sinks",
+            timeit.timeit(stmt.format("_routed"), setup, number=number),
+        ),
+    ]
+    _print_overhead(f"{number:,} records", results, number)
+
+    import tempfile
+
+    from . import FastLogger
+
+    logger = FastLogger(
+        "bench_route_lanes",
+        base_path=tempfile.mkdtemp(),
+        console_output=False,
+        async_safe=True,
+        sink_queue_size=100_000,
+    )
+    for i in range(number):
+        logger.info("backlog %d", i)
+    (sink,) = logger.sink_router().sinks.values()
+    backlog = sink.pending()
+    logger.error("overtakes the backlog")
+    logger.stop()
+    lag = logger.metrics.snapshot()[f"sink.lag.{sink.name}.priority"]
+    _print_rich(
+        f"\n  async_safe ERROR behind {backlog:,} queued INFO records: "
+        f"written after {lag['max']:.2f}ms"
+    )
+
+    setup = """
+import tempfile
+from fast_logger import FastLogger
+_logger = FastLogger('bench_route_shed', base_path=tempfile.mkdtemp(),
+                     console_output=False, json_format=True, level='INFO')
+_bound = _logger.bind(**{f'field{i}': i for i in range(10)})
+"""
+    results = [
+        ("debug(), shed", timeit.timeit("_bound.debug('m')", setup, number=number)),
+        ("info(), written", timeit.timeit("_bound.info('m')", setup, number=number)),
+    ]
+    _print_rich("")
+    _print_overhead(f"{number:,} records, 10 bound fields, level INFO", results, number)
+
+
+_BENCH_SUITES = {
+    "logging": _bench_logging,
+    "dbapi": _bench_dbapi,
+    "wsgi": _bench_wsgi,
+    "trace": _bench_trace,
+    "spans": _bench_spans,
+    "context": _bench_context,
+    "routing": _bench_routing,
+}
+
+
+def cmd_benchmark(args: argparse.Namespace) -> None:
+    """Run a microbenchmark suite (default: fast-logger vs logging vs loguru)."""
+    _print_rich("\n[bold cyan]FastLogger Benchmark[/bold cyan]\n")
+    _BENCH_SUITES[getattr(args, "suite", "logging")]()
     _print_rich("")
 
 
@@ -341,7 +839,23 @@ def main() -> None:
     stats_p = subparsers.add_parser(
         "stats", help="Show log level counts from a .fl or .log file"
     )
-    stats_p.add_argument("file", help="Log or session file to analyse")
+    stats_p.add_argument("file", nargs="?", help="Log or session file to analyse")
+    stats_p.add_argument(
+        "--live",
+        action="store_true",
+        help="Poll a running logger's metrics endpoint (logger.metrics.serve())",
+    )
+    stats_p.add_argument(
+        "--url",
+        default="http://127.0.0.1:9464/metrics",
+        help="Metrics endpoint for --live (default: %(default)s)",
+    )
+    stats_p.add_argument(
+        "--interval", type=float, default=1.0, help="Seconds between --live polls"
+    )
+    stats_p.add_argument(
+        "--count", type=int, default=0, help="Stop after N polls (default: forever)"
+    )
 
     # tail
     tail_p = subparsers.add_parser("tail", help="Tail a log file in real-time")
@@ -366,10 +880,69 @@ def main() -> None:
     )
     timeline_p.add_argument("file", help="Session file (.fl) to render")
 
+    # flame
+    flame_p = subparsers.add_parser(
+        "flame", help="Flamegraph of @trace/timer calls (collapsed or SVG)"
+    )
+    flame_p.add_argument(
+        "file", help="JSON log, .fl session or .collapsed file to aggregate"
+    )
+    flame_p.add_argument(
+        "-o",
+        "--output",
+        help="Output path; .svg renders SVG, '-' prints collapsed stacks",
+    )
+    flame_p.add_argument(
+        "--svg", action="store_true", help="Render SVG when no --output is given"
+    )
+    flame_p.add_argument("--title", help="SVG title (default: output file name)")
+    flame_p.add_argument(
+        "--unit",
+        default="us",
+        help="Unit of the stack values shown in tooltips (default: us)",
+    )
+
+    # requests
+    requests_p = subparsers.add_parser(
+        "requests", help="Slowest requests and per-request waterfalls from a log"
+    )
+    requests_p.add_argument("file", help="JSON log or .fl session to analyse")
+    requests_p.add_argument(
+        "--top", type=int, default=10, help="Slowest requests to list (default: 10)"
+    )
+    requests_p.add_argument(
+        "--waterfalls",
+        type=int,
+        default=3,
+        help="Waterfalls to draw for the slowest requests (default: 3)",
+    )
+    requests_p.add_argument(
+        "--max-open",
+        type=int,
+        default=10_000,
+        help="Active requests kept in memory before spilling (default: 10000)",
+    )
+    requests_p.add_argument(
+        "--idle",
+        type=float,
+        default=300.0,
+        help="Seconds of log time after which a quiet request is closed",
+    )
+    requests_p.add_argument(
+        "--spill-dir", help="Directory for spill files (default: system temp)"
+    )
+
     # benchmark
-    subparsers.add_parser(
+    bench_p = subparsers.add_parser(
         "benchmark", help="Microbenchmark fast-logger vs logging vs loguru"
     )
+    bench_p.add_argument(
+        "suite",
+        nargs="?",
+        default="logging",
+        choices=sorted(_BENCH_SUITES),
+        help="Benchmark suite to run (default: logging)",
+    )
 
     args = parser.parse_args()
 
@@ -381,6 +954,8 @@ def main() -> None:
         "replay": cmd_replay,
         "ui": cmd_ui,
         "timeline": cmd_timeline,
+        "flame": cmd_flame,
+        "requests": cmd_requests,
         "benchmark": cmd_benchmark,
     }
 
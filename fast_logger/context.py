@@ -0,0 +1,310 @@
+"""
+fast_logger.context
+~~~~~~~~~~~~~~~~~~~
+Carry the logging context across executors and process boundaries.
+
+The correlation id (``request_id_ctx_var``) and any other registered
+context variable live in :mod:`contextvars`. asyncio tasks copy them
+automatically, but ``ThreadPoolExecutor.submit`` and
+``loop.run_in_executor`` do not. Worker processes start with nothing.
+
+* :class:`ContextExecutor` wraps any executor. For threads each task runs
+  in a copy of the submitting context; ``copy_context()`` is O(1), so that
+  is also the cheapest option. For processes a :class:`LogContext`
+  snapshot travels with the task.
+* :func:`run_in_executor` is a drop-in for ``loop.run_in_executor``.
+* :func:`initializer` installs a snapshot once per worker process, for
+  ``ProcessPoolExecutor(initializer=..., initargs=(snapshot(),))``.
+
+A :class:`LogContext` holds only the variables that are actually set, as a
+tuple of ``(name, value)`` pairs, and pickles as exactly that tuple.
+
+:func:`contextualize` scopes are kept here too. Each scope is a
+:class:`ContextNode` pointing at the enclosing one, so entering a scope is
+one allocation and one ``ContextVar.set`` with no dict copy. The merged
+fields, their ``k=v`` text and their JSON fragment are built the first time a
+record is logged in the scope and then reused by every later record.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import json
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from contextvars import ContextVar, copy_context
+from functools import partial, wraps
+from typing import Any, Callable, Optional
+
+from .fastapi import request_id_ctx_var
+
+_carried: dict[str, ContextVar[Any]] = {}
+
+
+def carry(var: ContextVar[Any]) -> ContextVar[Any]:
+    """Register ``var`` so snapshots include it; returns ``var``.
+
+    Variables are matched by ``var.name`` in the receiving process, so the
+    name must be unique and the module defining it importable there.
+    """
+    _carried[var.name] = var
+    return var
+
+
+carry(request_id_ctx_var)
+
+
+class LogContext:
+    """Immutable snapshot of the carried context variables."""
+
+    __slots__ = ("items",)
+
+    items: tuple[tuple[str, Any], ...]
+
+    def __init__(self, items: tuple[tuple[str, Any], ...] = ()) -> None:
+        object.__setattr__(self, "items", items)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("LogContext is immutable")
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (LogContext, (self.items,))
+
+    def get(self, name: str, default: Any = None) -> Any:
+        for key, value in self.items:
+            if key == name:
+                return value
+        return default
+
+    def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call ``func`` with this context applied, restoring the previous one."""
+        tokens = []
+        for name, value in self.items:
+            var = _carried.get(name)
+            if var is not None:
+                tokens.append((var, var.set(value)))
+        try:
+            return func(*args, **kwargs)
+        finally:
+            for var, token in reversed(tokens):
+                var.reset(token)
+
+    def install(self) -> None:
+        """Apply this context to the current context for good."""
+        for name, value in self.items:
+            var = _carried.get(name)
+            if var is not None:
+                var.set(value)
+
+    def __bool__(self) -> bool:
+        return bool(self.items)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, LogContext) and other.items == self.items
+
+    def __hash__(self) -> int:
+        return hash(self.items)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in self.items)
+        return f"LogContext({fields})"
+
+
+def snapshot() -> LogContext:
+    """Capture the carried variables that are set in the current context."""
+    ctx = copy_context()
+    return LogContext(
+        tuple((name, ctx[var]) for name, var in _carried.items() if var in ctx)
+    )
+
+
+def _call_in_context(
+    context: LogContext,
+    func: Callable[..., Any],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+) -> Any:
+    return context.run(func, *args, **kwargs)
+
+
+def initializer(
+    context: LogContext, func: Optional[Callable[..., Any]] = None, *args: Any
+) -> None:
+    """Process-pool initializer: install ``context``, then call ``func(*args)``."""
+    context.install()
+    if func is not None:
+        func(*args)
+
+
+class ContextExecutor(Executor):
+    """Executor wrapper that runs every task in the submitter's logging context.
+
+    ``loop.run_in_executor(ContextExecutor(pool), ...)`` works too, since
+    the loop submits through :meth:`submit`.
+    """
+
+    def __init__(self, executor: Executor) -> None:
+        self.executor = executor
+        self._processes = isinstance(executor, ProcessPoolExecutor)
+
+    def submit(
+        self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any
+    ) -> Future[Any]:
+        if self._processes:
+            return self.executor.submit(_call_in_context, snapshot(), fn, args, kwargs)
+        return self.executor.submit(copy_context().run, fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        self.executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.executor, name)
+
+
+def run_in_executor(
+    executor: Optional[Executor], func: Callable[..., Any], *args: Any
+) -> asyncio.Future[Any]:
+    """``loop.run_in_executor`` on the running loop, keeping the logging context."""
+    loop = asyncio.get_running_loop()
+    if isinstance(executor, ContextExecutor):
+        return loop.run_in_executor(executor, func, *args)
+    if isinstance(executor, ProcessPoolExecutor):
+        call = partial(_call_in_context, snapshot(), func, args, {})
+        return loop.run_in_executor(executor, call)
+    return loop.run_in_executor(executor, copy_context().run, func, *args)
+
+
+# ---------------------------------------------------------------------------
+# contextualize()
+# ---------------------------------------------------------------------------
+
+
+class ContextNode:
+    """One :func:`contextualize` scope: its own fields and the enclosing scope."""
+
+    __slots__ = ("fields", "parent", "_merged", "_text", "_json")
+
+    def __init__(self, fields: dict[str, Any], parent: Optional["ContextNode"]) -> None:
+        self.fields = fields
+        self.parent = parent
+        self._merged: Optional[dict[str, Any]] = None
+        self._text: Optional[str] = None
+        self._json: Optional[str] = None
+
+    @property
+    def merged(self) -> dict[str, Any]:
+        """All fields in scope, inner scopes winning; built once per node."""
+        merged = self._merged
+        if merged is None:
+            parent = self.parent
+            merged = {**parent.merged, **self.fields} if parent else self.fields
+            self._merged = merged
+        return merged
+
+    @property
+    def text(self) -> str:
+        """``  k=v`` lines, as text-mode records append them."""
+        text = self._text
+        if text is None:
+            text = self._text = "\n".join(f"  {k}={v}" for k, v in self.merged.items())
+        return text
+
+    @property
+    def json_fragment(self) -> str:
+        """The merged fields as JSON object members, without the braces."""
+        fragment = self._json
+        if fragment is None:
+            fragment = json.dumps(self.merged, ensure_ascii=False, default=str)[1:-1]
+            self._json = fragment
+        return fragment
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (ContextNode, (self.merged, None))
+
+    def __repr__(self) -> str:
+        return f"ContextNode({self.merged!r})"
+
+
+_scope: ContextVar[Optional[ContextNode]] = carry(
+    ContextVar("fast_logger_context", default=None)
+)
+
+
+def current_scope() -> Optional[ContextNode]:
+    """The innermost :func:`contextualize` scope, if any."""
+    return _scope.get()
+
+
+def current_fields() -> dict[str, Any]:
+    """Fields added by the enclosing :func:`contextualize` scopes."""
+    node = _scope.get()
+    return dict(node.merged) if node is not None else {}
+
+
+# Reset tokens of the open ``with contextualize()`` blocks in this context,
+# innermost first, as ``([scope_token, stack_token], outer)`` links. Both
+# variables are reset on exit, so closed scopes leave nothing behind.
+_open_scopes: ContextVar[Optional[tuple[list[Any], Any]]] = ContextVar(
+    "fast_logger_open_scopes", default=None
+)
+
+
+class Contextualize:
+    """Context manager and decorator returned by :func:`contextualize`.
+
+    One instance may be entered from several threads or tasks at once: the
+    reset tokens are kept per context, not on the instance.
+    """
+
+    __slots__ = ("fields",)
+
+    def __init__(self, fields: dict[str, Any]) -> None:
+        self.fields = fields
+
+    def __enter__(self) -> ContextNode:
+        node = ContextNode(self.fields, _scope.get())
+        tokens = [_scope.set(node), None]
+        tokens[1] = _open_scopes.set((tokens, _open_scopes.get()))
+        return node
+
+    def __exit__(self, *exc: Any) -> None:
+        link = _open_scopes.get()
+        assert link is not None, "contextualize() exited without being entered"
+        scope_token, stack_token = link[0]
+        _open_scopes.reset(stack_token)
+        _scope.reset(scope_token)
+
+    def __call__(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        fields = self.fields
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                token = _scope.set(ContextNode(fields, _scope.get()))
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _scope.reset(token)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            token = _scope.set(ContextNode(fields, _scope.get()))
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _scope.reset(token)
+
+        return wrapper
+
+
+def contextualize(**fields: Any) -> Contextualize:
+    """Add ``fields`` to every record logged in the scope, by any logger.
+
+    Use it as ``with contextualize(user_id=42):`` or as a decorator on sync
+    and ``async def`` functions. Scopes nest; inner fields win. Fields passed
+    at the call site or through ``bind()`` take precedence.
+    """
+    return Contextualize(fields)
@@ -18,9 +18,8 @@ import os
 from contextlib import contextmanager
 from datetime import datetime, timezone
 from functools import wraps
-from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from logging.handlers import QueueHandler, RotatingFileHandler
 from pathlib import Path
-from queue import Queue
 from typing import Any, Callable, Optional, Union, Generator
 
 try:
@@ -33,8 +32,13 @@ try:
 except ImportError:
     RICH_AVAILABLE = False
 
+from .context import ContextNode, Contextualize, contextualize
+from .context import _scope as _context_scope
 from .formatters import format_sql, format_json, format_http
-from .masking import mask_secrets_in_string
+from .masking import mask_dict, mask_secrets_in_string
+from .metrics import MetricsRegistry
+from .pipeline import PipelineInstrumentation
+from .spans import Tracer
 from .sysinfo import get_system_info
 
 try:
@@ -45,6 +49,22 @@ except ImportError:
     HAS_CONTEXT_VAR = False
 
 
+# Level of each FastLogger level method, checked before a record is prepared.
+_METHOD_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "exception": logging.ERROR,
+    "critical": logging.CRITICAL,
+    "warn": logging.WARNING,
+    "fatal": logging.CRITICAL,
+}
+
+# Structured fields read only from JSON output (timeline() blocks); text
+# records keep them on the record but leave them out of the k=v lines.
+_JSON_ONLY_FIELDS = frozenset({"timeline"})
+
 # ---------------------------------------------------------------------------
 # ANSI color codes (no third-party deps)
 # ---------------------------------------------------------------------------
@@ -74,6 +94,37 @@ class ColorFormatter(logging.Formatter):
         return f"{color}{formatted}{_RESET}"
 
 
+# ---------------------------------------------------------------------------
+# Record counting
+# ---------------------------------------------------------------------------
+
+
+class RecordCounter(logging.Filter):
+    """Logger filter counting emitted records per level in a MetricsRegistry.
+
+    Logger-level filters run once per record that passes the level check,
+    before any handler, so each record is counted exactly once.
+    """
+
+    def __init__(self, registry: MetricsRegistry, logger_name: str) -> None:
+        super().__init__()
+        self.registry = registry
+        self.logger_name = logger_name
+        self._counters: dict[int, Any] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        counter = self._counters.get(record.levelno)
+        if counter is None:
+            counter = self._counters[record.levelno] = self.registry.counter(
+                "fastlogger_records_total",
+                "Log records emitted, by logger and level.",
+                logger=self.logger_name,
+                level=record.levelname,
+            )
+        counter.inc()
+        return True
+
+
 # ---------------------------------------------------------------------------
 # JSON formatter
 # ---------------------------------------------------------------------------
@@ -97,6 +148,11 @@ class JsonFormatter(logging.Formatter):
             "line": record.lineno,
             "message": record.getMessage(),
         }
+        # Text-mode loggers append "k=v" lines to the message; JSON sinks
+        # routed from them already carry those fields as members.
+        suffix = record.__dict__.get("fl_suffix")
+        if suffix:
+            payload["message"] = payload["message"][:-suffix]
 
         if record.exc_info:
             payload["exc_info"] = self.formatException(record.exc_info)
@@ -128,7 +184,10 @@ class JsonFormatter(logging.Formatter):
                 "exc_text",
                 "stack_info",
                 "message",
+                "asctime",
                 "taskName",
+                "fl_context",
+                "fl_suffix",
             }:
                 try:
                     json.dumps(value)  # only include JSON-serialisable extras
@@ -136,6 +195,16 @@ class JsonFormatter(logging.Formatter):
                 except (TypeError, ValueError):
                     payload[key] = str(value)
 
+        scope = getattr(record, "fl_context", None)
+        if scope is not None and scope.merged:
+            if scope.merged.keys().isdisjoint(payload):
+                # Splice the scope's cached JSON members in.
+                text = json.dumps(payload, ensure_ascii=False)
+                return f"{text[:-1]}, {scope.json_fragment}}}"
+            for key, value in scope.merged.items():
+                payload.setdefault(key, value)
+            return json.dumps(payload, ensure_ascii=False, default=str)
+
         return json.dumps(payload, ensure_ascii=False)
 
 
@@ -173,10 +242,18 @@ class FastLogger:
         compress_backups: bool = False,
         pretty_exceptions: bool = True,
         theme: str = "default",
+        # --- metrics ---
+        metrics_interval_s: Optional[float] = None,
+        # --- sinks ---
+        sink_queue_size: int = 10_000,
+        sink_overflow: str = "block",
         # Internal params for context binding
         _existing_logger: Optional[logging.Logger] = None,
         _bound_kwargs: Optional[dict[str, Any]] = None,
-        _listener: Optional[QueueListener] = None,
+        _trace_sites: Optional[dict[str, Any]] = None,
+        _metrics: Optional[MetricsRegistry] = None,
+        _pipeline: Optional[PipelineInstrumentation] = None,
+        _tracer: Optional[Tracer] = None,
     ):
         self.name = name
         self.level = self._parse_level(level)
@@ -192,6 +269,9 @@ class FastLogger:
         self.compress_backups = compress_backups
         self.pretty_exceptions = pretty_exceptions
         self.theme_name = theme
+        self.metrics_interval_s = metrics_interval_s
+        self.sink_queue_size = sink_queue_size
+        self.sink_overflow = sink_overflow
 
         from .themes import get_theme
 
@@ -201,6 +281,16 @@ class FastLogger:
             install_rich_traceback(show_locals=True)
 
         self._bound_kwargs = _bound_kwargs or {}
+        # Bound fields never change, so their text and JSON are built once;
+        # _context_cache pairs the last contextualize() scope seen with the
+        # node combining it with the bound fields.
+        self._bound_node: Optional[ContextNode] = (
+            ContextNode(self._bound_kwargs, None) if self._bound_kwargs else None
+        )
+        self._context_cache: tuple[Optional[ContextNode], Optional[ContextNode]] = (
+            None,
+            self._bound_node,
+        )
 
         # The base logging string, including some extra diagnostic info
         # (funcName, threadName, process) for debugging.
@@ -210,8 +300,28 @@ class FastLogger:
         )
 
         self._logger: Optional[logging.Logger] = None
-        self._queue: Optional[Queue[Any]] = None
-        self._listener: Optional[QueueListener] = _listener
+        self._queue: Any = None
+        self._trace_sites: dict[str, Any] = (
+            _trace_sites if _trace_sites is not None else {}
+        )
+        # Record counts per level, plugin counters and named duration
+        # histograms (timer(aggregate=True), sampled @trace).
+        self.metrics: MetricsRegistry = (
+            _metrics
+            if _metrics is not None
+            else MetricsRegistry(self, metrics_interval_s)
+        )
+        if _metrics is None:
+            self.metrics.start()  # no-op unless metrics_interval_s is set
+        # Swapped-in timing for instrument_pipeline(); shared with bound loggers.
+        self._pipeline = (
+            _pipeline
+            if _pipeline is not None
+            else PipelineInstrumentation(self.metrics, name)
+        )
+        self._pipeline.register(self)
+        # Native span tracer, off until enable_tracing(); shared with bind().
+        self._tracer = _tracer if _tracer is not None else Tracer(name)
 
         if _existing_logger:
             self._logger = _existing_logger
@@ -311,6 +421,10 @@ class FastLogger:
         self._logger.handlers.clear()
         self._logger.setLevel(self.level)
         self._logger.propagate = False
+        for old_filter in list(self._logger.filters):
+            if isinstance(old_filter, RecordCounter):
+                self._logger.removeFilter(old_filter)
+        self._logger.addFilter(RecordCounter(self.metrics, self.name))
 
         real_handlers: list[logging.Handler] = []
 
@@ -348,49 +462,104 @@ class FastLogger:
             real_handlers.append(console_handler)
 
         if self.async_safe:
-            self._queue = Queue(maxsize=-1)  # unbounded
-            queue_handler = QueueHandler(self._queue)
+            # One bounded queue and writer thread per handler, fed through a
+            # QueueHandler, so a slow console cannot hold up file writes.
+            from .routing import HandlerSink, Route, Router, SinkQueue, SinkQueueHandler
+
+            router = Router()
+            for handler in real_handlers:
+                sink = router.add_sink(
+                    HandlerSink(
+                        handler,
+                        maxsize=self.sink_queue_size,
+                        metrics=self.metrics,
+                        overflow=self.sink_overflow,
+                    )
+                )
+                router.add_route(Route((sink.name,), level=handler.level))
+            self._queue = SinkQueue(router)
+            queue_handler = SinkQueueHandler(self._queue)  # type: ignore[arg-type]
             queue_handler.setLevel(self.level)
             self._logger.addHandler(queue_handler)
-
-            self._listener = QueueListener(
-                self._queue,
-                *real_handlers,
-                respect_handler_level=True,
-            )
-            self._listener.start()
         else:
             for handler in real_handlers:
                 self._logger.addHandler(handler)
 
     def _log(self, level_method: str, message: str, *args: Any, **kwargs: Any) -> None:
-        if not self._logger:
+        # isEnabledFor() is a cached dict lookup that setLevel() invalidates,
+        # so disabled and shed levels skip context merging and masking.
+        logger = self._logger
+        level = _METHOD_LEVELS.get(level_method, logging.CRITICAL)
+        if not logger or not logger.isEnabledFor(level):
             return
+        message = self._prepare(message, kwargs)
+        getattr(self._logger, level_method)(message, *args, **kwargs)
 
+    def _prepare(self, message: str, kwargs: dict[str, Any]) -> str:
+        """Merge bound context and correlation id into ``kwargs``; mask secrets."""
         extra = kwargs.pop("extra", {})
-        if self._bound_kwargs:
+
+        # Bound and contextualize() fields travel as one node whose text and
+        # JSON are cached; only a key clash, or masking (which must see every
+        # value), falls back to a per-field merge.
+        node = self._context_node()
+        if node is not None and (
+            self.mask_secrets or extra and not node.merged.keys().isdisjoint(extra)
+        ):
+            scope = _context_scope.get()
+            if scope is not None:
+                for key, value in scope.merged.items():
+                    extra.setdefault(key, value)
             extra.update(self._bound_kwargs)
+            node = None
 
         if HAS_CONTEXT_VAR:
             req_id = request_id_ctx_var.get("")
             if req_id:
                 extra["correlation_id"] = req_id
 
-        if extra:
-            kwargs["extra"] = extra
-
-            # If not using JSON format, we append bound context below the message
-            if not self.json_format and extra:
-                context_str = "\n".join(f"  {k}={v}" for k, v in extra.items())
-                if message.strip():
-                    message = f"{message}\n\n{context_str}\n"
-                else:
-                    message = f"{context_str}\n"
-
+        # Masked once here, before any handler or sink sees the record.
         if self.mask_secrets:
             message = mask_secrets_in_string(message)
+            extra = mask_dict(extra)
 
-        getattr(self._logger, level_method)(message, *args, **kwargs)
+        if extra or node is not None:
+            # If not using JSON format, we append bound context below the message
+            if not self.json_format:
+                lines = [
+                    f"  {k}={v}" for k, v in extra.items() if k not in _JSON_ONLY_FIELDS
+                ]
+                if node is not None and node.merged:
+                    lines.insert(0, node.text)
+                if lines:
+                    context_str = "\n".join(lines)
+                    if message.strip():
+                        suffix = f"\n\n{context_str}\n"
+                    else:
+                        suffix = f"{context_str}\n"
+                        message = ""
+                    if self.mask_secrets:
+                        suffix = mask_secrets_in_string(suffix)
+                    message += suffix
+                    extra["fl_suffix"] = len(suffix)
+            if node is not None:
+                extra["fl_context"] = node
+            kwargs["extra"] = extra
+        return message
+
+    def _context_node(self) -> Optional[ContextNode]:
+        """Node holding the current scope's fields overlaid with bound fields."""
+        scope = _context_scope.get()
+        cached_scope, node = self._context_cache
+        if cached_scope is scope:
+            return node
+        bound = self._bound_node
+        if scope is None or bound is None:
+            node = scope or bound
+        else:
+            node = ContextNode(self._bound_kwargs, scope)
+        self._context_cache = (scope, node)
+        return node
 
     # ------------------------------------------------------------------
     # Public API
@@ -403,14 +572,341 @@ class FastLogger:
 
     def stop(self) -> None:
         """
-        Gracefully shut down the async listener.
+        Gracefully shut down the async listener, sink writers, the metrics
+        endpoint and any sampler, call recorder, heap watcher, GC or asyncio
+        instrumentation started by this logger. Plugin usage summaries still
+        in their window are emitted first.
         """
-        if (
-            self._listener is not None
-            and getattr(self._listener, "_thread", None) is not None
-        ):
-            self._listener.stop()
-            self._listener = None
+        from .flame import call_recorder, set_call_recorder
+        from .memory import heap_watcher
+        from .plugins.celery import task_monitors
+        from .plugins.openai import stop_usage_aggregator
+        from .runtime import (
+            gc_instrumentation,
+            loop_monitors,
+            set_gc_instrumentation,
+            set_loop_monitor,
+        )
+        from .sampling import process_sampler
+        from .shedding import load_shedders, set_load_shedder
+
+        # First, so the sampler's final report still reaches the handlers.
+        sampler = process_sampler()
+        if sampler is not None and sampler.logger is self:
+            sampler.stop()
+        calls = call_recorder()
+        if calls is not None and calls.logger is self:
+            set_call_recorder(None)
+            calls.flush()
+        watcher = heap_watcher()
+        if watcher is not None and watcher.logger is self:
+            watcher.stop()
+        stop_usage_aggregator(self)
+        for monitor in task_monitors():
+            if monitor.logger is self:
+                monitor.stop()
+        gc_hooks = gc_instrumentation()
+        if gc_hooks is not None and gc_hooks.logger is self:
+            set_gc_instrumentation(None)
+        for monitor in loop_monitors():
+            if monitor.logger is self:
+                set_loop_monitor(monitor.loop, None)
+        for shedder in load_shedders():
+            if shedder.logger is self:
+                set_load_shedder(self.name, None)
+        self.metrics.stop()  # the last summary window, if summaries are on
+        # Writes what every sink still has queued, async_safe handlers included.
+        router = self.sink_router(create=False)
+        if router is not None:
+            router.close()
+        self.metrics.stop_server()
+
+    def instrument_pipeline(self, enabled: bool = True) -> None:
+        """Turn self-instrumentation of the logging pipeline on or off.
+
+        While enabled, ``_log`` preprocessing, per-handler format, emit and
+        flush time, bytes and records per sink and the ``async_safe`` queue
+        high-water mark are recorded in ``logger.metrics``. Timed code paths
+        are swapped in and removed again on disable, so a logger that never
+        enables it pays nothing. Handlers added afterwards are not covered.
+        """
+        if not enabled:
+            self._pipeline.disable()
+            return
+        assert self._logger is not None
+        handlers = list(self._logger.handlers)
+        router = self.sink_router(create=False)
+        if router is not None:
+            handlers.extend(router.handlers())
+        self._pipeline.enable(handlers)
+
+    def add_sink(
+        self,
+        name: str,
+        target: Any,
+        format: Any = None,
+        level: Union[int, str, None] = None,
+        max_level: Union[int, str, None] = None,
+        logger: Union[str, tuple[str, ...], None] = None,
+        when: Any = None,
+        overflow: Optional[str] = None,
+        **options: Any,
+    ) -> Any:
+        """Send records to a named sink with its own queue and writer thread.
+
+        ``target`` is a file path (relative paths land in the log folder),
+        a ``(host, port)`` pair for newline-delimited TCP, a stream such as
+        ``sys.stdout``, or any object with ``write(bytes)`` and ``close()``.
+        ``format`` is ``"text"``, ``"json"``, ``"color"`` or a
+        :class:`logging.Formatter`; it defaults to the logger's own format.
+        Each format runs once per record however many sinks share it.
+        ``overflow`` (default ``sink_overflow``) is ``"block"`` to make the
+        caller wait when the queue is full or ``"drop"`` to discard records.
+
+        The sink gets one route built from ``level``, ``max_level``,
+        ``logger`` (name or prefix, so library loggers can be routed too)
+        and ``when`` (a ``record -> bool`` callable or ``{field: value}``);
+        add more with :meth:`route`. ``options`` go to the writer, e.g.
+        ``max_bytes``/``backup_count`` for files::
+
+            logger.add_sink("errors", "errors.log", level="ERROR")
+            logger.add_sink("audit", "audit.jsonl", format="json",
+                            when={"audit": True})
+
+        Returns the :class:`~fast_logger.routing.Sink`. Adding a sink under
+        an existing name replaces it.
+        """
+        from .routing import Sink, make_writer
+
+        router = self.sink_router()
+        key = format or ("json" if self.json_format else "text")
+        if isinstance(key, logging.Formatter):
+            router.formatters.setdefault(key, key)
+        elif key not in router.formatters:
+            if key == "json":
+                router.formatters[key] = JsonFormatter()
+            elif key == "text":
+                router.formatters[key] = logging.Formatter(self.log_format)
+            elif key == "color":
+                router.formatters[key] = ColorFormatter(
+                    self.log_format, theme=self.theme
+                )
+            else:
+                raise ValueError(f"unknown sink format: {key!r}")
+        if isinstance(target, (str, os.PathLike)) and not os.path.isabs(target):
+            target = self._get_log_directory() / target
+        writer = make_writer(target, **options)
+        sink = router.add_sink(
+            Sink(
+                name,
+                writer,
+                key,
+                maxsize=self.sink_queue_size,
+                metrics=self.metrics,
+                overflow=overflow or self.sink_overflow,
+            )
+        )
+        self.route(name, level=level, max_level=max_level, logger=logger, when=when)
+        return sink
+
+    def route(
+        self,
+        *sinks: str,
+        level: Union[int, str, None] = None,
+        max_level: Union[int, str, None] = None,
+        logger: Union[str, tuple[str, ...], None] = None,
+        when: Any = None,
+    ) -> Any:
+        """Add a rule sending matching records to existing ``sinks``.
+
+        Conditions combine with AND; a record matching several routes is
+        still written once per sink.
+        """
+        from .routing import Route
+
+        return self.sink_router().add_route(
+            Route(
+                sinks,
+                level=self._parse_level(level) if level is not None else 0,
+                max_level=(
+                    self._parse_level(max_level)
+                    if max_level is not None
+                    else logging.CRITICAL
+                ),
+                loggers=(logger,) if isinstance(logger, str) else logger or (),
+                when=when,
+            )
+        )
+
+    def remove_sink(self, name: str) -> bool:
+        """Write out and close the sink ``name``; ``False`` if there is none."""
+        router = self.sink_router(create=False)
+        return router is not None and router.remove_sink(name) is not None
+
+    def sink_router(self, create: bool = True) -> Any:
+        """The :class:`~fast_logger.routing.Router` among this logger's handlers.
+
+        Looked up rather than stored, so bound loggers find a router added
+        after :meth:`bind`. ``async_safe`` loggers always have one, behind
+        their ``QueueHandler``; otherwise the first call with ``create``
+        installs one.
+        """
+        from .routing import Router, SinkQueue
+
+        assert self._logger is not None
+        for handler in self._logger.handlers:
+            if isinstance(handler, Router):
+                return handler
+            if isinstance(handler, QueueHandler) and isinstance(
+                handler.queue, SinkQueue
+            ):
+                return handler.queue.router
+        if not create:
+            return None
+        router = Router()
+        self._logger.addHandler(router)
+        return router
+
+    def shed_load(
+        self,
+        enabled: bool = True,
+        max_level: Union[int, str] = "WARNING",
+        high_water: float = 0.5,
+        low_water: float = 0.1,
+        high_lag_ms: float = 500.0,
+        low_lag_ms: float = 50.0,
+        interval: float = 0.25,
+        cooldown_s: float = 5.0,
+    ) -> Any:
+        """Raise the effective level while the sinks fall behind.
+
+        Every ``interval`` seconds the sink queues are sampled. When the
+        fullest lane is at least ``high_water`` full (a fraction of
+        ``sink_queue_size``), or the oldest queued record has waited
+        ``high_lag_ms``, and the backlog is still growing, the level goes up
+        one step (DEBUG → INFO → WARNING, up to ``max_level``). Once fill
+        and lag have stayed under ``low_water``/``low_lag_ms`` for
+        ``cooldown_s``, it comes back down one step per cooldown. Each change
+        is logged with ``shed_*`` fields and counted in ``logger.metrics``.
+
+        Needs sink queues to watch: ``async_safe=True`` or :meth:`add_sink`.
+        Returns the :class:`~fast_logger.shedding.LoadShedder`, or ``None``
+        when ``enabled=False`` (which restores the configured level).
+        """
+        from .shedding import LoadShedder, load_shedder, set_load_shedder
+
+        if not enabled:
+            shedder = load_shedder(self.name)
+            if shedder is not None and shedder.logger is self:
+                set_load_shedder(self.name, None)
+            return None
+        router = self.sink_router(create=False)
+        if router is None:
+            raise ValueError(
+                "shed_load() watches sink queues: use async_safe=True or add_sink()"
+            )
+        shedder = LoadShedder(
+            self,
+            router,
+            max_level=self._parse_level(max_level),
+            high_water=high_water,
+            low_water=low_water,
+            high_lag_ms=high_lag_ms,
+            low_lag_ms=low_lag_ms,
+            interval=interval,
+            cooldown_s=cooldown_s,
+        )
+        set_load_shedder(self.name, shedder)
+        shedder.start()
+        return shedder
+
+    def pipeline_stats(self) -> dict[str, Any]:
+        """Return the pipeline measurements collected by :meth:`instrument_pipeline`.
+
+        Timings are histogram snapshots in milliseconds for the current
+        ``logger.metrics`` window; record and byte counts are cumulative.
+        """
+        return self._pipeline.stats()
+
+    def instrument_gc(
+        self,
+        enabled: bool = True,
+        threshold_ms: Optional[float] = 50.0,
+        level: str = "WARNING",
+    ) -> Any:
+        """Time garbage collections through ``gc.callbacks``.
+
+        Pause durations are recorded per generation in ``logger.metrics``
+        (``gc.pause.gen0``..``gen2``) together with collection, collected
+        and uncollectable counters. Pauses of at least ``threshold_ms`` are
+        logged at ``level`` with the correlation id of the request that
+        triggered them. The totals also appear in :meth:`sysinfo` and
+        :meth:`gc_stats`. One instrumentation is active per process.
+
+        Returns the :class:`~fast_logger.runtime.GCInstrumentation`, or
+        ``None`` when disabling.
+        """
+        from .runtime import GCInstrumentation, set_gc_instrumentation
+
+        if not enabled:
+            set_gc_instrumentation(None)
+            return None
+        instrumentation = GCInstrumentation(self, threshold_ms, level)
+        set_gc_instrumentation(instrumentation)
+        instrumentation.enable()
+        return instrumentation
+
+    def instrument_asyncio(
+        self,
+        loop: Any = None,
+        threshold_ms: float = 100.0,
+        interval_ms: float = 50.0,
+        slow_callbacks: bool = False,
+        capture_stack: bool = True,
+        level: str = "WARNING",
+        enabled: bool = True,
+    ) -> Any:
+        """Detect blocking code on an asyncio event loop.
+
+        A sentinel task records scheduling lag in ``logger.metrics`` as the
+        ``asyncio.lag`` histogram (included in the periodic metrics summary)
+        and logs lags of at least ``threshold_ms``. While the loop is stuck,
+        a watchdog thread logs the loop thread's stack, so the record shows
+        the blocking call itself. ``slow_callbacks=True`` additionally puts
+        the loop in debug mode and turns asyncio's slow-callback warnings
+        into structured records instead of stderr output.
+        :meth:`async_timeline` blocks report the lag they saw.
+
+        ``loop`` defaults to the running loop, so call it from inside the
+        loop (e.g. a FastAPI startup hook) or pass the loop explicitly.
+        Returns the :class:`~fast_logger.runtime.LoopMonitor`, or ``None``
+        when disabling.
+        """
+        import asyncio
+
+        from .runtime import LoopMonitor, set_loop_monitor
+
+        if loop is None:
+            loop = asyncio.get_running_loop()
+        if not enabled:
+            set_loop_monitor(loop, None)
+            return None
+        monitor = LoopMonitor(
+            self, loop, threshold_ms, interval_ms, slow_callbacks, capture_stack, level
+        )
+        set_loop_monitor(loop, monitor)
+        monitor.start()
+        return monitor
+
+    def gc_stats(self) -> dict[str, Any]:
+        """GC totals per generation and pause histograms, see :meth:`instrument_gc`.
+
+        Returns an empty dict while GC instrumentation is off.
+        """
+        from .runtime import gc_instrumentation
+
+        instrumentation = gc_instrumentation()
+        return instrumentation.stats() if instrumentation is not None else {}
 
     def bind(self, **kwargs: Any) -> "FastLogger":
         """
@@ -434,56 +930,183 @@ class FastLogger:
             compress_backups=self.compress_backups,
             pretty_exceptions=self.pretty_exceptions,
             theme=self.theme_name,
+            metrics_interval_s=self.metrics_interval_s,
+            sink_queue_size=self.sink_queue_size,
+            sink_overflow=self.sink_overflow,
             _existing_logger=self._logger,
             _bound_kwargs=new_kwargs,
-            _listener=self._listener,
+            _trace_sites=self._trace_sites,
+            _metrics=self.metrics,
+            _pipeline=self._pipeline,
+            _tracer=self._tracer,
         )
 
+    def contextualize(self, **fields: Any) -> Contextualize:
+        """Add ``fields`` to every record logged inside the scope.
+
+        Unlike :meth:`bind` no new logger is created: the fields are pushed
+        onto a context variable, so they reach records from any FastLogger
+        (and asyncio tasks or :mod:`fast_logger.context` executors started
+        inside the scope). Works as a context manager and as a decorator for
+        sync and async functions::
+
+            with logger.contextualize(order_id=order.id):
+                charge(order)      # every record carries order_id
+
+        Call-site ``extra`` and ``bind()`` fields win over scope fields.
+        """
+        return contextualize(**fields)
+
     @contextmanager
-    def timer(self, name: str, level: str = "INFO") -> Generator[None, None, None]:
-        """Context manager to easily time blocks of code."""
+    def timer(
+        self, name: str, level: str = "INFO", aggregate: bool = False
+    ) -> Generator[None, None, None]:
+        """Context manager to easily time blocks of code.
+
+        With ``aggregate=True`` nothing is logged per block; the duration is
+        recorded in ``logger.metrics`` under ``name`` and reported in the
+        periodic metrics summary. While :meth:`record_calls` is on, the block
+        is also a frame named ``name`` in the call-tree flamegraph.
+        """
+        from .flame import call_recorder
+
+        calls = call_recorder()
+        frame = calls.enter(name) if calls is not None else None
         start = time.perf_counter()
         try:
             yield
         finally:
-            elapsed = (time.perf_counter() - start) * 1000
-            self._log(level.lower(), f"{name}\n\n{elapsed:.2f} ms")
+            elapsed_s = time.perf_counter() - start
+            elapsed = elapsed_s * 1000
+            extra: dict[str, Any] = {}
+            if frame is not None:
+                calls.exit(frame, elapsed_s)  # type: ignore[union-attr]
+                extra["call"] = frame.fields()
+            if aggregate:
+                self.metrics.record(name, elapsed)
+            else:
+                self._log(level.lower(), f"{name}\n\n{elapsed:.2f} ms", extra=extra)
 
     def trace(
-        self, func: Optional[Callable[..., Any]] = None, level: str = "DEBUG"
+        self,
+        func: Optional[Callable[..., Any]] = None,
+        level: str = "DEBUG",
+        sample_rate: float = 1.0,
+        slower_than_ms: Optional[float] = None,
+        max_arg_len: int = 80,
     ) -> Any:
-        """Decorator to automatically log entry, exit, and execution time of a function."""
+        """Decorator to automatically log entry, exit, and execution time of a function.
 
-        def decorator(f: Callable[..., Any]) -> Callable[..., Any]:
-            @wraps(f)
-            def wrapper(*args: Any, **kwargs: Any) -> Any:
-                args_str = ", ".join(map(repr, args))
-                kwargs_str = ", ".join(f"{k}={v!r}" for k, v in kwargs.items())
-                all_args = ", ".join(filter(None, [args_str, kwargs_str]))
+        Coroutine and async-generator functions are awaited/iterated, so the
+        time reported is execution time rather than coroutine creation.
+        Arguments are rendered lazily with :mod:`reprlib`, each capped at
+        ``max_arg_len`` characters, and nothing is rendered when ``level`` is
+        disabled.
 
-                self._log(level.lower(), f"Entering {f.__name__}({all_args})")
-                start = time.perf_counter()
-                try:
-                    result = f(*args, **kwargs)
-                    return result
-                finally:
-                    elapsed = (time.perf_counter() - start) * 1000
-                    self._log(
-                        level.lower(), f"Exiting {f.__name__} (Time: {elapsed:.2f} ms)"
-                    )
+        Args:
+            level:          Level of the per-call lines.
+            sample_rate:    Fraction of calls that are logged.
+            slower_than_ms: If set, log a single line only for sampled calls
+                            at least this slow.
+            max_arg_len:    Per-argument limit for the rendered call.
+
+        With ``sample_rate < 1`` or ``slower_than_ms`` set, every call's
+        duration is also recorded in ``logger.metrics`` under the function's
+        ``module.qualname``, see :meth:`trace_stats`.
+        """
+        from .tracing import TraceSite, wrap
 
-            return wrapper
+        def decorator(f: Callable[..., Any]) -> Callable[..., Any]:
+            site = TraceSite(
+                self,
+                f.__name__,
+                f"{f.__module__}.{f.__qualname__}",
+                level,
+                sample_rate,
+                slower_than_ms,
+                max_arg_len,
+            )
+            if site.metric is not None:
+                self._trace_sites[site.metric] = site
+            return wrap(f, site)
 
         if func is None:
             return decorator
         return decorator(func)
 
+    def trace_stats(self) -> dict[str, dict[str, Any]]:
+        """Latency histograms of sampled/thresholded ``@trace`` functions.
+
+        Keys are ``module.qualname``; values hold count, mean, p50, p90, p99
+        and max in milliseconds for the current ``logger.metrics`` window.
+        """
+        snap = self.metrics.snapshot()
+        return {name: snap[name] for name in list(self._trace_sites) if name in snap}
+
     def profile(
-        self, func: Optional[Callable[..., Any]] = None, level: str = "INFO"
+        self,
+        func: Optional[Callable[..., Any]] = None,
+        level: str = "INFO",
+        mode: str = "cprofile",
+        interval_ms: float = 5.0,
+        report_interval_s: Optional[float] = 60.0,
+        top: int = 10,
     ) -> Any:
-        """Decorator to profile a function's execution using cProfile."""
+        """Decorator to profile a function's execution.
+
+        ``mode="cprofile"`` (default) runs each call under a fresh cProfile
+        and logs its stats. ``mode="sampling"`` samples the function's stack
+        from a timer thread every ``interval_ms`` instead and aggregates all
+        calls into one profile. A top-``top`` table is logged every
+        ``report_interval_s`` seconds. The profile is available as
+        ``wrapper.profiler`` (``collapsed()``, ``report()``, ``emit()``).
+        """
+        if mode not in ("cprofile", "sampling"):
+            raise ValueError(f"unknown profile mode {mode!r}")
+
+        def sampling_decorator(f: Callable[..., Any]) -> Callable[..., Any]:
+            import inspect
+
+            from .sampling import SamplingProfile
+
+            profiler = SamplingProfile(
+                self,
+                f.__qualname__,
+                f.__code__,
+                interval_ms=interval_ms,
+                report_interval_s=report_interval_s,
+                top=top,
+                level=level,
+            )
+
+            if inspect.iscoroutinefunction(f):
+
+                @wraps(f)
+                async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                    profiler.enter()
+                    try:
+                        return await f(*args, **kwargs)
+                    finally:
+                        profiler.exit()
+
+                async_wrapper.profiler = profiler  # type: ignore[attr-defined]
+                return async_wrapper
+
+            @wraps(f)
+            def sampled(*args: Any, **kwargs: Any) -> Any:
+                profiler.enter()
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    profiler.exit()
+
+            sampled.profiler = profiler  # type: ignore[attr-defined]
+            return sampled
 
         def decorator(f: Callable[..., Any]) -> Callable[..., Any]:
+            if mode == "sampling":
+                return sampling_decorator(f)
+
             @wraps(f)
             def wrapper(*args: Any, **kwargs: Any) -> Any:
                 import cProfile
@@ -510,7 +1133,178 @@ class FastLogger:
             return decorator
         return decorator(func)
 
-    def use(self, plugin_name: str, target: Any = None) -> "FastLogger":
+    def memprofile(
+        self,
+        func: Optional[Callable[..., Any]] = None,
+        level: str = "INFO",
+        every: int = 1,
+        threshold_mb: float = 0.0,
+        top: int = 10,
+        frames: int = 1,
+    ) -> Any:
+        """Decorator logging the memory a call allocates, via :mod:`tracemalloc`.
+
+        Each profiled call logs its net allocation (still alive on return),
+        its peak and the ``top`` source lines that allocated the most.
+        Tracing is only switched on for profiled calls, so the rest of the
+        process runs at full speed.
+
+        Args:
+            every:        Profile one call in every ``every`` calls.
+            threshold_mb: Only log calls whose net allocation is at least
+                          this many MiB.
+            top:          Number of allocating lines to list (0 skips the
+                          snapshot entirely).
+            frames:       Traceback depth tracemalloc stores per block.
+
+        Counters are available as ``wrapper.memprofile``.
+        """
+        from .memory import MemProfile, wrap
+
+        def decorator(f: Callable[..., Any]) -> Callable[..., Any]:
+            profile = MemProfile(
+                self, f.__qualname__, level, every, threshold_mb, top, frames
+            )
+            return wrap(f, profile)
+
+        if func is None:
+            return decorator
+        return decorator(func)
+
+    def watch_heap(
+        self,
+        interval: float = 60.0,
+        top: int = 10,
+        rss_growth_mb: Optional[float] = None,
+        frames: int = 1,
+        level: str = "INFO",
+    ) -> Any:
+        """Start a background heap-growth watchdog.
+
+        Turns on :mod:`tracemalloc` and every ``interval`` seconds logs the
+        ``top`` allocation sites that grew the most since the previous
+        snapshot, with their growth since the baseline taken now, as one
+        structured record (``heap_*`` extras). RSS is read from
+        ``/proc/self/statm``. When it has grown by ``rss_growth_mb`` since
+        the baseline or the previous dump, a flight dump (growth table,
+        largest tracebacks, and the :meth:`record` buffer if recording) is
+        written to the log folder.
+
+        There is one watcher per process; starting another replaces it.
+        Returns the :class:`~fast_logger.memory.HeapWatcher` (``stop()``,
+        ``check()``).
+        """
+        from .memory import HeapWatcher, set_heap_watcher
+
+        watcher = HeapWatcher(self, interval, top, rss_growth_mb, frames, level)
+        set_heap_watcher(watcher)
+        watcher.start()
+        return watcher
+
+    def start_sampler(
+        self,
+        hz: float = 20.0,
+        report_interval_s: float = 60.0,
+        top: int = 20,
+        level: str = "INFO",
+        signum: Optional[int] = None,
+        paused: bool = False,
+        include_idle: bool = False,
+    ) -> Any:
+        """Start continuous, process-wide stack sampling.
+
+        A daemon thread samples every thread's stack ``hz`` times a second.
+        Every ``report_interval_s`` seconds the window is written to a
+        ``.collapsed`` file in the log folder (flamegraph.pl / speedscope
+        input) and a top-``top`` hotspot record is logged. There is one
+        sampler per process; starting another replaces it.
+
+        With ``signum`` (e.g. ``signal.SIGUSR2``) that signal toggles
+        sampling on and off; it must be called from the main thread then.
+        ``paused=True`` installs everything without starting, so sampling
+        can be switched on later by signal.
+
+        Returns the :class:`~fast_logger.sampling.BackgroundSampler`.
+        """
+        from .sampling import BackgroundSampler, set_process_sampler
+
+        sampler = BackgroundSampler(
+            self,
+            hz=hz,
+            report_interval_s=report_interval_s,
+            top=top,
+            level=level,
+            include_idle=include_idle,
+        )
+        set_process_sampler(sampler)
+        if signum is not None:
+            sampler.install_signal(signum)
+        if not paused:
+            sampler.start()
+        return sampler
+
+    def stop_sampler(self) -> Optional[str]:
+        """Stop the process-wide sampler, writing its last window.
+
+        Returns the path of the last collapsed file written, if any.
+        """
+        from .sampling import process_sampler
+
+        sampler = process_sampler()
+        if sampler is None:
+            return None
+        sampler.stop()
+        return sampler.files[-1] if sampler.files else None
+
+    def record_calls(
+        self,
+        enabled: bool = True,
+        max_stacks: int = 10_000,
+        top: int = 20,
+        level: str = "INFO",
+    ) -> Any:
+        """Record ``@trace`` and :meth:`timer` calls as a wall-time call tree.
+
+        Every traced call, logged or not, becomes a frame on a per-context
+        stack; its self time (wall time minus traced children) is summed
+        per ``root;...;leaf`` path in microseconds. Exit lines gain a
+        ``call`` field with the stack, so ``fastlogger flame`` can rebuild
+        the graph from a JSON log. Write the graph with
+        :meth:`export_flamegraph`; :meth:`stop` flushes what is left to
+        ``<name>.calls-<timestamp>.collapsed`` in the log folder.
+
+        Returns the :class:`~fast_logger.flame.CallRecorder`, or ``None``
+        when ``enabled=False``.
+        """
+        from .flame import CallRecorder, call_recorder, set_call_recorder
+
+        if not enabled:
+            recorder = call_recorder()
+            if recorder is not None and recorder.logger is self:
+                set_call_recorder(None)
+            return None
+        recorder = CallRecorder(self, max_stacks=max_stacks, top=top, level=level)
+        set_call_recorder(recorder)
+        return recorder
+
+    def export_flamegraph(self, path: Optional[str] = None) -> Optional[str]:
+        """Write the recorded call tree as collapsed stacks, or SVG for ``.svg``.
+
+        Defaults to ``<log dir>/<name>.calls.collapsed``. Returns ``None``
+        if :meth:`record_calls` is off.
+        """
+        from .flame import call_recorder, write_flamegraph
+
+        recorder = call_recorder()
+        if recorder is None:
+            return None
+        if path is None:
+            path = str(self._get_log_directory() / f"{self.name}.calls.collapsed")
+        return write_flamegraph(
+            recorder.table.stacks(), path, title=f"{self.name} calls"
+        )
+
+    def use(self, plugin_name: str, target: Any = None, **options: Any) -> "FastLogger":
         """Activate a named plugin.
 
         Simple plugins (no target needed)::
@@ -519,16 +1313,20 @@ class FastLogger:
             logger.use("requests")
             logger.use("sqlalchemy")
             logger.use("openai")
+            logger.use("django")    # adds FastLoggerDjangoMiddleware to MIDDLEWARE
 
         Target plugins (pass the object to patch)::
 
             logger.use("flask", flask_app)
             logger.use("redis", redis_client)
             logger.use("celery", celery_app)
+            logger.use("dbapi", sqlite3)
+
+        Keyword options go to the plugin, e.g. ``logger.use("django", n_plus_one=5)``.
         """
         from .plugins import load_plugin
 
-        load_plugin(self, plugin_name, target)
+        load_plugin(self, plugin_name, target, **options)
         return self
 
     # Render features that use Rich if available -----------------------
@@ -599,8 +1397,11 @@ class FastLogger:
             self._log(level.lower(), f"\n{header}\n{text}\n{border}")
 
     def sysinfo(self, level: str = "INFO") -> None:
-        """Logs system and environment information."""
+        """Logs system and environment information (and GC totals if instrumented)."""
         info = get_system_info()
+        gc_info = self.gc_stats()
+        if gc_info:
+            info["gc"] = gc_info
         self._log(level.lower(), f"System Info: {json.dumps(info, indent=2)}")
 
     def sql(self, query: str, level: str = "INFO") -> None:
@@ -846,11 +1647,31 @@ class FastLogger:
 
         patch_app(app, self)
 
-    def patch_flask(self, app: Any) -> None:
-        """Attach request/response logging hooks to an existing Flask app instance."""
+    def patch_flask(self, app: Any, **options: Any) -> None:
+        """Attach access logging middleware to an existing Flask app instance."""
         from .plugins.flask import patch_flask as _patch_flask
 
-        _patch_flask(app, self)
+        _patch_flask(app, self, **options)
+
+    def patch_wsgi(self, app: Any, **options: Any) -> Any:
+        """Wrap any WSGI app so each request emits one structured access record.
+
+        Returns the wrapped app; ``sample_2xx`` and ``header`` are forwarded to
+        :class:`fast_logger.plugins.wsgi.FastLoggerWSGIMiddleware`.
+        """
+        from .plugins.wsgi import patch_wsgi as _patch_wsgi
+
+        return _patch_wsgi(app, self, **options)
+
+    def patch_django(self, **options: Any) -> None:
+        """Add FastLoggerDjangoMiddleware to MIDDLEWARE.
+
+        The middleware does per-request DB and cache accounting; ``options``
+        go to :func:`fast_logger.plugins.django.patch`.
+        """
+        from .plugins.django import patch as _patch_django
+
+        _patch_django(self, **options)
 
     def patch_redis(self, client: Any) -> None:
         """Wrap a Redis client's execute_command to log every command with latency."""
@@ -858,17 +1679,37 @@ class FastLogger:
 
         _patch_redis(client, self)
 
-    def patch_openai(self) -> None:
-        """Monkey-patch openai to log model, tokens, latency, and cost per call."""
+    def patch_openai(self, client: Any = None, **options: Any) -> None:
+        """Log model, tokens, latency, and cost per call (module-level or per client).
+
+        Pass an ``OpenAI`` / ``AsyncOpenAI`` instance to patch just that client;
+        ``window_s`` and ``log_calls`` tune the per-model usage summaries.
+        """
         from .plugins.openai import patch_openai as _patch_openai
 
-        _patch_openai(self)
+        _patch_openai(self, client, **options)
+
+    def patch_celery(self, app: Any, **options: Any) -> Any:
+        """Connect FastLogger to Celery task signals for histograms and summaries.
 
-    def patch_celery(self, app: Any) -> None:
-        """Connect FastLogger to Celery task signals for lifecycle logging."""
+        Returns the plugin's ``TaskMonitor``; ``ttl_s``, ``max_inflight`` and
+        ``summary_interval_s`` are forwarded to it.
+        """
         from .plugins.celery import patch_celery as _patch_celery
 
-        _patch_celery(app, self)
+        return _patch_celery(app, self, **options)
+
+    def patch_dbapi(self, target: Any, **options: Any) -> Any:
+        """Time and fingerprint DB-API cursor calls.
+
+        ``target`` is a driver module, its ``connect`` function or an open
+        connection. Returns the instrumented object; see
+        :func:`fast_logger.plugins.dbapi.patch_dbapi` for ``sample_rate``,
+        ``slow_query_ms`` and ``max_statements``.
+        """
+        from .plugins.dbapi import patch_dbapi as _patch_dbapi
+
+        return _patch_dbapi(target, self, **options)
 
     def patch_requests(self) -> None:
         """Monkey-patches the requests library to automatically log all outgoing HTTP calls."""
@@ -956,29 +1797,101 @@ class FastLogger:
 
             async with logger.async_timeline("LLM call"):
                 response = await openai_client.chat(...)
+
+        With :meth:`instrument_asyncio` active on the loop, the END line also
+        carries the event-loop lag accumulated during the block.
         """
+        import asyncio
         import contextlib
 
+        from .runtime import loop_monitor
+        from .timeline import TimelineBlock
+
         @contextlib.asynccontextmanager  # type: ignore[arg-type]
         async def _ctx() -> Any:  # type: ignore[misc]
-            start = time.perf_counter()
-            self._log("info", f"Timeline [{title}] START")
+            monitor = loop_monitor(asyncio.get_running_loop())
+            lag_start = monitor.lag_so_far() if monitor is not None else 0.0
+            block = TimelineBlock(title, time.perf_counter_ns())
+            self._log(
+                "info",
+                f"Timeline [{title}] START",
+                extra={"timeline": block.fields("start")},
+            )
             try:
                 yield
             finally:
-                elapsed = (time.perf_counter() - start) * 1000
-                self._log("info", f"Timeline [{title}] END ({elapsed:.1f}ms)")
+                block.close(time.perf_counter_ns())
+                elapsed = (block.end_ns - block.start_ns) / 1e6
+                lag = ""
+                if monitor is not None:
+                    lag = f", loop lag {monitor.lag_so_far() - lag_start:.1f}ms"
+                self._log(
+                    "info",
+                    f"Timeline [{title}] END ({elapsed:.1f}ms{lag})",
+                    extra={"timeline": block.fields("end")},
+                )
 
         return _ctx()
 
+    def enable_tracing(
+        self, sample_rate: float = 1.0, capacity: int = 10_000, enabled: bool = True
+    ) -> Tracer:
+        """Switch :meth:`span` to the built-in tracer (no OpenTelemetry needed).
+
+        Spans get trace/span ids, nest through a contextvar (asyncio tasks
+        inherit the active span), and ``sample_rate`` is applied once per
+        trace at the root. The last ``capacity`` finished spans are kept for
+        :meth:`export_chrome_trace` and :meth:`export_otlp_json`. An
+        unsampled span costs a few hundred nanoseconds and allocates
+        nothing.
+        """
+        self._tracer.configure(sample_rate, capacity)
+        self._tracer.enabled = enabled
+        return self._tracer
+
+    def span(self, span_name: str, **attributes: Any) -> Any:
+        """Context manager for a traced span.
+
+        With :meth:`enable_tracing` the built-in tracer is used and the
+        :class:`~fast_logger.spans.Span` (or a no-op stand-in when unsampled)
+        is yielded. Otherwise an OpenTelemetry span is started if
+        ``opentelemetry`` is installed, and ``None`` is yielded if not.
+        """
+        tracer = self._tracer
+        if tracer.enabled:
+            return tracer.span(span_name, attributes or None)
+        return self._otel_span(span_name, attributes)
+
+    def export_chrome_trace(self, path: Optional[str] = None) -> str:
+        """Write buffered spans as Chrome Trace Event JSON (Perfetto).
+
+        Defaults to ``<log dir>/<name>.trace.json``; the buffer is emptied.
+        """
+        if path is None:
+            path = str(self._get_log_directory() / f"{self.name}.trace.json")
+        return self._tracer.export_chrome_trace(path)
+
+    def export_otlp_json(self, path: Optional[str] = None) -> str:
+        """Write buffered spans as an OTLP/JSON ``ExportTraceServiceRequest``.
+
+        Defaults to ``<log dir>/<name>.otlp.json``; the buffer is emptied.
+        """
+        if path is None:
+            path = str(self._get_log_directory() / f"{self.name}.otlp.json")
+        return self._tracer.export_otlp_json(path)
+
     @contextmanager
-    def span(self, span_name: str) -> Generator[Any, None, None]:
+    def _otel_span(
+        self, span_name: str, attributes: dict[str, Any]
+    ) -> Generator[Any, None, None]:
         """Context manager for distributed OpenTelemetry tracing."""
         try:
             from opentelemetry import trace as otel_trace  # type: ignore
 
             tracer = otel_trace.get_tracer(self.name)
-            with tracer.start_as_current_span(span_name) as span_obj:
+            with tracer.start_as_current_span(
+                span_name, attributes=attributes or None
+            ) as span_obj:
                 yield span_obj
         except ImportError:
             # Fallback if opentelemetry is not installed
@@ -986,14 +1899,30 @@ class FastLogger:
 
     @contextmanager
     def timeline(self, title: str) -> Generator[None, None, None]:
-        """Context manager to measure and log execution blocks as a timeline."""
-        start = time.perf_counter()
-        self._log("info", f"Timeline [{title}] START")
+        """Context manager to measure and log execution blocks as a timeline.
+
+        START and END records carry a structured ``timeline`` field (block
+        id, parent block, lane, monotonic ``start_ns``/``end_ns``) that
+        ``fastlogger timeline`` uses to draw nested, concurrent blocks.
+        """
+        from .timeline import TimelineBlock
+
+        block = TimelineBlock(title, time.perf_counter_ns())
+        self._log(
+            "info",
+            f"Timeline [{title}] START",
+            extra={"timeline": block.fields("start")},
+        )
         try:
             yield
         finally:
-            elapsed = time.perf_counter() - start
-            self._log("info", f"Timeline [{title}] END ({elapsed:.3f}s)")
+            block.close(time.perf_counter_ns())
+            elapsed = (block.end_ns - block.start_ns) / 1e9
+            self._log(
+                "info",
+                f"Timeline [{title}] END ({elapsed:.3f}s)",
+                extra={"timeline": block.fields("end")},
+            )
 
     def record(self, capacity: int = 1000) -> "FastLogger":
         """Start recording logs into memory for later saving."""
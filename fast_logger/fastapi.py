@@ -1,14 +1,15 @@
 import uuid
+from contextvars import ContextVar
 from typing import Any, Callable
 
+# Context variable to store the request ID for the current async task or
+# thread. Defined unconditionally so WSGI/Django middlewares can share it.
+request_id_ctx_var: ContextVar[str] = ContextVar("request_id", default="")
+
 try:
     from starlette.middleware.base import BaseHTTPMiddleware
     from starlette.requests import Request
     from starlette.responses import Response
-    from contextvars import ContextVar
-
-    # Context variable to store the request ID for the current async task
-    request_id_ctx_var: ContextVar[str] = ContextVar("request_id", default="")
 
     class FastAPILoggerMiddleware(BaseHTTPMiddleware):
         """
@@ -0,0 +1,274 @@
+"""
+fast_logger.flame
+~~~~~~~~~~~~~~~~~
+Wall-time flamegraphs from ``@trace`` and ``logger.timer()``.
+
+While a :class:`CallRecorder` is installed (``logger.record_calls()``),
+every traced call and timer block pushes a :class:`CallFrame` onto a
+:class:`~contextvars.ContextVar` stack, so nesting follows the real call
+tree across threads and asyncio tasks. On exit the frame's *self* time
+(its wall time minus that of its traced children) is added to a
+:class:`~fast_logger.sampling.StackTable` under its ``root;...;leaf`` path,
+in microseconds. The table renders as collapsed-stack text or, through
+:func:`render_svg`, as a self-contained SVG flamegraph.
+
+The exit line of each traced call also carries a ``call`` field with the
+stack and its wall and self time, so ``fastlogger flame app.log`` can build
+the same graph from a JSON log or a ``.fl`` session after the fact.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import zlib
+from contextvars import ContextVar, Token
+from html import escape
+from typing import Any, Iterable, Optional
+
+from .sampling import StackTable
+
+_current: ContextVar[Optional["CallFrame"]] = ContextVar(
+    "fast_logger_calls", default=None
+)
+
+
+class CallFrame:
+    """One open call on the traced call stack."""
+
+    __slots__ = ("stack", "parent", "child_us", "wall_us", "self_us", "_token")
+
+    def __init__(self, label: str, parent: Optional["CallFrame"]) -> None:
+        self.stack = f"{parent.stack};{label}" if parent is not None else label
+        self.parent = parent
+        self.child_us = 0
+        self.wall_us = 0
+        self.self_us = 0
+        self._token: Token[Optional[CallFrame]] = _current.set(self)
+
+    def fields(self) -> dict[str, Any]:
+        return {"stack": self.stack, "wall_us": self.wall_us, "self_us": self.self_us}
+
+
+class CallRecorder:
+    """Aggregates self time per call stack; see :meth:`FastLogger.record_calls`.
+
+    At most ``max_stacks`` distinct stacks are kept, the rest is counted
+    under ``[other]``.
+    """
+
+    def __init__(
+        self, logger: Any, max_stacks: int = 10_000, top: int = 20, level: str = "INFO"
+    ) -> None:
+        self.logger = logger
+        self.table = StackTable(max_stacks)
+        self.top_n = top
+        self.level = level.lower()
+        self.files: list[str] = []
+        self._window_start = time.time()
+
+    def enter(self, label: str) -> CallFrame:
+        return CallFrame(label, _current.get())
+
+    def exit(self, frame: CallFrame, elapsed_s: float) -> None:
+        wall = int(elapsed_s * 1e6)
+        frame.wall_us = wall
+        # Children in concurrent tasks can add up to more than the parent.
+        frame.self_us = max(wall - frame.child_us, 0)
+        parent = frame.parent
+        if parent is not None:
+            parent.child_us += wall
+        try:
+            _current.reset(frame._token)
+        except ValueError:  # async generator resumed in another context
+            _current.set(parent)
+        self.table.add(frame.stack, frame.self_us)
+
+    def collapsed(self) -> str:
+        return self.table.collapsed()
+
+    def svg(self, title: str = "") -> str:
+        return render_svg(self.table.stacks(), title or f"{self.logger.name} calls")
+
+    def report(self) -> str:
+        elapsed = time.time() - self._window_start
+        return (
+            f"Call tree: {self.table.samples / 1000:.1f} ms traced in "
+            f"{len(self.table)} stacks over {elapsed:.1f}s\n"
+            + self.table.format_top(self.top_n)
+        )
+
+    def flush(self) -> Optional[str]:
+        """Write and log the recorded stacks, then start a new window.
+
+        The file is ``<log dir>/<name>.calls-<timestamp>.collapsed``; returns
+        its path, or ``None`` if nothing was recorded.
+        """
+        if not self.table.samples:
+            self._window_start = time.time()
+            return None
+        directory = self.logger._get_log_directory()
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = directory / f"{self.logger.name}.calls-{stamp}.collapsed"
+        n = 1
+        while path.exists():
+            n += 1
+            path = directory / f"{self.logger.name}.calls-{stamp}-{n}.collapsed"
+        path.write_text(self.table.collapsed(), encoding="utf-8")
+        self.logger._log(self.level, f"{self.report()}\nCollapsed stacks: {path}")
+        self.table.clear()
+        self._window_start = time.time()
+        self.files.append(str(path))
+        return str(path)
+
+
+_recorder: Optional[CallRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def set_call_recorder(recorder: Optional[CallRecorder]) -> None:
+    """Install ``recorder`` as the process-wide call recorder (``None`` = off)."""
+    global _recorder
+    with _recorder_lock:
+        _recorder = recorder
+
+
+def call_recorder() -> Optional[CallRecorder]:
+    return _recorder
+
+
+# ---------------------------------------------------------------------------
+# Reading and rendering
+# ---------------------------------------------------------------------------
+
+
+def read_stacks(lines: Iterable[str]) -> dict[str, int]:
+    """Collapsed stacks from collapsed text or JSON log lines with ``call``.
+
+    Collapsed lines are ``root;...;leaf <value>``; JSON records contribute
+    their ``call.self_us`` under ``call.stack``. Other lines are ignored.
+    """
+    stacks: dict[str, int] = {}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            if '"call"' not in line:
+                continue
+            try:
+                call = json.loads(line).get("call")
+                stack, value = call["stack"], int(call["self_us"])
+            except (ValueError, TypeError, KeyError, AttributeError):
+                continue
+        else:
+            stack, _, count = line.rpartition(" ")
+            try:
+                value = int(count)
+            except ValueError:
+                continue
+        if stack:
+            stacks[stack] = stacks.get(stack, 0) + value
+    return stacks
+
+
+class _Node:
+    __slots__ = ("total", "children")
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.children: dict[str, _Node] = {}
+
+
+def _color(label: str) -> str:
+    # Stable warm palette in the style of flamegraph.pl, keyed by function.
+    h = zlib.crc32(label.encode("utf-8", "replace"))
+    return f"rgb({205 + h % 50},{(h >> 8) % 230},{(h >> 16) % 55})"
+
+
+def render_svg(
+    stacks: dict[str, int],
+    title: str = "Flame Graph",
+    unit: str = "us",
+    width: int = 1200,
+    frame_height: int = 16,
+    min_width_px: float = 0.1,
+) -> str:
+    """Render collapsed ``stacks`` as a self-contained SVG flamegraph.
+
+    The root is at the bottom, width is proportional to the value and each
+    frame has a ``<title>`` tooltip. Frames narrower than ``min_width_px``
+    are dropped.
+    """
+    root = _Node()
+    depth = 0
+    for stack, value in stacks.items():
+        if value <= 0:
+            continue
+        node = root
+        node.total += value
+        frames = stack.split(";")
+        depth = max(depth, len(frames))
+        for label in frames:
+            node = node.children.setdefault(label, _Node())
+            node.total += value
+
+    margin = 10
+    top = 2 * frame_height + margin
+    height = top + (depth + 1) * frame_height + margin
+    scale = (width - 2 * margin) / root.total if root.total else 0.0
+    char_px = frame_height * 0.45
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
+        f'height="{height}" viewBox="0 0 {width} {height}" '
+        'font-family="Verdana, sans-serif" font-size="11">',
+        f'<rect width="{width}" height="{height}" fill="#f8f8f8"/>',
+        f'<text x="{width / 2}" y="{frame_height + margin / 2}" '
+        f'text-anchor="middle" font-size="15">{escape(title)}</text>',
+    ]
+
+    def draw(label: str, node: _Node, x: float, level: int) -> None:
+        w = node.total * scale
+        if w < min_width_px:
+            return
+        y = height - margin - (level + 1) * frame_height
+        share = node.total * 100 / root.total
+        tip = escape(f"{label} ({node.total:,} {unit}, {share:.2f}%)")
+        out.append(
+            f'<g><title>{tip}</title><rect x="{x:.2f}" y="{y}" width="{w:.2f}" '
+            f'height="{frame_height - 1}" rx="2" fill="{_color(label)}"/>'
+        )
+        fit = int(w / char_px)
+        if fit >= 3:
+            text = label if len(label) <= fit else label[: fit - 2] + ".."
+            out.append(
+                f'<text x="{x + 3:.2f}" y="{y + frame_height - 4}">'
+                f"{escape(text)}</text>"
+            )
+        out.append("</g>")
+        for child_label, child in node.children.items():
+            draw(child_label, child, x, level + 1)
+            x += child.total * scale
+
+    if root.total:
+        draw("all", root, float(margin), 0)
+    out.append("</svg>\n")
+    return "\n".join(out)
+
+
+def write_flamegraph(
+    stacks: dict[str, int], path: str, title: str = "", unit: str = "us"
+) -> str:
+    """Write ``stacks`` as SVG if ``path`` ends in ``.svg``, else collapsed text."""
+    if path.endswith(".svg"):
+        body = render_svg(stacks, title or os.path.basename(path), unit=unit)
+    else:
+        body = "".join(
+            f"{stack} {value}\n"
+            for stack, value in sorted(stacks.items(), key=lambda kv: -kv[1])
+        )
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(body)
+    return path
@@ -0,0 +1,422 @@
+"""
+fast_logger.memory
+~~~~~~~~~~~~~~~~~~
+Allocation tracking built on :mod:`tracemalloc`.
+
+``tracemalloc`` slows every allocation in the process while it is tracing,
+so :class:`MemProfile` only traces the calls it samples. The first sampled
+call to enter starts tracing and the last one to leave stops it again,
+unless tracing was already on (``PYTHONTRACEMALLOC``, ``-X tracemalloc`` or
+someone else's ``tracemalloc.start()``), in which case it is left alone.
+
+Tracing is process-wide: allocations made by other threads while a sampled
+call runs are attributed to that call too, and overlapping sampled calls
+share one peak counter.
+
+:class:`HeapWatcher` is the long-running counterpart behind
+``logger.watch_heap()``: it keeps tracing on and diffs periodic snapshots
+to surface slowly growing allocation sites.
+"""
+
+from __future__ import annotations
+
+import inspect
+import itertools
+import os
+import threading
+import time
+import tracemalloc
+from functools import wraps
+from typing import Any, Callable, Optional
+
+_MB = 1024 * 1024
+
+# Ignore the profiler's own bookkeeping and import machinery.
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def format_bytes(n: float) -> str:
+    """``1536`` → ``'1.5 KiB'``; negative values keep their sign."""
+    sign = "-" if n < 0 else ""
+    size = abs(n)
+    if size < 1024:
+        return f"{sign}{size:.0f} B"
+    for unit in ("KiB", "MiB"):
+        size /= 1024
+        if size < 1024:
+            return f"{sign}{size:.1f} {unit}"
+    return f"{sign}{size / 1024:.1f} GiB"
+
+
+def signed_bytes(n: float) -> str:
+    return f"+{format_bytes(n)}" if n >= 0 else format_bytes(n)
+
+
+class _Tracing:
+    """Reference-counted ``tracemalloc.start()``/``stop()``."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._users = 0
+        self._owned = False
+
+    def acquire(self, frames: int) -> bool:
+        """Start tracing if needed; return True if this call started it."""
+        with self._lock:
+            self._users += 1
+            if self._users == 1:
+                self._owned = not tracemalloc.is_tracing()
+                if self._owned:
+                    tracemalloc.start(frames)
+                    return True
+            return False
+
+    def release(self) -> None:
+        with self._lock:
+            self._users -= 1
+            if self._users == 0 and self._owned:
+                tracemalloc.stop()
+                self._owned = False
+
+
+tracing = _Tracing()
+
+
+def top_lines(
+    after: tracemalloc.Snapshot,
+    before: Optional[tracemalloc.Snapshot],
+    n: int,
+) -> list[tuple[str, int, int]]:
+    """``(file:line, size_diff, count_diff)`` of the ``n`` largest growers."""
+    after = after.filter_traces(_FILTERS)
+    if before is None:
+        stats: list[Any] = after.statistics("lineno")
+        rows = [(s.traceback[0], s.size, s.count) for s in stats]
+    else:
+        diff = after.compare_to(before.filter_traces(_FILTERS), "lineno")
+        rows = [(s.traceback[0], s.size_diff, s.count_diff) for s in diff]
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return [
+        (f"{os.path.basename(frame.filename)}:{frame.lineno}", size, count)
+        for frame, size, count in rows[:n]
+        if size > 0
+    ]
+
+
+class MemProfile:
+    """Settings and counters for one ``@memprofile``-decorated function."""
+
+    def __init__(
+        self,
+        logger: Any,
+        name: str,
+        level: str = "INFO",
+        every: int = 1,
+        threshold_mb: float = 0.0,
+        top: int = 10,
+        frames: int = 1,
+    ) -> None:
+        self.logger = logger
+        self.name = name
+        self.level = level.lower()
+        self.every = max(1, every)
+        self.threshold = threshold_mb * _MB
+        self.top = top
+        self.frames = frames
+        self.calls = 0
+        self.sampled = 0
+        self._counter = itertools.count()
+
+    def should_sample(self) -> bool:
+        self.calls += 1
+        return next(self._counter) % self.every == 0
+
+    def enter(self) -> tuple[Optional[tracemalloc.Snapshot], int]:
+        self.sampled += 1
+        started = tracing.acquire(self.frames)
+        # A fresh trace holds only what this call allocates, so the snapshot
+        # taken at exit is already the net; otherwise diff against "before".
+        before = None
+        if not started and self.top > 0:
+            before = tracemalloc.take_snapshot()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        return before, current
+
+    def exit(self, state: tuple[Optional[tracemalloc.Snapshot], int]) -> None:
+        before, start = state
+        try:
+            current, peak = tracemalloc.get_traced_memory()
+            net = current - start
+            if net < self.threshold:
+                return
+            after = tracemalloc.take_snapshot() if self.top > 0 else None
+        finally:
+            tracing.release()
+        self.report(net, peak - start, after, before)
+
+    def report(
+        self,
+        net: int,
+        peak: int,
+        after: Optional[tracemalloc.Snapshot],
+        before: Optional[tracemalloc.Snapshot],
+    ) -> None:
+        lines = [
+            f"Memory profile for {self.name}: net {signed_bytes(net)}, "
+            f"peak {format_bytes(peak)}"
+        ]
+        if after is not None:
+            for where, size, count in top_lines(after, before, self.top):
+                lines.append(f"  {where}: +{format_bytes(size)} ({count:+d} blocks)")
+        self.logger._log(
+            self.level,
+            "\n".join(lines),
+            extra={"mem_net_bytes": net, "mem_peak_bytes": peak},
+        )
+
+
+def wrap(f: Callable[..., Any], profile: MemProfile) -> Callable[..., Any]:
+    """Return a sync or coroutine wrapper that profiles sampled calls."""
+    if inspect.iscoroutinefunction(f):
+
+        @wraps(f)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not profile.should_sample():
+                return await f(*args, **kwargs)
+            state = profile.enter()
+            try:
+                return await f(*args, **kwargs)
+            finally:
+                profile.exit(state)
+
+        async_wrapper.memprofile = profile  # type: ignore[attr-defined]
+        return async_wrapper
+
+    @wraps(f)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not profile.should_sample():
+            return f(*args, **kwargs)
+        state = profile.enter()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            profile.exit(state)
+
+    wrapper.memprofile = profile  # type: ignore[attr-defined]
+    return wrapper
+
+
+def read_rss() -> Optional[int]:
+    """Resident set size in bytes from ``/proc/self/statm``, or ``None``."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            resident = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident * os.sysconf("SC_PAGE_SIZE")
+
+
+Sites = dict[tuple[str, int], tuple[int, int]]
+
+
+def _sites(snapshot: tracemalloc.Snapshot, limit: int) -> Sites:
+    """Aggregate a snapshot to ``{(file, line): (size, count)}``, largest first.
+
+    Only the ``limit`` largest sites are kept. A site missing from an older
+    table counts as zero there, which overstates its growth by at most the
+    size of the smallest kept site.
+    """
+    stats = snapshot.filter_traces(_FILTERS).statistics("lineno")
+    return {
+        (s.traceback[0].filename, s.traceback[0].lineno): (s.size, s.count)
+        for s in stats[:limit]
+    }
+
+
+class HeapWatcher:
+    """Background thread diffing periodic ``tracemalloc`` snapshots.
+
+    Every ``interval`` seconds the traced heap is aggregated per source line
+    and compared with the previous interval and with the baseline taken at
+    start; the ``top`` fastest-growing sites are logged as one record. Only
+    the two aggregated tables are kept between intervals (at most
+    ``max_sites`` entries each), never the raw snapshots.
+
+    When ``rss_growth_mb`` is set and RSS has grown by that much since the
+    baseline (or since the last dump), a flight dump is written to the log
+    folder: the growth table and the largest allocation tracebacks, plus
+    the :meth:`~fast_logger.FastLogger.record` buffer when a session
+    recording is active.
+    """
+
+    def __init__(
+        self,
+        logger: Any,
+        interval: float = 60.0,
+        top: int = 10,
+        rss_growth_mb: Optional[float] = None,
+        frames: int = 1,
+        level: str = "INFO",
+        max_sites: int = 5000,
+    ) -> None:
+        self.logger = logger
+        self.interval = interval
+        self.top = top
+        self.rss_growth = rss_growth_mb * _MB if rss_growth_mb else None
+        self.frames = frames
+        self.level = level.lower()
+        self.max_sites = max_sites
+        self.dumps: list[str] = []
+        self.baseline: Sites = {}
+        self.previous: Sites = {}
+        self.baseline_rss: Optional[int] = None
+        self._rss_mark: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        tracing.acquire(self.frames)
+        self.baseline = self.previous = _sites(
+            tracemalloc.take_snapshot(), self.max_sites
+        )
+        self.baseline_rss = self._rss_mark = read_rss()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="fast-logger-heap-watch", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        if thread is not threading.current_thread():
+            thread.join(timeout)
+        self._thread = None
+        tracing.release()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self) -> dict[str, Any]:
+        """Take one snapshot, log the growth record and dump if RSS crossed."""
+        current = _sites(tracemalloc.take_snapshot(), self.max_sites)
+        growth = []
+        for site, (size, count) in current.items():
+            prev_size, prev_count = self.previous.get(site, (0, 0))
+            base_size, _ = self.baseline.get(site, (0, 0))
+            if size > prev_size:
+                growth.append(
+                    (site, size - prev_size, count - prev_count, size - base_size)
+                )
+        growth.sort(key=lambda g: g[1], reverse=True)
+        traced = sum(size for size, _ in current.values())
+        since_prev = traced - sum(size for size, _ in self.previous.values())
+        since_base = traced - sum(size for size, _ in self.baseline.values())
+        self.previous = current
+        rss = read_rss()
+
+        record = {
+            "heap_traced_bytes": traced,
+            "heap_growth_bytes": since_prev,
+            "heap_growth_since_baseline_bytes": since_base,
+            "rss_bytes": rss,
+            "heap_top_growth": [
+                {
+                    "site": f"{os.path.basename(f)}:{line}",
+                    "size_diff": size,
+                    "count_diff": count,
+                    "since_baseline": base,
+                }
+                for (f, line), size, count, base in growth[: self.top]
+            ],
+        }
+        lines = [
+            f"Heap watch: traced {format_bytes(traced)} "
+            f"({signed_bytes(since_prev)} last interval, "
+            f"{signed_bytes(since_base)} since baseline)"
+            + (f", RSS {format_bytes(rss)}" if rss is not None else "")
+        ]
+        for item in record["heap_top_growth"]:
+            lines.append(
+                f"  {item['site']}: +{format_bytes(item['size_diff'])} "
+                f"({item['count_diff']:+d} blocks), "
+                f"{signed_bytes(item['since_baseline'])} since baseline"
+            )
+        self.logger._log(self.level, "\n".join(lines), extra=record)
+
+        if (
+            self.rss_growth is not None
+            and rss is not None
+            and self._rss_mark is not None
+            and rss - self._rss_mark >= self.rss_growth
+        ):
+            self._rss_mark = rss
+            self.dump(rss, current)
+        return record
+
+    def dump(self, rss: int, current: Sites) -> str:
+        """Write a flight dump to the log folder and return its path."""
+        directory = self.logger._get_log_directory()
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = directory / f"{self.logger.name}.heap-{stamp}.txt"
+        baseline_rss = self.baseline_rss or 0
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(
+                f"RSS {format_bytes(rss)} "
+                f"({signed_bytes(rss - baseline_rss)} since baseline)\n\n"
+                "Growth since baseline by line:\n"
+            )
+            by_base = sorted(
+                (
+                    (size - self.baseline.get(site, (0, 0))[0], site)
+                    for site, (size, _) in current.items()
+                ),
+                reverse=True,
+            )
+            for diff, (filename, line) in by_base[:50]:
+                f.write(f"  {signed_bytes(diff):>11}  {filename}:{line}\n")
+            f.write("\nLargest allocations by traceback:\n")
+            stats = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+            for stat in stats.statistics("traceback")[:20]:
+                f.write(f"\n{format_bytes(stat.size)} in {stat.count} blocks\n")
+                for text in stat.traceback.format():
+                    f.write(f"{text}\n")
+        self.dumps.append(str(path))
+        self.logger._log(
+            "warning",
+            f"Heap watch: RSS grew to {format_bytes(rss)}, flight dump: {path}",
+        )
+        if getattr(self.logger, "_memory_handler", None) is not None:
+            self.logger.save(str(directory / f"{self.logger.name}.flight-{stamp}.fl"))
+        return str(path)
+
+
+_heap_watcher: Optional[HeapWatcher] = None
+
+
+def set_heap_watcher(watcher: Optional[HeapWatcher]) -> None:
+    """Install ``watcher`` as the process-wide heap watcher, stopping the old one."""
+    global _heap_watcher
+    previous, _heap_watcher = _heap_watcher, watcher
+    if previous is not None and previous is not watcher:
+        previous.stop()
+
+
+def heap_watcher() -> Optional[HeapWatcher]:
+    return _heap_watcher
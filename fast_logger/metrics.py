@@ -0,0 +1,518 @@
+"""
+fast_logger.metrics
+~~~~~~~~~~~~~~~~~~~
+Constant-memory latency histograms, lock-striped counters and gauges, and the
+per-logger metrics registry with a Prometheus text endpoint.
+
+Values are stored in log-linear buckets: every power of two is split into
+``SUB_BUCKETS`` linear slices, so any recorded value is reproduced within
+~3% and a histogram never holds more than a few hundred counters regardless
+of how many samples it has seen.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional, Union
+
+SUB_BUCKETS = 16
+STRIPES = 16
+_MAX_EXPONENT = 48  # 2**48 µs ≈ 9 years; larger values share the top bucket
+_MAX_INDEX = (_MAX_EXPONENT + 1) * SUB_BUCKETS - 1
+
+
+def bucket_index(value: float) -> int:
+    """Map a value (in the histogram's unit) to its log-linear bucket index."""
+    if value < 1.0:
+        return 0
+    mantissa, exponent = math.frexp(value)  # value = mantissa * 2**exponent
+    index = exponent * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+    return index if index < _MAX_INDEX else _MAX_INDEX
+
+
+def bucket_bounds(index: int) -> tuple[float, float]:
+    """Return the ``[lower, upper)`` range covered by a bucket index."""
+    if index < SUB_BUCKETS:
+        return 0.0, 1.0
+    exponent, sub = divmod(index, SUB_BUCKETS)
+    scale = 2.0**exponent
+    step = 0.5 / SUB_BUCKETS
+    return (0.5 + sub * step) * scale, (0.5 + (sub + 1) * step) * scale
+
+
+class Histogram:
+    """Thread-safe log-linear histogram.
+
+    By default values are durations in milliseconds bucketed at microsecond
+    ``resolution``; pass ``resolution=1`` for counts such as retries. Only
+    non-empty buckets are stored.
+    """
+
+    __slots__ = ("resolution", "_buckets", "count", "total", "min", "max", "_lock")
+
+    def __init__(self, resolution: float = 0.001) -> None:
+        self.resolution = resolution
+        self._buckets: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, value: float) -> None:
+        index = bucket_index(value / self.resolution)
+        with self._lock:
+            self._buckets[index] = self._buckets.get(index, 0) + 1
+            self.count += 1
+            self.total += value
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    def merge(self, other: "Histogram") -> None:
+        """Add every sample of ``other`` into this histogram."""
+        with other._lock:
+            buckets = dict(other._buckets)
+            count, total, lo, hi = other.count, other.total, other.min, other.max
+        with self._lock:
+            for index, n in buckets.items():
+                self._buckets[index] = self._buckets.get(index, 0) + n
+            self.count += count
+            self.total += total
+            self.min = min(self.min, lo)
+            self.max = max(self.max, hi)
+
+    def drain(self) -> "Histogram":
+        """Atomically move every sample into a new histogram and reset this one."""
+        out = Histogram(self.resolution)
+        with self._lock:
+            out._buckets, self._buckets = self._buckets, {}
+            out.count, out.total, out.min, out.max = (
+                self.count,
+                self.total,
+                self.min,
+                self.max,
+            )
+            self.count = 0
+            self.total = 0.0
+            self.min = math.inf
+            self.max = 0.0
+        return out
+
+    def percentile(self, q: float) -> float:
+        """Approximate the ``q``-th percentile (0–100)."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, math.ceil(self.count * q / 100.0))
+            seen = 0
+            for index in sorted(self._buckets):
+                seen += self._buckets[index]
+                if seen >= rank:
+                    lower, upper = bucket_bounds(index)
+                    # Sub-resolution values are indistinguishable from zero.
+                    midpoint = (lower + upper) / 2 if index >= SUB_BUCKETS else 0.0
+                    estimate = midpoint * self.resolution
+                    return min(max(estimate, self.min), self.max)
+            return self.max
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return count, mean, p50, p90, p99 and max."""
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3),
+            "p50": round(self.percentile(50), 3),
+            "p90": round(self.percentile(90), 3),
+            "p99": round(self.percentile(99), 3),
+            "max": round(self.max, 3),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self.count = 0
+            self.total = 0.0
+            self.min = math.inf
+            self.max = 0.0
+
+
+def format_summary(snap: dict[str, Any], unit: str = "ms") -> str:
+    """Render a :meth:`Histogram.snapshot` as ``n=… p50=… p99=… max=…`` text."""
+    if not snap.get("count"):
+        return "n=0"
+    return (
+        f"n={snap['count']} p50={snap['p50']:.1f}{unit} p90={snap['p90']:.1f}{unit} "
+        f"p99={snap['p99']:.1f}{unit} max={snap['max']:.1f}{unit}"
+    )
+
+
+class Counter:
+    """Monotonic counter striped across ``STRIPES`` cells by thread.
+
+    Threads mostly land on different cells, so concurrent increments rarely
+    contend on the same lock; reading sums every cell.
+    """
+
+    __slots__ = ("_cells", "_locks")
+
+    def __init__(self) -> None:
+        self._cells = [0] * STRIPES
+        self._locks = [threading.Lock() for _ in range(STRIPES)]
+
+    def inc(self, amount: Union[int, float] = 1) -> None:
+        i = threading.get_native_id() % STRIPES
+        with self._locks[i]:
+            self._cells[i] += amount
+
+    @property
+    def value(self) -> Union[int, float]:
+        return sum(self._cells)
+
+
+class Gauge(Counter):
+    """Value that can go up and down, or be read from a callback ``fn``."""
+
+    __slots__ = ("fn",)
+
+    def __init__(self, fn: Optional[Callable[[], float]] = None) -> None:
+        super().__init__()
+        self.fn = fn
+
+    def dec(self, amount: Union[int, float] = 1) -> None:
+        self.inc(-amount)
+
+    def set(self, value: Union[int, float]) -> None:
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            self._cells = [0] * STRIPES
+            self._cells[0] = value
+        finally:
+            for lock in self._locks:
+                lock.release()
+
+    @property
+    def value(self) -> Union[int, float]:
+        if self.fn is not None:
+            try:
+                return self.fn()
+            except Exception:
+                return math.nan
+        return sum(self._cells)
+
+
+def _series_name(name: str, labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(round(value, 6))
+
+
+class MetricsRegistry:
+    """Counters, gauges and named histograms recorded without a shared lock.
+
+    Each thread records durations into its own shard of histograms, so the
+    hot path only touches thread-local state and an uncontended
+    per-histogram lock. :meth:`snapshot` merges the shards. Shards of
+    finished threads are folded into a retired shard, so thread churn does
+    not grow the registry. Counters and gauges are created once (under the
+    registry lock) and then updated through their own striped locks.
+
+    With a ``logger``, :meth:`start` runs a timer that emits a histogram
+    summary record every ``summary_interval_s`` seconds, and :meth:`stop`
+    emits the last window. Each summary covers the window since the
+    previous one, and the window is then reset. Counters, and the histogram
+    totals served by :meth:`serve`, are cumulative.
+    """
+
+    TIMER_FAMILY = "fastlogger_timer_milliseconds"
+
+    def __init__(
+        self, logger: Any = None, summary_interval_s: Optional[float] = 60.0
+    ) -> None:
+        self.logger = logger
+        self.summary_interval_s = summary_interval_s
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: list[tuple[threading.Thread, dict[str, Histogram]]] = []
+        self._retired: dict[str, Histogram] = {}
+        self._lifetime: dict[str, Histogram] = {}
+        self._series: dict[tuple[str, tuple[tuple[str, str], ...]], Counter] = {}
+        self._families: dict[str, tuple[str, str]] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._window_start = time.monotonic()
+        self._next_summary = (
+            self._window_start + summary_interval_s
+            if summary_interval_s and logger is not None
+            else math.inf
+        )
+
+    # -- counters and gauges ------------------------------------------------
+
+    def _get_series(
+        self,
+        kind: str,
+        name: str,
+        description: str,
+        labels: dict[str, Any],
+        factory: Callable[[], Counter],
+    ) -> Counter:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.get(key)
+                if series is None:
+                    family = self._families.setdefault(name, (kind, description))
+                    if family[0] != kind:
+                        raise ValueError(f"metric {name!r} is a {family[0]}")
+                    series = self._series[key] = factory()
+        return series
+
+    def counter(self, name: str, description: str = "", **labels: Any) -> Counter:
+        """Return the counter for ``name`` and ``labels``, creating it once."""
+        return self._get_series("counter", name, description, labels, Counter)
+
+    def gauge(
+        self,
+        name: str,
+        description: str = "",
+        fn: Optional[Callable[[], float]] = None,
+        **labels: Any,
+    ) -> Gauge:
+        """Return the gauge for ``name`` and ``labels``; ``fn`` makes it computed."""
+        gauge = self._get_series("gauge", name, description, labels, lambda: Gauge(fn))
+        assert isinstance(gauge, Gauge)
+        return gauge
+
+    # -- histograms -----------------------------------------------------------
+
+    def _shard(self) -> dict[str, Histogram]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                # A new thread is the moment shards can pile up, so finished
+                # threads are folded in here and not only on snapshot().
+                self._retire_dead()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire_dead(self) -> None:
+        """Fold shards of finished threads into the retired shard (lock held)."""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+                continue
+            for name, hist in dict(shard).items():
+                self._retired.setdefault(name, Histogram()).merge(hist)
+        self._shards = live
+
+    def histogram(self, name: str) -> Histogram:
+        """Return the calling thread's histogram for ``name``."""
+        shard = self._shard()
+        hist = shard.get(name)
+        if hist is None:
+            hist = shard[name] = Histogram()
+        return hist
+
+    def record(self, name: str, value_ms: float) -> None:
+        """Record one duration (milliseconds) under ``name``."""
+        self.histogram(name).record(value_ms)
+
+    def _collect(self, reset: bool) -> dict[str, Histogram]:
+        with self._lock:
+            self._retire_dead()
+            shards = [shard for _, shard in self._shards]
+            shards.append(self._retired)
+            merged: dict[str, Histogram] = {}
+            for shard in shards:
+                for name, hist in dict(shard).items():
+                    target = merged.setdefault(name, Histogram())
+                    if reset:
+                        drained = hist.drain()
+                        target.merge(drained)
+                        self._lifetime.setdefault(name, Histogram()).merge(drained)
+                    else:
+                        target.merge(hist)
+        return merged
+
+    def _histogram_snapshot(self, reset: bool) -> dict[str, dict[str, Any]]:
+        merged = self._collect(reset)
+        if reset:
+            self._window_start = time.monotonic()
+        return {name: merged[name].snapshot() for name in sorted(merged)}
+
+    def snapshot(self, reset: bool = False) -> dict[str, Any]:
+        """Return every metric in one flat mapping.
+
+        Histograms map their name to ``{count, mean, p50, p90, p99, max}``
+        for the current window; counters and gauges map their series name
+        (``name{label="value"}``) to a number. With ``reset=True`` a new,
+        empty histogram window starts; counters are never reset.
+        """
+        snap: dict[str, Any] = self._histogram_snapshot(reset)
+        for (name, labels), series in sorted(self._series.items()):
+            snap[_series_name(name, labels)] = series.value
+        return snap
+
+    # -- periodic summaries ---------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Emit a summary every ``summary_interval_s`` from a daemon thread."""
+        if self.running or self._next_summary == math.inf:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="fast-logger-metrics-summary", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop the summary timer and emit the current window."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        if thread is not threading.current_thread():
+            thread.join(timeout)
+        self._thread = None
+        self.emit_summary()
+
+    def _run(self) -> None:
+        while not self._stop.wait(max(0.0, self._next_summary - time.monotonic())):
+            if time.monotonic() >= self._next_summary:
+                self.emit_summary()
+
+    def emit_summary(self) -> None:
+        """Log one summary record for the current window and start a new one."""
+        if self.logger is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self.summary_interval_s:
+                self._next_summary = now + self.summary_interval_s
+            window = now - self._window_start
+        snap = {
+            k: v for k, v in self._histogram_snapshot(reset=True).items() if v["count"]
+        }
+        if not snap:
+            return
+        lines = [f"  {name} | {format_summary(s)}" for name, s in snap.items()]
+        self.logger.info(f"Metrics ({window:.0f}s window)\n" + "\n".join(lines))
+
+    def reset(self) -> None:
+        self._histogram_snapshot(reset=True)
+
+    # -- export ---------------------------------------------------------------
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format.
+
+        Named histograms are exposed as one ``summary`` family with a ``name``
+        label; their quantiles, sum and count are cumulative.
+        """
+        out: list[str] = []
+        by_family: dict[str, list[str]] = {}
+        for (name, labels), series in sorted(self._series.items()):
+            by_family.setdefault(name, []).append(
+                f"{_series_name(name, labels)} {_number(series.value)}"
+            )
+        for name, lines in by_family.items():
+            kind, description = self._families[name]
+            if description:
+                out.append(f"# HELP {name} {description}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(lines)
+
+        window = self._collect(reset=False)
+        with self._lock:
+            lifetime = dict(self._lifetime)
+        totals: dict[str, Histogram] = {}
+        for source in (lifetime, window):
+            for name, hist in source.items():
+                totals.setdefault(name, Histogram()).merge(hist)
+        if totals:
+            family = self.TIMER_FAMILY
+            out.append(
+                f"# HELP {family} Durations from timer(aggregate=True), "
+                "sampled @trace functions and plugins."
+            )
+            out.append(f"# TYPE {family} summary")
+            for name in sorted(totals):
+                hist = totals[name]
+                label = f'name="{_escape(name)}"'
+                for q in (0.5, 0.9, 0.99):
+                    out.append(
+                        f'{family}{{{label},quantile="{q}"}} '
+                        f"{_number(hist.percentile(q * 100))}"
+                    )
+                out.append(f"{family}_sum{{{label}}} {_number(hist.total)}")
+                out.append(f"{family}_count{{{label}}} {hist.count}")
+        return "\n".join(out) + "\n"
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve :meth:`render_prometheus` at ``/metrics`` from a daemon thread.
+
+        Binds to localhost by default. Calling it again returns the running
+        server; ``port=0`` picks a free port (see ``server.server_address``).
+        """
+        if self._server is not None:
+            return self._server
+        registry = self
+
+        class _MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header(
+                    "Content-Type", "text/plain; version=0.0.4; charset=utf-8"
+                )
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass  # scrapes are not log-worthy
+
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(
+            target=server.serve_forever, name="fast-logger-metrics", daemon=True
+        ).start()
+        self._server = server
+        return server
+
+    def stop_server(self) -> None:
+        """Shut down the endpoint started by :meth:`serve`, if any."""
+        server, self._server = self._server, None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,229 @@
+"""
+fast_logger.pipeline
+~~~~~~~~~~~~~~~~~~~~
+Opt-in self-instrumentation of the logging pipeline.
+
+Enabling it swaps timed code paths in rather than checking a flag per
+record: ``FastLogger._log`` is shadowed by a timed variant on the instance,
+and every handler gets instance-level ``format``/``emit``/``flush`` (and, for
+the async queue, ``enqueue``) wrappers. Disabling deletes those attributes
+again, so the regular class methods run with no added cost.
+
+Measurements land in the logger's :class:`~fast_logger.metrics.MetricsRegistry`:
+
+* ``pipeline.preprocess`` — time spent in ``_log`` before the record is handed
+  to :mod:`logging` (context, masking)
+* ``pipeline.format.<sink>``, ``pipeline.emit.<sink>``, ``pipeline.flush.<sink>``
+  — per-handler histograms; ``emit`` includes the handler's own format and
+  flush calls
+* ``fastlogger_sink_records_total`` / ``fastlogger_sink_bytes_total`` per sink
+* ``fastlogger_queue_depth`` / ``fastlogger_queue_high_water`` for
+  ``async_safe`` loggers
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+import weakref
+from logging.handlers import QueueHandler
+from typing import Any, Callable
+
+from .metrics import MetricsRegistry
+
+_WRAPPED_ATTRS = ("format", "emit", "flush", "enqueue")
+
+
+def sink_name(handler: logging.Handler) -> str:
+    """Stable, readable name for a handler: ``file:app.log``, ``console``, ..."""
+    if handler.get_name():
+        return str(handler.get_name())
+    if isinstance(handler, QueueHandler):
+        return "queue"
+    filename = getattr(handler, "baseFilename", None)
+    if filename:
+        return f"file:{os.path.basename(filename)}"
+    if isinstance(handler, logging.StreamHandler):
+        return "console"
+    return type(handler).__name__.lower()
+
+
+class PipelineInstrumentation:
+    """Installs and removes the timed code paths for one logger pipeline."""
+
+    def __init__(self, registry: MetricsRegistry, logger_name: str) -> None:
+        self.registry = registry
+        self.logger_name = logger_name
+        self.enabled = False
+        self.queue_high_water = 0
+        self._queue: Any = None
+        self._sinks: list[str] = []
+        self._saved: list[tuple[logging.Handler, dict[str, Any]]] = []
+        self._loggers: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+    # -- installation -------------------------------------------------------
+
+    def register(self, logger: Any) -> None:
+        """Track a FastLogger sharing this pipeline (the root and bound copies)."""
+        self._loggers.add(logger)
+        if self.enabled:
+            self._swap_log(logger)
+
+    def _swap_log(self, logger: Any) -> None:
+        logger._log = self.timed_log(logger._prepare, logger)
+
+    def enable(self, handlers: list[logging.Handler]) -> None:
+        if self.enabled:
+            return
+        self.enabled = True
+        for logger in list(self._loggers):
+            self._swap_log(logger)
+        queue = None
+        for handler in handlers:
+            self._wrap_handler(handler)
+            if isinstance(handler, QueueHandler):
+                queue = handler.queue
+        self._queue = queue
+        if queue is not None:
+            self.registry.gauge(
+                "fastlogger_queue_depth",
+                "Records waiting in the async_safe queue.",
+                fn=queue.qsize,
+                logger=self.logger_name,
+            )
+            self.registry.gauge(
+                "fastlogger_queue_high_water",
+                "Deepest async_safe queue seen since instrumentation was enabled.",
+                fn=lambda: self.queue_high_water,
+                logger=self.logger_name,
+            )
+
+    def disable(self) -> None:
+        if not self.enabled:
+            return
+        self.enabled = False
+        for logger in list(self._loggers):
+            logger.__dict__.pop("_log", None)
+        for handler, previous in self._saved:
+            for attr in _WRAPPED_ATTRS:
+                if attr in previous:
+                    setattr(handler, attr, previous[attr])
+                else:
+                    handler.__dict__.pop(attr, None)
+        self._saved = []
+
+    def _wrap_handler(self, handler: logging.Handler) -> None:
+        sink = sink_name(handler)
+        if sink not in self._sinks:
+            self._sinks.append(sink)
+        own = handler.__dict__
+        self._saved.append((handler, {a: own[a] for a in _WRAPPED_ATTRS if a in own}))
+        registry = self.registry
+        perf_counter = time.perf_counter
+        records = registry.counter(
+            "fastlogger_sink_records_total", "Records emitted per sink.", sink=sink
+        )
+        nbytes = registry.counter(
+            "fastlogger_sink_bytes_total", "Formatted bytes per sink.", sink=sink
+        )
+        terminator = len(getattr(handler, "terminator", ""))
+        format_name = f"pipeline.format.{sink}"
+        emit_name = f"pipeline.emit.{sink}"
+        flush_name = f"pipeline.flush.{sink}"
+
+        original_format = handler.format
+        original_emit = handler.emit
+        original_flush = handler.flush
+
+        last: list[Any] = [None]
+
+        def timed_format(record: logging.LogRecord) -> str:
+            start = perf_counter()
+            text = original_format(record)
+            registry.histogram(format_name).record((perf_counter() - start) * 1000)
+            # RotatingFileHandler formats once more in shouldRollover().
+            if record is not last[0]:
+                last[0] = record
+                nbytes.inc(len(text.encode("utf-8", "replace")) + terminator)
+            return text
+
+        def timed_emit(record: logging.LogRecord) -> None:
+            start = perf_counter()
+            original_emit(record)
+            registry.histogram(emit_name).record((perf_counter() - start) * 1000)
+            records.inc()
+
+        def timed_flush() -> None:
+            start = perf_counter()
+            original_flush()
+            registry.histogram(flush_name).record((perf_counter() - start) * 1000)
+
+        handler.format = timed_format  # type: ignore[method-assign]
+        handler.emit = timed_emit  # type: ignore[method-assign]
+        handler.flush = timed_flush  # type: ignore[method-assign]
+
+        if isinstance(handler, QueueHandler):
+            original_enqueue = handler.enqueue
+            queue = handler.queue
+
+            def tracked_enqueue(record: logging.LogRecord) -> None:
+                original_enqueue(record)
+                depth = queue.qsize()
+                if depth > self.queue_high_water:
+                    self.queue_high_water = depth
+
+            handler.enqueue = tracked_enqueue  # type: ignore[method-assign]
+
+    def timed_log(
+        self, prepare: Callable[..., str], logger: Any
+    ) -> Callable[..., None]:
+        """Build the instrumented replacement for ``FastLogger._log``."""
+        from .core import _METHOD_LEVELS
+
+        registry = self.registry
+        perf_counter = time.perf_counter
+
+        def _log(level_method: str, message: str, *args: Any, **kwargs: Any) -> None:
+            inner = logger._logger
+            level = _METHOD_LEVELS.get(level_method, logging.CRITICAL)
+            if not inner or not inner.isEnabledFor(level):
+                return
+            start = perf_counter()
+            message = prepare(message, kwargs)
+            registry.histogram("pipeline.preprocess").record(
+                (perf_counter() - start) * 1000
+            )
+            getattr(logger._logger, level_method)(message, *args, **kwargs)
+
+        return _log
+
+    # -- reporting ------------------------------------------------------------
+
+    def stats(self) -> dict[str, Any]:
+        snap = self.registry.snapshot()
+        empty = {"count": 0}
+
+        def value(counter_name: str, sink: str) -> Any:
+            return snap.get(f'{counter_name}{{sink="{sink}"}}', 0)
+
+        out: dict[str, Any] = {
+            "enabled": self.enabled,
+            "preprocess_ms": snap.get("pipeline.preprocess", empty),
+            "sinks": {
+                sink: {
+                    "records": value("fastlogger_sink_records_total", sink),
+                    "bytes": value("fastlogger_sink_bytes_total", sink),
+                    "format_ms": snap.get(f"pipeline.format.{sink}", empty),
+                    "emit_ms": snap.get(f"pipeline.emit.{sink}", empty),
+                    "flush_ms": snap.get(f"pipeline.flush.{sink}", empty),
+                }
+                for sink in self._sinks
+            },
+        }
+        if self._queue is not None:
+            out["queue"] = {
+                "depth": self._queue.qsize(),
+                "high_water": self.queue_high_water,
+            }
+        return out
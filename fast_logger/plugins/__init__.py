@@ -7,15 +7,19 @@ _PLUGIN_REGISTRY: dict[str, tuple[str, bool]] = {
     "fastapi": ("patch", False),
     "requests": ("patch", False),
     "sqlalchemy": ("patch", False),
+    "django": ("patch", False),
     # New plugins — named differently, some need a target
     "flask": ("patch_flask", True),
     "redis": ("patch_redis", True),
     "openai": ("patch_openai", False),
     "celery": ("patch_celery", True),
+    "dbapi": ("patch_dbapi", True),
 }
 
 
-def load_plugin(logger: Any, plugin_name: str, target: Any = None) -> None:
+def load_plugin(
+    logger: Any, plugin_name: str, target: Any = None, **options: Any
+) -> None:
     """
     Load and activate a named plugin.
 
@@ -25,12 +29,18 @@ def load_plugin(logger: Any, plugin_name: str, target: Any = None) -> None:
         load_plugin(logger, "requests")
         load_plugin(logger, "sqlalchemy")
         load_plugin(logger, "openai")
+        load_plugin(logger, "django")
 
     Target plugins (pass the app/client/engine)::
 
         load_plugin(logger, "flask", flask_app)
         load_plugin(logger, "redis", redis_client)
         load_plugin(logger, "celery", celery_app)
+        load_plugin(logger, "dbapi", sqlite3)
+
+    Keyword options are forwarded to the plugin's patch function::
+
+        load_plugin(logger, "django", n_plus_one=5)
     """
     try:
         plugin_module = importlib.import_module(
@@ -53,15 +63,15 @@ def load_plugin(logger: Any, plugin_name: str, target: Any = None) -> None:
                         f"(e.g. logger.use('{plugin_name}', app)). Skipping."
                     )
                     return
-                func(target, logger)
+                func(target, logger, **options)
             else:
-                func(logger)
+                func(logger, **options)
         elif hasattr(plugin_module, "patch"):
             # Unknown plugin with a generic patch() function
             if target is not None:
-                plugin_module.patch(target, logger)  # type: ignore[arg-type]
+                plugin_module.patch(target, logger, **options)  # type: ignore[arg-type]
             else:
-                plugin_module.patch(logger)
+                plugin_module.patch(logger, **options)
         else:
             logger.warning(f"Plugin '{plugin_name}' has no patch() method.")
     except ImportError as e:
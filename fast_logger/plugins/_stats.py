@@ -0,0 +1,264 @@
+"""Shared, bounded aggregation helpers used by the instrumentation plugins."""
+
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Optional
+
+# ---------------------------------------------------------------------------
+# SQL fingerprinting
+# ---------------------------------------------------------------------------
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$:])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)"
+_VALUE_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint_sql(statement: str) -> str:
+    """Normalise a SQL statement so queries differing only in literals share a key.
+
+    String and numeric literals become ``?``, placeholder lists such as
+    ``IN (?, ?, ?)`` collapse to ``(...)`` and whitespace is squeezed.
+    Results are cached per raw statement, so repeated queries cost one lookup.
+    """
+    fp = _STRING_LITERAL.sub("?", statement)
+    fp = _NUMBER_LITERAL.sub("?", fp)
+    fp = _VALUE_LIST.sub("(...)", fp)
+    return _WHITESPACE.sub(" ", fp).strip()
+
+
+# ---------------------------------------------------------------------------
+# Per-statement tables
+# ---------------------------------------------------------------------------
+
+
+class StatementStats:
+    """Running totals for a single statement fingerprint."""
+
+    __slots__ = ("count", "total_ms", "max_ms", "rows", "fetch_ms", "errors")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.fetch_ms = 0.0
+        self.errors = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "fetch_ms": round(self.fetch_ms, 3),
+            "errors": self.errors,
+        }
+
+
+class StatementTable:
+    """Thread-safe table of :class:`StatementStats` keyed by fingerprint.
+
+    The table holds at most ``max_entries`` fingerprints; the least recently
+    used one is evicted when a new fingerprint arrives, so memory stays bounded
+    no matter how many distinct statements an application issues.
+    """
+
+    def __init__(self, max_entries: int = 500) -> None:
+        self.max_entries = max(1, max_entries)
+        self.evicted = 0
+        self._entries: OrderedDict[str, StatementStats] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, key: str) -> StatementStats:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = StatementStats()
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._entries.move_to_end(key)
+        return entry
+
+    def record(
+        self, key: str, elapsed_ms: float, rows: int = 0, error: bool = False
+    ) -> None:
+        with self._lock:
+            entry = self._entry(key)
+            entry.count += 1
+            entry.total_ms += elapsed_ms
+            if elapsed_ms > entry.max_ms:
+                entry.max_ms = elapsed_ms
+            entry.rows += rows
+            if error:
+                entry.errors += 1
+
+    def record_fetch(self, key: str, elapsed_ms: float, rows: int) -> None:
+        with self._lock:
+            entry = self._entry(key)
+            entry.fetch_ms += elapsed_ms
+            entry.rows += rows
+
+    def snapshot(self, top: Optional[int] = None) -> list[dict[str, Any]]:
+        """Return per-statement stats ordered by total time spent, slowest first."""
+        with self._lock:
+            items = [
+                {"statement": key, **entry.as_dict()}
+                for key, entry in self._entries.items()
+            ]
+        items.sort(key=lambda item: item["total_ms"] + item["fetch_ms"], reverse=True)
+        return items[:top] if top is not None else items
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ---------------------------------------------------------------------------
+# Plugin metrics
+# ---------------------------------------------------------------------------
+
+
+class PluginMetrics:
+    """Call/error counters and a latency histogram for one plugin.
+
+    Everything lands in the logger's ``metrics`` registry: the counters as
+    ``fastlogger_plugin_calls_total{plugin=...}`` and
+    ``fastlogger_plugin_errors_total{plugin=...}``, durations under
+    ``plugin.<name>``.
+    """
+
+    __slots__ = ("registry", "histogram_name", "calls", "errors")
+
+    def __init__(self, logger: Any, plugin: str) -> None:
+        self.registry = logger.metrics
+        self.histogram_name = f"plugin.{plugin}"
+        self.calls = self.registry.counter(
+            "fastlogger_plugin_calls_total",
+            "Operations observed by fast_logger plugins.",
+            plugin=plugin,
+        )
+        self.errors = self.registry.counter(
+            "fastlogger_plugin_errors_total",
+            "Failed operations observed by fast_logger plugins.",
+            plugin=plugin,
+        )
+
+    def observe(self, elapsed_ms: float, error: bool = False) -> None:
+        self.calls.inc()
+        if error:
+            self.errors.inc()
+        self.registry.record(self.histogram_name, elapsed_ms)
+
+
+# ---------------------------------------------------------------------------
+# Request-scoped accounting
+# ---------------------------------------------------------------------------
+
+
+class RequestStats:
+    """Mutable per-request accumulator shared by every plugin active in a request.
+
+    Web middlewares install one in :data:`request_stats_ctx_var` at the start
+    of a request; database/cache plugins add to it, and the middleware folds
+    the totals into its single access record. Per-fingerprint counts make
+    N+1 query patterns visible as a high ``db_top_repeat_count``.
+    """
+
+    __slots__ = (
+        "db_count",
+        "db_time_ms",
+        "slowest_ms",
+        "slowest_statement",
+        "fingerprints",
+        "cache_calls",
+        "cache_hits",
+        "cache_misses",
+        "cache_time_ms",
+    )
+
+    def __init__(self) -> None:
+        self.db_count = 0
+        self.db_time_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement = ""
+        self.fingerprints: dict[str, int] = {}
+        self.cache_calls = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time_ms = 0.0
+
+    def record_query(self, fingerprint: str, elapsed_ms: float) -> None:
+        self.db_count += 1
+        self.db_time_ms += elapsed_ms
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_statement = fingerprint
+        self.fingerprints[fingerprint] = self.fingerprints.get(fingerprint, 0) + 1
+
+    def record_cache(self, elapsed_ms: float, hit: Optional[bool] = None) -> None:
+        """Count one cache operation; ``hit`` is ``None`` for writes/deletes."""
+        self.cache_calls += 1
+        self.cache_time_ms += elapsed_ms
+        if hit is True:
+            self.cache_hits += 1
+        elif hit is False:
+            self.cache_misses += 1
+
+    def top_repeat(self) -> tuple[str, int]:
+        """Return the most frequently executed fingerprint and its count."""
+        if not self.fingerprints:
+            return "", 0
+        statement = max(self.fingerprints, key=self.fingerprints.__getitem__)
+        return statement, self.fingerprints[statement]
+
+    def summary(self) -> str:
+        """Short text fragment for access lines, empty when nothing was recorded."""
+        text = ""
+        if self.db_count:
+            text += f" db={self.db_count}q/{self.db_time_ms:.1f}ms"
+        if self.cache_calls:
+            text += (
+                f" cache={self.cache_calls}op/{self.cache_time_ms:.1f}ms"
+                f"({self.cache_hits}h/{self.cache_misses}m)"
+            )
+        return text
+
+    def as_extra(self) -> dict[str, Any]:
+        extra: dict[str, Any] = {}
+        if self.db_count:
+            statement, repeats = self.top_repeat()
+            extra.update(
+                db_queries=self.db_count,
+                db_time_ms=round(self.db_time_ms, 3),
+                db_slowest_ms=round(self.slowest_ms, 3),
+                db_slowest_statement=self.slowest_statement,
+                db_top_repeat=statement,
+                db_top_repeat_count=repeats,
+            )
+        if self.cache_calls:
+            extra.update(
+                cache_calls=self.cache_calls,
+                cache_hits=self.cache_hits,
+                cache_misses=self.cache_misses,
+                cache_time_ms=round(self.cache_time_ms, 3),
+            )
+        return extra
+
+
+request_stats_ctx_var: ContextVar[Optional[RequestStats]] = ContextVar(
+    "fast_logger_request_stats", default=None
+)
@@ -1,55 +1,335 @@
-"""Celery plugin for FastLogger — logs task lifecycle via Celery signals."""
+"""Celery plugin for FastLogger — task latency, queue wait and retry histograms.
+
+Instead of two INFO lines per task, the plugin keeps per-task-name histograms
+and emits one summary record every ``summary_interval_s`` seconds. Failures
+and retries are still logged individually. State is per process and is reset
+in forked (prefork pool) children.
+"""
 
 from __future__ import annotations
 
-from typing import Any
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Optional
+
+from ..metrics import Histogram, format_summary
+from ._stats import PluginMetrics
+
+_SENT_AT_HEADER = "fl_sent_at"
+
+
+class _TaskStats:
+    __slots__ = ("runtime", "wait", "retries", "succeeded", "failed", "retried")
+
+    def __init__(self) -> None:
+        self.runtime = Histogram()
+        self.wait = Histogram()
+        self.retries = Histogram(resolution=1)
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    """Convert an ``eta``/sent value (datetime, ISO string or epoch) to epoch."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return None
+
+
+class TaskMonitor:
+    """Bounded, fork-safe task bookkeeping shared by the Celery signal handlers.
+
+    In-flight tasks are kept in insertion order and dropped once older than
+    ``ttl_s`` or when more than ``max_inflight`` are tracked, so tasks that are
+    lost, revoked or killed before ``task_postrun`` cannot leak memory.
+    Summaries are emitted when a task finishes after the interval has
+    elapsed, and by a background timer while no task finishes.
+    """
+
+    def __init__(
+        self,
+        logger: Any,
+        ttl_s: float = 3600.0,
+        max_inflight: int = 10_000,
+        summary_interval_s: float = 60.0,
+    ) -> None:
+        self.logger = logger
+        self.ttl_s = ttl_s
+        self.max_inflight = max_inflight
+        self.summary_interval_s = summary_interval_s
+        self.metrics = PluginMetrics(logger, "celery")
+        self._thread: Optional[threading.Thread] = None
+        self._reset()
+        _monitors.add(self)
+
+    def _reset(self) -> None:
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._inflight: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._tasks: dict[str, _TaskStats] = {}
+        self.expired = 0
+        self.revoked = 0
+        self._last_summary = time.monotonic()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        # A zero interval already summarises every finished task.
+        if self.running or self.summary_interval_s <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="fast-logger-celery-summary", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop the summary timer and emit the current interval."""
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+            self._thread = None
+        self.emit_summary()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._until_due()):
+            if self._until_due() <= 0:
+                self.emit_summary()
+
+    def _until_due(self) -> float:
+        with self._lock:
+            return self._last_summary + self.summary_interval_s - time.monotonic()
+
+    def _stats(self, name: str) -> _TaskStats:
+        stats = self._tasks.get(name)
+        if stats is None:
+            stats = self._tasks[name] = _TaskStats()
+        return stats
+
+    def _expire(self, now: float) -> None:
+        inflight = self._inflight
+        while inflight and (
+            len(inflight) > self.max_inflight
+            or now - next(iter(inflight.values()))[0] > self.ttl_s
+        ):
+            inflight.popitem(last=False)
+            self.expired += 1
+
+    def started(self, task_id: str, name: str, request: Any) -> None:
+        now = time.monotonic()
+        wall = time.time()
+        ready_at = max(
+            filter(
+                None,
+                (
+                    _timestamp(getattr(request, _SENT_AT_HEADER, None)),
+                    _timestamp(getattr(request, "eta", None)),
+                ),
+            ),
+            default=None,
+        )
+        with self._lock:
+            self._inflight[task_id] = (now, time.perf_counter())
+            self._expire(now)
+            if ready_at is not None:
+                self._stats(name).wait.record(max(0.0, wall - ready_at) * 1000)
+
+    def finished(self, task_id: str, name: str, state: Any, retries: int) -> None:
+        with self._lock:
+            entry = self._inflight.pop(task_id, None)
+            stats = self._stats(name)
+            if entry is not None:
+                runtime = (time.perf_counter() - entry[1]) * 1000
+                stats.runtime.record(runtime)
+                self.metrics.observe(runtime, state == "FAILURE")
+            stats.retries.record(retries or 0)
+            if state == "SUCCESS":
+                stats.succeeded += 1
+            due = time.monotonic() - self._last_summary >= self.summary_interval_s
+        if due:
+            self.emit_summary()
+
+    def failed(self, name: str) -> None:
+        with self._lock:
+            self._stats(name).failed += 1
+
+    def retried(self, name: str) -> None:
+        # task_postrun still fires (state RETRY) and closes the in-flight entry.
+        with self._lock:
+            self._stats(name).retried += 1
 
+    def revoked_task(self, task_id: str) -> None:
+        with self._lock:
+            if self._inflight.pop(task_id, None) is not None:
+                self.revoked += 1
 
-def patch_celery(app: Any, logger: Any) -> None:
-    """Connect FastLogger to Celery signals for task start/finish/failure logging."""
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Per-task-name counts plus runtime, queue-wait and retry histograms."""
+        with self._lock:
+            tasks = dict(self._tasks)
+        return {
+            name: {
+                "succeeded": s.succeeded,
+                "failed": s.failed,
+                "retried": s.retried,
+                "runtime_ms": s.runtime.snapshot(),
+                "queue_wait_ms": s.wait.snapshot(),
+                "retries": s.retries.snapshot(),
+            }
+            for name, s in tasks.items()
+        }
+
+    def emit_summary(self) -> None:
+        """Log one summary record for the current interval and start a new one."""
+        with self._lock:
+            tasks, self._tasks = self._tasks, {}
+            expired, self.expired = self.expired, 0
+            revoked, self.revoked = self.revoked, 0
+            inflight = len(self._inflight)
+            self._last_summary = time.monotonic()
+        if not (tasks or expired or revoked):
+            return
+        lines = []
+        for name, s in sorted(tasks.items()):
+            line = (
+                f"  {name} | ok={s.succeeded} failed={s.failed} retried={s.retried}"
+                f" | run {format_summary(s.runtime.snapshot())}"
+            )
+            if s.wait.count:
+                line += f" | wait {format_summary(s.wait.snapshot())}"
+            lines.append(line)
+        self.logger.info(
+            f"Celery tasks | inflight={inflight} expired={expired} revoked={revoked}\n"
+            + "\n".join(lines)
+        )
+
+
+_monitors: "weakref.WeakSet[TaskMonitor]" = weakref.WeakSet()
+
+
+def task_monitors() -> list[TaskMonitor]:
+    """Every live :class:`TaskMonitor` in this process."""
+    return list(_monitors)
+
+
+def _reset_monitors_in_child() -> None:
+    # Prefork children inherit the parent's counters and possibly a held lock,
+    # but not its threads.
+    for monitor in list(_monitors):
+        timed = monitor._thread is not None
+        monitor._reset()
+        monitor._thread = None
+        if timed:
+            monitor.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_monitors_in_child)
+
+
+def patch_celery(
+    app: Any,
+    logger: Any,
+    ttl_s: float = 3600.0,
+    max_inflight: int = 10_000,
+    summary_interval_s: float = 60.0,
+) -> Optional[TaskMonitor]:
+    """Connect FastLogger to Celery signals for task latency and failure logging.
+
+    Args:
+        app:                Celery application.
+        logger:             FastLogger instance.
+        ttl_s:              Drop in-flight bookkeeping for tasks older than this.
+        max_inflight:       Upper bound on tracked in-flight tasks.
+        summary_interval_s: Seconds between per-task-name summary records.
+
+    Returns:
+        The :class:`TaskMonitor` holding the histograms, or ``None`` if
+        Celery is unavailable or the app was already patched.
+    """
     try:
         from celery import signals  # type: ignore
 
         if getattr(app, "_fast_logger_plugin_patched", False):
-            return
+            return None
 
-        import time
+        monitor = TaskMonitor(logger, ttl_s, max_inflight, summary_interval_s)
+        monitor.start()
 
-        _task_start_times: dict[str, float] = {}
+        def on_before_publish(headers: Any = None, **extra: Any) -> None:
+            if isinstance(headers, dict):
+                headers.setdefault(_SENT_AT_HEADER, time.time())
 
-        @signals.task_prerun.connect
-        def on_task_prerun(
-            task_id: str, task: Any, args: Any, kwargs: Any, **extra: Any
-        ) -> None:
-            _task_start_times[task_id] = time.perf_counter()
-            logger.info(f"Task Started: {task.name} [{task_id}]")
+        def on_task_prerun(task_id: str = "", task: Any = None, **extra: Any) -> None:
+            monitor.started(task_id, task.name, getattr(task, "request", None))
 
-        @signals.task_postrun.connect
         def on_task_postrun(
-            task_id: str, task: Any, retval: Any, state: str, **extra: Any
+            task_id: str = "", task: Any = None, state: Any = None, **extra: Any
         ) -> None:
-            start = _task_start_times.pop(task_id, None)
-            elapsed = (
-                f"{(time.perf_counter() - start) * 1000:.1f}ms" if start else "?ms"
-            )
-            logger.info(
-                f"Task Finished: {task.name} [{task_id}] state={state} ({elapsed})"
-            )
+            request = getattr(task, "request", None)
+            retries = getattr(request, "retries", 0)
+            monitor.finished(task_id, task.name, state, retries)
 
-        @signals.task_failure.connect
         def on_task_failure(
-            task_id: str, exception: Exception, traceback: Any, **extra: Any
+            task_id: str = "",
+            exception: Optional[BaseException] = None,
+            sender: Any = None,
+            **extra: Any,
         ) -> None:
-            _task_start_times.pop(task_id, None)
+            name = getattr(sender, "name", "?")
+            monitor.failed(name)
             logger.error(
-                f"Task Failed: [{task_id}] {type(exception).__name__}: {exception}"
+                f"Task Failed: {name} [{task_id}] "
+                f"{type(exception).__name__}: {exception}"
+            )
+
+        def on_task_retry(
+            request: Any = None, reason: Any = None, sender: Any = None, **extra: Any
+        ) -> None:
+            name = getattr(sender, "name", "?")
+            monitor.retried(name)
+            logger.warning(
+                f"Task Retrying: {name} [{getattr(request, 'id', '?')}] reason={reason}"
             )
 
-        @signals.task_retry.connect
-        def on_task_retry(request: Any, reason: Any, einfo: Any, **extra: Any) -> None:
-            logger.warning(f"Task Retrying: [{request.id}] reason={reason}")
+        def on_task_revoked(request: Any = None, **extra: Any) -> None:
+            monitor.revoked_task(getattr(request, "id", ""))
+
+        # weak=False: these closures would otherwise be collected on return.
+        signals.before_task_publish.connect(on_before_publish, weak=False)
+        signals.task_prerun.connect(on_task_prerun, weak=False)
+        signals.task_postrun.connect(on_task_postrun, weak=False)
+        signals.task_failure.connect(on_task_failure, weak=False)
+        signals.task_retry.connect(on_task_retry, weak=False)
+        signals.task_revoked.connect(on_task_revoked, weak=False)
 
         setattr(app, "_fast_logger_plugin_patched", True)
+        setattr(app, "_fast_logger_task_monitor", monitor)
         logger.info("Plugin 'celery' active: Connected to Celery task signals")
+        return monitor
     except ImportError:
         logger.warning("Plugin 'celery' failed: 'celery' library not found.")
+        return None
@@ -0,0 +1,260 @@
+"""DB-API 2.0 plugin for FastLogger — times and fingerprints cursor calls.
+
+Works with anything that follows PEP 249 (``sqlite3``, ``psycopg``, ``pymysql``,
+...). Pass a driver module, its ``connect`` function or an open connection::
+
+    logger.patch_dbapi(sqlite3)                      # instrument sqlite3.connect()
+    conn = logger.patch_dbapi(psycopg.connect(dsn))  # wrap a single connection
+"""
+
+from __future__ import annotations
+
+import random
+import time
+import types
+from functools import wraps
+from typing import Any, Callable, Iterator, Optional
+
+from ._stats import (
+    PluginMetrics,
+    StatementTable,
+    fingerprint_sql,
+    request_stats_ctx_var,
+)
+
+
+class _Instrumentation:
+    """Configuration plus the shared statement table for one patch_dbapi() call."""
+
+    def __init__(
+        self,
+        logger: Any,
+        sample_rate: float,
+        slow_query_ms: Optional[float],
+        max_statements: int,
+    ) -> None:
+        self.logger = logger
+        self.sample_rate = sample_rate
+        self.slow_query_ms = slow_query_ms
+        self.stats = StatementTable(max_statements)
+        self.metrics = PluginMetrics(logger, "dbapi")
+
+    def observe(
+        self, statement: Any, elapsed_ms: float, rows: int, error: bool = False
+    ) -> str:
+        fp = fingerprint_sql(str(statement))
+        self.stats.record(fp, elapsed_ms, rows, error)
+        self.metrics.observe(elapsed_ms, error)
+
+        req = request_stats_ctx_var.get()
+        if req is not None:
+            req.record_query(fp, elapsed_ms)
+
+        if self.slow_query_ms is not None and elapsed_ms >= self.slow_query_ms:
+            self.logger.warning(
+                f"Slow SQL {elapsed_ms:.1f}ms (≥ {self.slow_query_ms:g}ms) "
+                f"rows={rows} | {fp}"
+            )
+        elif self.sample_rate >= 1.0 or (
+            self.sample_rate > 0.0 and random.random() < self.sample_rate
+        ):
+            self.logger.debug(f"SQL {fp} → {elapsed_ms:.2f}ms rows={rows}")
+        return fp
+
+
+class InstrumentedCursor:
+    """Proxy around a DB-API cursor that times execute/executemany/fetch* calls."""
+
+    __slots__ = ("_cursor", "_inst", "_last_fp")
+
+    def __init__(self, cursor: Any, inst: _Instrumentation) -> None:
+        self._cursor = cursor
+        self._inst = inst
+        self._last_fp = ""
+
+    def _run(
+        self,
+        method: Callable[..., Any],
+        operation: Any,
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+    ) -> Any:
+        start = time.perf_counter()
+        try:
+            result = method(operation, *args, **kwargs)
+        except Exception:
+            self._last_fp = self._inst.observe(
+                operation, (time.perf_counter() - start) * 1000, 0, error=True
+            )
+            raise
+        elapsed = (time.perf_counter() - start) * 1000
+        rowcount = getattr(self._cursor, "rowcount", -1)
+        self._last_fp = self._inst.observe(
+            operation, elapsed, rowcount if rowcount and rowcount > 0 else 0
+        )
+        # sqlite3 returns the cursor itself so calls can be chained; keep the proxy.
+        return self if result is self._cursor else result
+
+    def execute(self, operation: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._run(self._cursor.execute, operation, args, kwargs)
+
+    def executemany(self, operation: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._run(self._cursor.executemany, operation, args, kwargs)
+
+    def _fetch(self, method: Callable[..., Any], *args: Any) -> Any:
+        start = time.perf_counter()
+        result = method(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+        if isinstance(result, list):
+            rows = len(result)
+        else:
+            rows = 0 if result is None else 1
+        if self._last_fp:
+            self._inst.stats.record_fetch(self._last_fp, elapsed, rows)
+        return result
+
+    def fetchone(self) -> Any:
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, *args: Any) -> Any:
+        return self._fetch(self._cursor.fetchmany, *args)
+
+    def fetchall(self) -> Any:
+        return self._fetch(self._cursor.fetchall)
+
+    def __iter__(self) -> Iterator[Any]:
+        rows = 0
+        start = time.perf_counter()
+        try:
+            for row in self._cursor:
+                rows += 1
+                yield row
+        finally:
+            if self._last_fp:
+                self._inst.stats.record_fetch(
+                    self._last_fp, (time.perf_counter() - start) * 1000, rows
+                )
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # e.g. cur.arraysize = 100 configures the wrapped cursor.
+        if name in InstrumentedCursor.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._cursor, name, value)
+
+
+class InstrumentedConnection:
+    """Proxy around a DB-API connection whose cursors are instrumented."""
+
+    __slots__ = ("_conn", "_inst")
+
+    def __init__(self, conn: Any, inst: _Instrumentation) -> None:
+        self._conn = conn
+        self._inst = inst
+
+    @property
+    def query_stats(self) -> StatementTable:
+        return self._inst.stats
+
+    def cursor(self, *args: Any, **kwargs: Any) -> InstrumentedCursor:
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._inst)
+
+    # sqlite3-style shortcuts that create a cursor behind the scenes
+    def execute(self, operation: Any, *args: Any, **kwargs: Any) -> InstrumentedCursor:
+        cursor = self.cursor()
+        return cursor.execute(operation, *args, **kwargs)  # type: ignore[no-any-return]
+
+    def executemany(
+        self, operation: Any, *args: Any, **kwargs: Any
+    ) -> InstrumentedCursor:
+        cursor = self.cursor()
+        return cursor.executemany(  # type: ignore[no-any-return]
+            operation, *args, **kwargs
+        )
+
+    def __enter__(self) -> "InstrumentedConnection":
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc: Any) -> Any:
+        return self._conn.__exit__(*exc)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # e.g. conn.row_factory = sqlite3.Row configures the wrapped connection.
+        if name in InstrumentedConnection.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._conn, name, value)
+
+
+def _wrap_connect(
+    connect: Callable[..., Any], inst: _Instrumentation
+) -> Callable[..., Any]:
+    @wraps(connect)
+    def instrumented_connect(*args: Any, **kwargs: Any) -> InstrumentedConnection:
+        return InstrumentedConnection(connect(*args, **kwargs), inst)
+
+    instrumented_connect.query_stats = inst.stats  # type: ignore[attr-defined]
+    return instrumented_connect
+
+
+def patch_dbapi(
+    target: Any,
+    logger: Any,
+    sample_rate: float = 1.0,
+    slow_query_ms: Optional[float] = None,
+    max_statements: int = 500,
+) -> Any:
+    """Instrument a DB-API driver module, ``connect`` function or connection.
+
+    Every ``execute``/``executemany`` is timed, fingerprinted and aggregated
+    into a bounded per-statement table (reachable as ``.query_stats`` on the
+    returned object); ``fetch*`` calls add their time and row counts to the
+    statement that produced them. Totals are also added to the request-level
+    summary of the web middlewares.
+
+    Args:
+        target:         Driver module (patched in place), connect function or
+                        open connection.
+        logger:         FastLogger instance.
+        sample_rate:    Fraction of queries logged individually at DEBUG.
+                        Aggregation always covers every query.
+        slow_query_ms:  Queries at or above this duration are always logged
+                        at WARNING.
+        max_statements: Maximum distinct fingerprints kept in the table.
+
+    Returns:
+        The instrumented connection or connect function; for a module, the
+        module itself after its ``connect`` has been replaced.
+    """
+    if isinstance(target, types.ModuleType):
+        if getattr(target, "_fast_logger_plugin_patched", False):
+            return target
+        inst = _Instrumentation(logger, sample_rate, slow_query_ms, max_statements)
+        target.connect = _wrap_connect(target.connect, inst)
+        setattr(target, "_fast_logger_plugin_patched", True)
+        logger.info(
+            f"Plugin 'dbapi' active: Instrumented {target.__name__}.connect cursors"
+        )
+        return target
+
+    if hasattr(target, "query_stats"):
+        return target  # already instrumented
+
+    inst = _Instrumentation(logger, sample_rate, slow_query_ms, max_statements)
+    if hasattr(target, "cursor"):
+        return InstrumentedConnection(target, inst)
+    if callable(target):
+        return _wrap_connect(target, inst)
+
+    logger.warning(
+        "Plugin 'dbapi' failed: target is not a DB-API module, connect "
+        "function or connection."
+    )
+    return target
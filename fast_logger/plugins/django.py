@@ -0,0 +1,255 @@
+"""Django plugin for FastLogger — per-request access records with DB and cache totals.
+
+Call once from settings (or before the WSGI/ASGI handler is built)::
+
+    logger.use("django")
+
+This inserts :class:`FastLoggerDjangoMiddleware` at the top of
+``settings.MIDDLEWARE``. Each request then runs with a
+``connection.execute_wrapper`` on every database alias, so queries are
+timed and fingerprinted, and configured cache backends count hits and
+misses. The access record carries query count and time, the slowest
+statement and the most repeated statement, which makes N+1 patterns in
+views obvious.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+import uuid
+from contextlib import ExitStack
+from typing import Any, Callable, Optional
+
+from ..fastapi import request_id_ctx_var
+from ._stats import (
+    PluginMetrics,
+    RequestStats,
+    StatementTable,
+    fingerprint_sql,
+    request_stats_ctx_var,
+)
+
+MIDDLEWARE_PATH = "fast_logger.plugins.django.FastLoggerDjangoMiddleware"
+
+_MISS = object()
+
+
+class _DjangoConfig:
+    def __init__(
+        self,
+        logger: Any,
+        sample_2xx: float,
+        n_plus_one: int,
+        max_statements: int,
+    ) -> None:
+        self.logger = logger
+        self.sample_2xx = sample_2xx
+        self.n_plus_one = n_plus_one
+        self.query_stats = StatementTable(max_statements)
+        self.metrics = PluginMetrics(logger, "django")
+
+
+_config: Optional[_DjangoConfig] = None
+
+
+def _execute_wrapper(
+    execute: Callable[..., Any], sql: str, params: Any, many: bool, context: Any
+) -> Any:
+    start = time.perf_counter()
+    error = False
+    try:
+        return execute(sql, params, many, context)
+    except Exception:
+        error = True
+        raise
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        fp = fingerprint_sql(sql)
+        stats = request_stats_ctx_var.get()
+        if stats is not None:
+            stats.record_query(fp, elapsed)
+        if _config is not None:
+            _config.query_stats.record(fp, elapsed, error=error)
+
+
+def _wrap_cache_method(method: Callable[..., Any], is_read: bool) -> Callable[..., Any]:
+    if is_read:
+
+        def timed_get(
+            self: Any, key: Any, default: Any = None, *args: Any, **kwargs: Any
+        ) -> Any:
+            start = time.perf_counter()
+            value = method(self, key, _MISS, *args, **kwargs)
+            stats = request_stats_ctx_var.get()
+            if stats is not None:
+                stats.record_cache(
+                    (time.perf_counter() - start) * 1000, value is not _MISS
+                )
+            return default if value is _MISS else value
+
+        wrapper = timed_get
+    else:
+
+        def timed_call(self: Any, *args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                stats = request_stats_ctx_var.get()
+                if stats is not None:
+                    stats.record_cache((time.perf_counter() - start) * 1000)
+
+        wrapper = timed_call
+
+    wrapper._fast_logger_wrapped = True  # type: ignore[attr-defined]
+    return wrapper
+
+
+def _patch_cache_backends() -> None:
+    """Wrap get/set/delete on the classes of every configured cache backend."""
+    from django.conf import settings  # type: ignore
+    from django.utils.module_loading import import_string  # type: ignore
+
+    for conf in getattr(settings, "CACHES", {}).values():
+        try:
+            backend = import_string(conf["BACKEND"])
+        except (ImportError, KeyError):
+            continue
+        for name, is_read in (
+            ("get", True),
+            ("set", False),
+            ("add", False),
+            ("delete", False),
+            ("get_many", False),
+            ("set_many", False),
+            ("delete_many", False),
+        ):
+            method = getattr(backend, name, None)
+            if method is not None and not getattr(
+                method, "_fast_logger_wrapped", False
+            ):
+                setattr(backend, name, _wrap_cache_method(method, is_read))
+
+
+class FastLoggerDjangoMiddleware:
+    """Django middleware emitting one access record per request."""
+
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response: Callable[[Any], Any]) -> None:
+        if _config is None:
+            from django.core.exceptions import MiddlewareNotUsed  # type: ignore
+
+            raise MiddlewareNotUsed("fast_logger: call logger.use('django') first")
+        self.get_response = get_response
+        self.config = _config
+
+    def __call__(self, request: Any) -> Any:
+        from django.db import connections  # type: ignore
+
+        req_id = request.META.get("HTTP_X_REQUEST_ID") or uuid.uuid4().hex[:8]
+        stats = RequestStats()
+        id_token = request_id_ctx_var.set(req_id)
+        stats_token = request_stats_ctx_var.set(stats)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(_execute_wrapper))
+                response = self.get_response(request)
+            elapsed = (time.perf_counter() - start) * 1000
+            response["X-Request-ID"] = req_id
+            self._log(request, response.status_code, elapsed, stats)
+            return response
+        finally:
+            request_stats_ctx_var.reset(stats_token)
+            request_id_ctx_var.reset(id_token)
+
+    def process_exception(self, request: Any, exception: Exception) -> None:
+        request._fast_logger_exception = exception
+
+    def _log(
+        self, request: Any, status: int, elapsed: float, stats: RequestStats
+    ) -> None:
+        config = self.config
+        logger = config.logger
+        path = request.path
+        exc = getattr(request, "_fast_logger_exception", None)
+        config.metrics.observe(elapsed, exc is not None or status >= 500)
+        if exc is not None:
+            logger.error(
+                f"[{request_id_ctx_var.get()}] ✗ {request.method} {path} EXCEPTION "
+                f"{type(exc).__name__}: {exc} ({elapsed:.1f}ms){stats.summary()}"
+            )
+            return
+
+        statement, repeats = stats.top_repeat()
+        n_plus_one = repeats >= config.n_plus_one
+        if 200 <= status < 300 and not n_plus_one and config.sample_2xx < 1.0:
+            if config.sample_2xx <= 0.0 or random.random() >= config.sample_2xx:
+                return
+
+        if status >= 500:
+            level = "error"
+        elif status >= 400 or n_plus_one:
+            level = "warning"
+        else:
+            level = "info"
+        message = (
+            f"[{request_id_ctx_var.get()}] → {request.method} {path} {status} "
+            f"({elapsed:.1f}ms){stats.summary()}"
+        )
+        if n_plus_one:
+            message += f" | possible N+1: {repeats}× {statement}"
+        logger._log(
+            level,
+            message,
+            extra={
+                "http_method": request.method,
+                "http_path": path,
+                "http_status": status,
+                "duration_ms": round(elapsed, 3),
+                **stats.as_extra(),
+            },
+        )
+
+
+def patch(
+    logger: Any,
+    sample_2xx: float = 1.0,
+    n_plus_one: int = 10,
+    max_statements: int = 500,
+) -> None:
+    """Install FastLoggerDjangoMiddleware and cache accounting.
+
+    Args:
+        logger:         FastLogger instance.
+        sample_2xx:     Fraction of 2xx responses to log. Errors and requests
+                        that look like N+1 are always logged.
+        n_plus_one:     Executions of one fingerprint within a request that
+                        flag it as a possible N+1 (logged at WARNING).
+        max_statements: Distinct fingerprints kept in the process-wide table
+                        returned by :func:`query_stats`.
+    """
+    global _config
+    try:
+        from django.conf import settings  # type: ignore
+
+        _config = _DjangoConfig(logger, sample_2xx, n_plus_one, max_statements)
+
+        middleware = list(getattr(settings, "MIDDLEWARE", None) or [])
+        if MIDDLEWARE_PATH not in middleware:
+            settings.MIDDLEWARE = [MIDDLEWARE_PATH, *middleware]
+        _patch_cache_backends()
+        logger.info(
+            "Plugin 'django' active: FastLoggerDjangoMiddleware added to MIDDLEWARE"
+        )
+    except ImportError:
+        logger.warning("Plugin 'django' failed: 'django' library not found.")
+
+
+def query_stats() -> Optional[StatementTable]:
+    """Process-wide per-statement table, or ``None`` before :func:`patch`."""
+    return _config.query_stats if _config is not None else None
@@ -65,9 +65,15 @@ def _make_middleware(logger: Any) -> Any:
     from starlette.requests import Request  # type: ignore
     from starlette.responses import Response  # type: ignore
 
+    from ._stats import PluginMetrics, RequestStats, request_stats_ctx_var
+
+    metrics = PluginMetrics(logger, "fastapi")
+
     class FastLoggerMiddleware(BaseHTTPMiddleware):
         async def dispatch(self, request: Request, call_next: Any) -> Response:
             req_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())[:8]
+            stats = RequestStats()
+            stats_token = request_stats_ctx_var.set(stats)
             start = time.perf_counter()
             logger.info(
                 f"[{req_id}] ← {request.method} {request.url.path}"
@@ -76,6 +82,7 @@ def _make_middleware(logger: Any) -> Any:
             try:
                 response = await call_next(request)
                 elapsed = (time.perf_counter() - start) * 1000
+                metrics.observe(elapsed, response.status_code >= 500)
                 level = (
                     "info"
                     if response.status_code < 400
@@ -84,16 +91,20 @@ def _make_middleware(logger: Any) -> Any:
                 logger._log(
                     level,
                     f"[{req_id}] → {request.method} {request.url.path} "
-                    f"{response.status_code} ({elapsed:.1f}ms)",
+                    f"{response.status_code} ({elapsed:.1f}ms){stats.summary()}",
                 )
                 response.headers["X-Request-ID"] = req_id
                 return response  # type: ignore
             except Exception as exc:
                 elapsed = (time.perf_counter() - start) * 1000
+                metrics.observe(elapsed, error=True)
                 logger.error(
                     f"[{req_id}] ✗ {request.method} {request.url.path} "
                     f"EXCEPTION {type(exc).__name__}: {exc} ({elapsed:.1f}ms)"
+                    f"{stats.summary()}"
                 )
                 raise
+            finally:
+                request_stats_ctx_var.reset(stats_token)
 
     return FastLoggerMiddleware
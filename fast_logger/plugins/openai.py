@@ -1,8 +1,21 @@
-"""OpenAI plugin for FastLogger — logs model, tokens, latency, and cost estimates."""
+"""OpenAI plugin for FastLogger — logs model, tokens, latency, and cost estimates.
+
+Patches the module-level ``openai.chat.completions.create`` or individual
+``OpenAI`` / ``AsyncOpenAI`` client instances. Streaming responses report
+time-to-first-token and tokens/s, and every call feeds a per-model usage
+aggregator that emits one summary record per rolling window.
+"""
 
 from __future__ import annotations
 
-from typing import Any
+import inspect
+import threading
+import time
+import weakref
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+from ._stats import PluginMetrics
 
 # Static cost table (USD per 1M tokens) — update as OpenAI revises pricing
 _COST_TABLE: dict[str, dict[str, float]] = {
@@ -15,64 +28,447 @@ _COST_TABLE: dict[str, dict[str, float]] = {
     "o1-mini": {"input": 3.00, "output": 12.00},
 }
 
+_NO_RATES = (0.0, 0.0)
+
+
+@lru_cache(maxsize=256)
+def _resolve_rates(model: str) -> tuple[float, float]:
+    """Resolve a model name to (input, output) USD per 1M tokens, once per name.
+
+    Date-suffixed names such as ``gpt-4o-2024-08-06`` map to the longest
+    matching table prefix, so ``gpt-4o-mini-…`` is never priced as ``gpt-4o``.
+    """
+    matches = [known for known in _COST_TABLE if model.startswith(known)]
+    if not matches:
+        return _NO_RATES
+    rates = _COST_TABLE[max(matches, key=len)]
+    return rates["input"], rates["output"]
+
 
 def _estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
     """Estimate USD cost given model and token counts."""
-    # Fuzzy match: strip date suffixes like -2024-09-01
-    key = model
-    for known in _COST_TABLE:
-        if model.startswith(known):
-            key = known
-            break
-    rates = _COST_TABLE.get(key, {"input": 0.0, "output": 0.0})
-    return (input_tokens * rates["input"] + output_tokens * rates["output"]) / 1_000_000
-
-
-def patch_openai(logger: Any) -> None:
-    """Monkey-patch openai to log model, tokens, latency, and cost for every completion."""
-    try:
-        import openai
+    input_rate, output_rate = _resolve_rates(model)
+    return (input_tokens * input_rate + output_tokens * output_rate) / 1_000_000
+
+
+# ---------------------------------------------------------------------------
+# Windowed usage aggregation
+# ---------------------------------------------------------------------------
+
+
+class _ModelUsage:
+    __slots__ = (
+        "calls",
+        "errors",
+        "input_tokens",
+        "output_tokens",
+        "cost",
+        "latency_ms",
+    )
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+        self.latency_ms = 0.0
+
+
+class UsageAggregator:
+    """Per-model token, cost and latency totals over a rolling window.
+
+    Once the current window has elapsed, the finished window is emitted as a
+    single summary record and a new one starts — on the next call, or from a
+    background timer when no call arrives. :meth:`flush` emits the current
+    window immediately and :meth:`stop` emits the last one.
+    """
+
+    def __init__(self, logger: Any, window_s: float = 60.0) -> None:
+        self.logger = logger
+        self.window_s = window_s
+        self._lock = threading.Lock()
+        self._models: dict[str, _ModelUsage] = {}
+        self._window_start = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.metrics = PluginMetrics(logger, "openai")
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        # A zero window already rolls over on every call; no timer needed.
+        if self.running or self.window_s <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="fast-logger-openai-usage", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop the window timer and emit the current window."""
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._until_due()):
+            if self._until_due() <= 0:
+                self.flush()
+
+    def _until_due(self) -> float:
+        with self._lock:
+            return self._window_start + self.window_s - time.monotonic()
+
+    def record(
+        self,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        latency_ms: float,
+        error: bool = False,
+    ) -> None:
+        now = time.monotonic()
+        self.metrics.observe(latency_ms, error)
+        registry = self.metrics.registry
+        for kind, tokens in (("input", input_tokens), ("output", output_tokens)):
+            if tokens:
+                registry.counter(
+                    "fastlogger_openai_tokens_total",
+                    "Tokens used by OpenAI calls, by model and direction.",
+                    model=model,
+                    kind=kind,
+                ).inc(tokens)
+        with self._lock:
+            usage = self._models.get(model)
+            if usage is None:
+                usage = self._models[model] = _ModelUsage()
+            usage.calls += 1
+            usage.errors += int(error)
+            usage.input_tokens += input_tokens
+            usage.output_tokens += output_tokens
+            usage.cost += _estimate_cost(model, input_tokens, output_tokens)
+            usage.latency_ms += latency_ms
+            due = now - self._window_start >= self.window_s
+        if due:
+            self.flush()
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Totals for the current (unfinished) window, keyed by model."""
+        with self._lock:
+            return {model: self._as_dict(u) for model, u in self._models.items()}
+
+    @staticmethod
+    def _as_dict(usage: _ModelUsage) -> dict[str, Any]:
+        return {
+            "calls": usage.calls,
+            "errors": usage.errors,
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
+            "cost_usd": round(usage.cost, 6),
+            "avg_latency_ms": round(usage.latency_ms / usage.calls, 1),
+        }
+
+    def flush(self) -> None:
+        """Emit the current window as one summary record and start a new one."""
+        now = time.monotonic()
+        with self._lock:
+            models, self._models = self._models, {}
+            elapsed, self._window_start = now - self._window_start, now
+        if not models:
+            return
+        lines = [
+            f"  {model} | calls={u.calls} errors={u.errors} | "
+            f"in={u.input_tokens} out={u.output_tokens} tokens | "
+            f"${u.cost:.6f} | avg {u.latency_ms / u.calls:.0f}ms"
+            for model, u in sorted(models.items())
+        ]
+        total = sum(u.cost for u in models.values())
+        self.logger.info(
+            f"OpenAI usage ({elapsed:.0f}s window) | ${total:.6f}\n" + "\n".join(lines)
+        )
+
+
+_aggregators: "weakref.WeakKeyDictionary[Any, UsageAggregator]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def usage_aggregator(logger: Any, window_s: Optional[float] = None) -> UsageAggregator:
+    """Return the usage aggregator shared by every OpenAI patch for ``logger``."""
+    agg = _aggregators.get(logger)
+    if agg is None:
+        agg = _aggregators[logger] = UsageAggregator(logger, window_s or 60.0)
+    elif window_s is not None:
+        agg.window_s = window_s
+    return agg
+
+
+def stop_usage_aggregator(logger: Any) -> None:
+    """Stop the aggregator for ``logger``, if any, emitting its last window."""
+    agg = _aggregators.pop(logger, None)
+    if agg is not None:
+        agg.stop()
+
+
+# ---------------------------------------------------------------------------
+# Call observation
+# ---------------------------------------------------------------------------
+
+
+class _Call:
+    """Timing and token accounting for a single (possibly streamed) completion."""
+
+    __slots__ = (
+        "logger",
+        "agg",
+        "log_calls",
+        "model",
+        "start",
+        "first_token",
+        "output",
+    )
 
-        if getattr(openai, "_fast_logger_plugin_patched", False):
+    def __init__(
+        self, logger: Any, agg: UsageAggregator, log_calls: bool, model: str
+    ) -> None:
+        self.logger = logger
+        self.agg = agg
+        self.log_calls = log_calls
+        self.model = model
+        self.start = time.perf_counter()
+        self.first_token: Optional[float] = None
+        self.output = 0  # streamed content deltas, ~1 token each
+
+    def finish(self, usage: Any) -> None:
+        end = time.perf_counter()
+        elapsed = (end - self.start) * 1000
+        if usage is not None:
+            input_tok, output_tok = usage.prompt_tokens, usage.completion_tokens
+        else:
+            input_tok, output_tok = 0, self.output
+        self.agg.record(self.model, input_tok, output_tok, elapsed)
+        if not self.log_calls:
             return
 
-        import time
+        stream = ""
+        if self.first_token is not None:
+            gen_s = end - self.first_token
+            rate = output_tok / gen_s if gen_s > 0 else 0.0
+            stream = (
+                f" | ttft={(self.first_token - self.start) * 1000:.0f}ms"
+                f" {rate:.1f} tok/s"
+            )
+        if usage is not None or self.first_token is not None:
+            cost = _estimate_cost(self.model, input_tok, output_tok)
+            self.logger.info(
+                f"OpenAI {self.model} | "
+                f"in={input_tok} out={output_tok} tokens | "
+                f"${cost:.6f} | {elapsed:.0f}ms{stream}"
+            )
+        else:
+            self.logger.info(f"OpenAI {self.model} | {elapsed:.0f}ms")
+
+    def fail(self, exc: BaseException) -> None:
+        elapsed = (time.perf_counter() - self.start) * 1000
+        self.agg.record(self.model, 0, self.output, elapsed, error=True)
+        self.logger.error(f"OpenAI {self.model} FAILED ({elapsed:.0f}ms): {exc}")
+
+    def on_chunk(self, chunk: Any) -> Any:
+        """Inspect a streamed chunk; returns the final usage block if present."""
+        for choice in getattr(chunk, "choices", None) or ():
+            delta = getattr(choice, "delta", None)
+            if delta is not None and getattr(delta, "content", None):
+                if self.first_token is None:
+                    self.first_token = time.perf_counter()
+                self.output += 1
+        return getattr(chunk, "usage", None)
+
+
+class _StreamProxy:
+    """Wraps a sync ``Stream`` so the call is finalised when iteration ends."""
+
+    def __init__(self, stream: Any, call: _Call) -> None:
+        self._stream = stream
+        self._call = call
+        self._usage: Any = None
+        self._done = False
 
-        # Patch chat completions (v1+ API)
+    def __iter__(self) -> "_StreamProxy":
+        return self
+
+    def __next__(self) -> Any:
         try:
-            original_create = openai.chat.completions.create
-
-            def patched_chat_create(*args: Any, **kwargs: Any) -> Any:
-                model = kwargs.get("model", "unknown")
-                start = time.perf_counter()
-                try:
-                    response = original_create(*args, **kwargs)
-                    elapsed = (time.perf_counter() - start) * 1000
-                    usage = getattr(response, "usage", None)
-                    if usage:
-                        input_tok = usage.prompt_tokens
-                        output_tok = usage.completion_tokens
-                        cost = _estimate_cost(model, input_tok, output_tok)
-                        logger.info(
-                            f"OpenAI {model} | "
-                            f"in={input_tok} out={output_tok} tokens | "
-                            f"${cost:.6f} | {elapsed:.0f}ms"
-                        )
-                    else:
-                        logger.info(f"OpenAI {model} | {elapsed:.0f}ms")
-                    return response
-                except Exception as e:
-                    elapsed = (time.perf_counter() - start) * 1000
-                    logger.error(f"OpenAI {model} FAILED ({elapsed:.0f}ms): {e}")
-                    raise
-
-            openai.chat.completions.create = patched_chat_create  # type: ignore
-        except AttributeError:
-            pass  # older openai SDK
-
-        setattr(openai, "_fast_logger_plugin_patched", True)
+            chunk = next(self._stream)
+        except StopIteration:
+            self._finish()
+            raise
+        except Exception as e:
+            self._done = True
+            self._call.fail(e)
+            raise
+        self._usage = self._call.on_chunk(chunk) or self._usage
+        return chunk
+
+    def _finish(self) -> None:
+        if not self._done:
+            self._done = True
+            self._call.finish(self._usage)
+
+    def close(self) -> None:
+        self._finish()
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            close()
+
+    def __enter__(self) -> "_StreamProxy":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+class _AsyncStreamProxy(_StreamProxy):
+    """Async counterpart of :class:`_StreamProxy` for ``AsyncStream``."""
+
+    def __aiter__(self) -> "_AsyncStreamProxy":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            chunk = await self._stream.__anext__()
+        except StopAsyncIteration:
+            self._finish()
+            raise
+        except Exception as e:
+            self._done = True
+            self._call.fail(e)
+            raise
+        self._usage = self._call.on_chunk(chunk) or self._usage
+        return chunk
+
+    async def aclose(self) -> None:
+        self._finish()
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+
+    async def __aenter__(self) -> "_AsyncStreamProxy":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+
+def _wrap_create(
+    original: Callable[..., Any],
+    logger: Any,
+    agg: UsageAggregator,
+    log_calls: bool,
+    is_async: bool,
+) -> Callable[..., Any]:
+    if is_async:
+
+        async def patched_async_create(*args: Any, **kwargs: Any) -> Any:
+            call = _Call(logger, agg, log_calls, kwargs.get("model", "unknown"))
+            try:
+                response = await original(*args, **kwargs)
+            except Exception as e:
+                call.fail(e)
+                raise
+            if kwargs.get("stream"):
+                return _AsyncStreamProxy(response, call)
+            call.finish(getattr(response, "usage", None))
+            return response
+
+        return patched_async_create
+
+    def patched_chat_create(*args: Any, **kwargs: Any) -> Any:
+        call = _Call(logger, agg, log_calls, kwargs.get("model", "unknown"))
+        try:
+            response = original(*args, **kwargs)
+        except Exception as e:
+            call.fail(e)
+            raise
+        if kwargs.get("stream"):
+            return _StreamProxy(response, call)
+        call.finish(getattr(response, "usage", None))
+        return response
+
+    return patched_chat_create
+
+
+def _is_async_client(client: Any, create: Callable[..., Any]) -> bool:
+    # The SDK wraps create() in a plain-def decorator, so look through __wrapped__.
+    return inspect.iscoroutinefunction(inspect.unwrap(create)) or type(
+        client
+    ).__name__.startswith("Async")
+
+
+def patch_openai(
+    logger: Any,
+    client: Any = None,
+    window_s: Optional[float] = None,
+    log_calls: bool = True,
+) -> None:
+    """Log model, tokens, latency, and cost for every chat completion.
+
+    Args:
+        logger:    FastLogger instance.
+        client:    ``OpenAI`` or ``AsyncOpenAI`` instance to patch. When omitted,
+                   the module-level ``openai.chat.completions.create`` is patched.
+        window_s:  Length of the usage summary window in seconds (default 60).
+        log_calls: Emit one line per call; set ``False`` to rely on the
+                   windowed summaries only.
+    """
+    # The aggregator and its timer only exist once something is patched.
+    if client is not None:
+        if getattr(client, "_fast_logger_plugin_patched", False):
+            return
+        agg = usage_aggregator(logger, window_s)
+        completions = client.chat.completions
+        original = completions.create
+        is_async = _is_async_client(client, original)
+        completions.create = _wrap_create(original, logger, agg, log_calls, is_async)
+        setattr(client, "_fast_logger_plugin_patched", True)
+        agg.start()
         logger.info(
-            "Plugin 'openai' active: Monkey-patched openai.chat.completions.create"
+            f"Plugin 'openai' active: Patched {type(client).__name__} client instance"
         )
+        return
+
+    try:
+        import openai
     except ImportError:
         logger.warning("Plugin 'openai' failed: 'openai' library not found.")
+        return
+
+    if getattr(openai, "_fast_logger_plugin_patched", False):
+        return
+
+    # Patch chat completions (v1+ API)
+    try:
+        original_create = openai.chat.completions.create
+    except AttributeError:
+        original_create = None  # older openai SDK
+    if original_create is not None:
+        agg = usage_aggregator(logger, window_s)
+        openai.chat.completions.create = _wrap_create(  # type: ignore
+            original_create, logger, agg, log_calls, is_async=False
+        )
+        agg.start()
+
+    setattr(openai, "_fast_logger_plugin_patched", True)
+    logger.info("Plugin 'openai' active: Monkey-patched openai.chat.completions.create")
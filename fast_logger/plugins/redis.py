@@ -4,6 +4,8 @@ from __future__ import annotations
 
 from typing import Any
 
+from ._stats import PluginMetrics
+
 
 def patch_redis(client: Any, logger: Any) -> None:
     """Wrap a Redis client's execute_command to log every command with latency."""
@@ -16,6 +18,7 @@ def patch_redis(client: Any, logger: Any) -> None:
         import time
 
         original_execute = client.execute_command
+        metrics = PluginMetrics(logger, "redis")
 
         def patched_execute(*args: Any, **kwargs: Any) -> Any:
             cmd = " ".join(str(a) for a in args)
@@ -23,10 +26,12 @@ def patch_redis(client: Any, logger: Any) -> None:
             try:
                 result = original_execute(*args, **kwargs)
                 elapsed = (time.perf_counter() - start) * 1000
+                metrics.observe(elapsed)
                 logger.debug(f"Redis {cmd} → {elapsed:.1f}ms")
                 return result
             except Exception as e:
                 elapsed = (time.perf_counter() - start) * 1000
+                metrics.observe(elapsed, error=True)
                 logger.error(f"Redis {cmd} FAILED ({elapsed:.1f}ms): {e}")
                 raise
 
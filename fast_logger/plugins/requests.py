@@ -1,6 +1,8 @@
 from typing import Any
 import time
 
+from ._stats import PluginMetrics
+
 
 def patch(logger: Any) -> None:
     try:
@@ -10,12 +12,18 @@ def patch(logger: Any) -> None:
             return
 
         original_request = requests.Session.request
+        metrics = PluginMetrics(logger, "requests")
 
         def patched_request(self: Any, method: str, url: str, **kwargs: Any) -> Any:
             logger.debug(f"Request: {method} {url}")
             start_time = time.perf_counter()
-            response = original_request(self, method, url, **kwargs)
+            try:
+                response = original_request(self, method, url, **kwargs)
+            except Exception:
+                metrics.observe((time.perf_counter() - start_time) * 1000, error=True)
+                raise
             elapsed = (time.perf_counter() - start_time) * 1000
+            metrics.observe(elapsed, error=response.status_code >= 500)
 
             logger.http(response, level="DEBUG")
             logger.debug(f"Response: {response.status_code} (took {elapsed:.2f}ms)")
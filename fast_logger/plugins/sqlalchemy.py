@@ -1,12 +1,16 @@
 from typing import Any
 import time
 
+from ._stats import PluginMetrics
+
 
 def patch(logger: Any) -> None:
     try:
         from sqlalchemy import event  # type: ignore
         from sqlalchemy.engine import Engine  # type: ignore
 
+        metrics = PluginMetrics(logger, "sqlalchemy")
+
         @event.listens_for(Engine, "before_cursor_execute")
         def before_cursor_execute(
             conn: Any,
@@ -33,6 +37,7 @@ def patch(logger: Any) -> None:
                 return
             start_time = times.pop(-1)
             elapsed = (time.perf_counter() - start_time) * 1000
+            metrics.observe(elapsed)
             logger.debug(f"Query executed in {elapsed:.2f}ms")
 
         logger.info(
@@ -0,0 +1,181 @@
+"""WSGI plugin for FastLogger — one structured access record per request.
+
+Wrap any WSGI callable (Flask, Django's WSGIHandler, Falcon, bare functions)::
+
+    app = logger.patch_wsgi(app, sample_2xx=0.1)
+
+The middleware times the full response, including iteration of a streamed
+body, publishes the correlation id in the same ContextVar the FastAPI
+middleware uses, and folds DB-API query totals into the access record.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+import uuid
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from ..fastapi import request_id_ctx_var
+from ._stats import PluginMetrics, RequestStats, request_stats_ctx_var
+
+
+class _Exchange:
+    """Per-request state carried from ``__call__`` to the end of the body."""
+
+    __slots__ = (
+        "req_id",
+        "method",
+        "path",
+        "start",
+        "status",
+        "nbytes",
+        "stats",
+        "id_token",
+        "stats_token",
+        "error",
+    )
+
+    def __init__(self, environ: dict[str, Any], req_id: str) -> None:
+        self.req_id = req_id
+        self.method = environ.get("REQUEST_METHOD", "GET")
+        self.path = environ.get("SCRIPT_NAME", "") + environ.get("PATH_INFO", "")
+        self.start = time.perf_counter()
+        self.status = 0
+        self.nbytes = 0
+        self.stats = RequestStats()
+        self.id_token = request_id_ctx_var.set(req_id)
+        self.stats_token = request_stats_ctx_var.set(self.stats)
+        self.error: Optional[BaseException] = None
+
+
+class _ResponseBody:
+    """Iterable wrapper that counts body bytes and logs when the server closes it."""
+
+    __slots__ = ("_iterable", "_mw", "_ex", "_done")
+
+    def __init__(
+        self, iterable: Iterable[bytes], mw: "FastLoggerWSGIMiddleware", ex: _Exchange
+    ) -> None:
+        self._iterable = iterable
+        self._mw = mw
+        self._ex = ex
+        self._done = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        ex = self._ex
+        try:
+            for chunk in self._iterable:
+                ex.nbytes += len(chunk)
+                yield chunk
+        except Exception as exc:
+            ex.error = exc
+            raise
+
+    def close(self) -> None:
+        if self._done:
+            return
+        self._done = True
+        try:
+            close = getattr(self._iterable, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._mw._finish(self._ex)
+
+
+class FastLoggerWSGIMiddleware:
+    """WSGI middleware emitting one access record per request.
+
+    Args:
+        app:        The WSGI application to wrap.
+        logger:     FastLogger instance.
+        sample_2xx: Fraction of 2xx responses to log (others are always logged).
+        header:     Request/response header carrying the correlation id.
+    """
+
+    def __init__(
+        self,
+        app: Callable[..., Any],
+        logger: Any,
+        sample_2xx: float = 1.0,
+        header: str = "X-Request-ID",
+    ) -> None:
+        self.app = app
+        self.logger = logger
+        self.sample_2xx = sample_2xx
+        self.header = header
+        self._environ_key = "HTTP_" + header.upper().replace("-", "_")
+        self.metrics = PluginMetrics(logger, "wsgi")
+
+    def __call__(
+        self, environ: dict[str, Any], start_response: Callable[..., Any]
+    ) -> Iterable[bytes]:
+        ex = _Exchange(environ, environ.get(self._environ_key) or uuid.uuid4().hex[:8])
+        header = self.header
+
+        def _start_response(
+            status: str, headers: list[tuple[str, str]], exc_info: Any = None
+        ) -> Any:
+            ex.status = int(status[:3])
+            headers.append((header, ex.req_id))
+            return start_response(status, headers, exc_info)
+
+        try:
+            iterable = self.app(environ, _start_response)
+        except Exception as exc:
+            ex.error = exc
+            self._finish(ex)
+            raise
+        return _ResponseBody(iterable, self, ex)
+
+    def _finish(self, ex: _Exchange) -> None:
+        elapsed = (time.perf_counter() - ex.start) * 1000
+        self.metrics.observe(elapsed, ex.error is not None or ex.status >= 500)
+        try:
+            self._log(ex, elapsed)
+        finally:
+            try:
+                request_stats_ctx_var.reset(ex.stats_token)
+                request_id_ctx_var.reset(ex.id_token)
+            except ValueError:
+                pass  # body closed from a different context than __call__
+
+    def _log(self, ex: _Exchange, elapsed: float) -> None:
+        status = ex.status
+        if ex.error is not None:
+            self.logger.error(
+                f"[{ex.req_id}] ✗ {ex.method} {ex.path} EXCEPTION "
+                f"{type(ex.error).__name__}: {ex.error} ({elapsed:.1f}ms)"
+                f"{ex.stats.summary()}"
+            )
+            return
+        if 200 <= status < 300 and self.sample_2xx < 1.0:
+            if self.sample_2xx <= 0.0 or random.random() >= self.sample_2xx:
+                return
+        level = "info" if status < 400 else ("warning" if status < 500 else "error")
+        self.logger._log(
+            level,
+            f"[{ex.req_id}] → {ex.method} {ex.path} {status} ({elapsed:.1f}ms)"
+            f"{ex.stats.summary()}",
+            extra={
+                "http_method": ex.method,
+                "http_path": ex.path,
+                "http_status": status,
+                "duration_ms": round(elapsed, 3),
+                "response_bytes": ex.nbytes,
+                **ex.stats.as_extra(),
+            },
+        )
+
+
+def patch_wsgi(
+    app: Callable[..., Any], logger: Any, **options: Any
+) -> FastLoggerWSGIMiddleware:
+    """Wrap a WSGI application in :class:`FastLoggerWSGIMiddleware`.
+
+    Idempotent: an already wrapped app is returned unchanged.
+    """
+    if isinstance(app, FastLoggerWSGIMiddleware):
+        return app
+    return FastLoggerWSGIMiddleware(app, logger, **options)
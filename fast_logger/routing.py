@@ -0,0 +1,718 @@
+"""
+fast_logger.routing
+~~~~~~~~~~~~~~~~~~~
+Route records to named sinks, formatting each record once per format.
+
+A :class:`Router` is a :class:`logging.Handler`. For every record it walks
+its :class:`Route` rules (level range, logger name, field predicates),
+collects the matching :class:`Sink` objects and runs each distinct formatter
+at most once. The encoded bytes are handed to every sink using that format,
+so a JSON file and a JSON socket share one ``json.dumps`` and one
+``encode``.
+
+Each sink owns a bounded queue and a writer thread. The router only formats
+and enqueues, so a slow socket or a blocked pipe delays that sink alone
+until its queue fills; then the caller waits, or, for sinks created with
+``overflow="drop"``, the record is dropped and reported. The writer drains
+whatever is queued and writes it as one ``write`` call; WARNING and above
+travel in a priority lane that overtakes the backlog.
+Only the formatting runs under the router's handler lock, so a thread
+waiting on a full sink does not hold up records bound for other sinks.
+``async_safe`` loggers run their file and console handlers as
+:class:`HandlerSink` objects behind the same router.
+
+Writers are tiny objects with ``write(data: bytes)`` and ``close()``:
+
+* :class:`FileWriter` — append-only file with optional size rotation
+* :class:`StreamWriter` — ``sys.stdout`` and other text streams
+* :class:`SocketWriter` — newline-delimited TCP, reconnecting on error
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import os
+import socket
+import sys
+import threading
+from collections import deque
+from heapq import merge
+from logging.handlers import QueueHandler
+from operator import itemgetter
+from time import monotonic
+from typing import Any, Callable, Iterable, Optional, Union
+
+_STOP = object()
+_MISSING = object()
+
+
+def record_field(record: logging.LogRecord, key: str, default: Any = None) -> Any:
+    """A field of ``record``: ``extra``/bound fields, then contextualize()."""
+    value = record.__dict__.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+    node = record.__dict__.get("fl_context")
+    if node is not None:
+        return node.merged.get(key, default)
+    return default
+
+
+# ---------------------------------------------------------------------------
+# Writers
+# ---------------------------------------------------------------------------
+
+
+class FileWriter:
+    """Append bytes to a file, rotating at ``max_bytes`` like RotatingFileHandler.
+
+    Rotation keeps ``backup_count`` files (``path.1`` is the newest) and only
+    happens when both ``max_bytes`` and ``backup_count`` are set.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, "os.PathLike[str]"],
+        max_bytes: int = 0,
+        backup_count: int = 0,
+    ) -> None:
+        self.path = os.fspath(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+
+    def write(self, data: bytes) -> None:
+        if (
+            self.max_bytes
+            and self.backup_count
+            and self._size
+            and self._size + len(data) > self.max_bytes
+        ):
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, "ab")
+        self._size = 0
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __repr__(self) -> str:
+        return f"FileWriter({self.path!r})"
+
+
+class StreamWriter:
+    """Write to a text stream, through its binary buffer when it has one."""
+
+    def __init__(self, stream: Any) -> None:
+        self.stream = stream
+
+    def write(self, data: bytes) -> None:
+        stream = self.stream
+        buffer = getattr(stream, "buffer", None)
+        if buffer is not None:
+            stream.flush()  # keep order with text already written
+            buffer.write(data)
+            buffer.flush()
+        else:
+            stream.write(data.decode("utf-8", "replace"))
+            stream.flush()
+
+    def close(self) -> None:
+        if self.stream not in (sys.stdout, sys.stderr):
+            self.stream.close()
+
+    def __repr__(self) -> str:
+        return f"StreamWriter({getattr(self.stream, 'name', self.stream)!r})"
+
+
+class SocketWriter:
+    """Send newline-delimited records over TCP.
+
+    The connection is opened on the first write. A failed send closes it and
+    raises; the next batch reconnects.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 5.0) -> None:
+        self.address = (host, port)
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+
+    def write(self, data: bytes) -> None:
+        if self._sock is None:
+            self._sock = socket.create_connection(self.address, self.timeout)
+        try:
+            self._sock.sendall(data)
+        except OSError:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __repr__(self) -> str:
+        return f"SocketWriter({self.address[0]}:{self.address[1]})"
+
+
+def make_writer(target: Any, **options: Any) -> Any:
+    """Writer for ``target``: a path, a ``(host, port)`` pair or a stream.
+
+    Objects that already have ``write(bytes)`` and ``close()`` and are not
+    text streams (no ``encoding``) are used as they are.
+    """
+    if isinstance(target, (str, os.PathLike)):
+        return FileWriter(target, **options)
+    if isinstance(target, tuple):
+        host, port = target
+        return SocketWriter(host, port, **options)
+    if hasattr(target, "encoding"):
+        return StreamWriter(target)
+    if hasattr(target, "write") and hasattr(target, "close"):
+        return target
+    raise TypeError(f"unsupported sink target: {target!r}")
+
+
+# ---------------------------------------------------------------------------
+# Sinks and routes
+# ---------------------------------------------------------------------------
+
+
+class Sink:
+    """A named destination with its own bounded queue and writer thread.
+
+    Records of ``priority_level`` and above go to a separate lane that the
+    writer empties before every batch, so an error overtakes a backlog of
+    DEBUG/INFO output and is written after at most one batch. Each lane
+    holds up to ``maxsize`` records. When a lane is full, ``overflow``
+    decides: ``"block"`` waits for the writer to make room, ``"drop"``
+    discards the record and counts it. Drops are also passed to ``report``
+    (the router logs a WARNING), at most once per ``report_interval`` seconds.
+
+    With ``metrics`` (a :class:`~fast_logger.metrics.MetricsRegistry`) the
+    sink records ``sink.lag.<name>`` (ms from enqueue to write, per batch)
+    and ``sink.lag.<name>.priority``, and exports
+    ``fastlogger_sink_queue_depth``, ``fastlogger_sink_lag_ms`` and
+    ``fastlogger_sink_dropped_total`` labelled with the sink name.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        writer: Any,
+        format_key: Any,
+        batch: int = 256,
+        maxsize: int = 10_000,
+        priority_level: int = logging.WARNING,
+        metrics: Any = None,
+        overflow: str = "block",
+        report_interval: float = 10.0,
+    ) -> None:
+        if overflow not in ("block", "drop"):
+            raise ValueError(f"overflow must be 'block' or 'drop', not {overflow!r}")
+        self.name = name
+        self.writer = writer
+        self.format_key = format_key
+        self.batch = batch
+        self.maxsize = maxsize
+        self.priority_level = priority_level
+        self.overflow = overflow
+        self.report: Optional[Callable[["Sink", int], None]] = None
+        self.report_interval = report_interval
+        self.records = 0
+        self.bytes = 0
+        self.errors = 0
+        self.dropped = 0
+        self._reported = 0
+        self._next_report = 0.0
+        self._urgent: deque[tuple[float, Any]] = deque()
+        self._normal: deque[tuple[float, Any]] = deque()
+        self._wake = threading.Event()
+        self._space = threading.Event()
+        self._lag: Optional[str] = None
+        self._lag_priority: Optional[str] = None
+        self._drops: Any = None
+        if metrics is not None:
+            self._lag = f"sink.lag.{name}"
+            self._lag_priority = f"sink.lag.{name}.priority"
+            self._drops = metrics.counter(
+                "fastlogger_sink_dropped_total",
+                "Records dropped because a sink queue was full.",
+                sink=name,
+            )
+            # Assigned rather than passed, so a sink replacing one of the
+            # same name takes its gauges over.
+            metrics.gauge(
+                "fastlogger_sink_queue_depth",
+                "Records waiting in a sink queue.",
+                sink=name,
+            ).fn = self.pending
+            metrics.gauge(
+                "fastlogger_sink_lag_ms",
+                "Age of the oldest record waiting in a sink queue.",
+                sink=name,
+            ).fn = self.lag_ms
+        self._metrics = metrics
+        self._thread = threading.Thread(
+            target=self._run, name=f"fast_logger-sink-{name}", daemon=True
+        )
+        self._thread.start()
+
+    def put(self, item: Any, levelno: int = logging.INFO) -> bool:
+        """Queue ``item``; ``False`` if its lane is full and it was dropped."""
+        lane = self._urgent if levelno >= self.priority_level else self._normal
+        if len(lane) >= self.maxsize and not self._wait_for_space(lane):
+            self.dropped += 1
+            if self._drops is not None:
+                self._drops.inc()
+            return False
+        lane.append((monotonic(), item))
+        # The writer clears the event before draining, so a set event means
+        # this item will be seen.
+        if not self._wake.is_set():
+            self._wake.set()
+        return True
+
+    def _wait_for_space(self, lane: deque[tuple[float, Any]]) -> bool:
+        """Block until ``lane`` has room; ``False`` if the record must be dropped."""
+        thread = self._thread
+        # The writer thread itself (a handler logging) must never wait on itself.
+        if self.overflow == "drop" or thread is threading.current_thread():
+            return False
+        space = self._space
+        while len(lane) >= self.maxsize:
+            if not thread.is_alive():
+                return False
+            space.clear()
+            if len(lane) < self.maxsize:
+                break
+            space.wait(0.1)
+        return True
+
+    def pending(self) -> int:
+        return len(self._urgent) + len(self._normal)
+
+    def fill(self) -> float:
+        """How full the fuller lane is, from 0.0 to 1.0."""
+        return max(len(self._urgent), len(self._normal)) / self.maxsize
+
+    def lag_ms(self) -> float:
+        """How long the oldest waiting record has been queued."""
+        oldest = [lane[0][0] for lane in (self._urgent, self._normal) if lane]
+        return (monotonic() - min(oldest)) * 1000 if oldest else 0.0
+
+    def _take(self, lane: deque[tuple[float, Any]]) -> list[tuple[float, Any]]:
+        popleft = lane.popleft
+        chunk: list[tuple[float, Any]] = []
+        try:
+            while len(chunk) < self.batch:
+                chunk.append(popleft())
+        except IndexError:
+            pass
+        return chunk
+
+    def _run(self) -> None:
+        urgent, normal, wake = self._urgent, self._normal, self._wake
+        space = self._space
+        metrics = self._metrics
+        while True:
+            if not urgent and not normal:
+                # Wake up for a pending drop report even if nothing arrives.
+                timeout = None
+                if self.report is not None and self.dropped != self._reported:
+                    timeout = max(0.0, self._next_report - monotonic())
+                wake.wait(timeout)
+            wake.clear()
+            while urgent or normal:
+                # Priority records jump the queue only when there is a backlog
+                # of more than one batch; otherwise both lanes are merged by
+                # enqueue time and the output keeps its order.
+                first = self._take(urgent)
+                overtake = first and len(normal) > self.batch
+                rest = [] if overtake else self._take(normal)
+                space.set()
+                now = monotonic()
+                if metrics is not None:
+                    if first:
+                        metrics.histogram(self._lag_priority).record(
+                            (now - first[0][0]) * 1000
+                        )
+                    if rest:
+                        metrics.histogram(self._lag).record((now - rest[0][0]) * 1000)
+                if first and rest:
+                    chunk = list(merge(first, rest, key=itemgetter(0)))
+                else:
+                    chunk = first or rest
+                items: list[Any] = []
+                markers: list[threading.Event] = []
+                stop = False
+                for _, item in chunk:
+                    if item is _STOP:
+                        stop = True
+                    elif item.__class__ is threading.Event:
+                        markers.append(item)
+                    else:
+                        items.append(item)
+                if items:
+                    self._write(items)
+                if markers or stop:
+                    # Only one batch of the urgent lane went out with this
+                    # chunk; the rest was queued before the marker too.
+                    while urgent:
+                        self._write([item for _, item in self._take(urgent)])
+                        space.set()
+                for marker in markers:
+                    marker.set()
+                if stop:
+                    self._finish()
+                    return
+            self._report_drops()
+
+    def _report_drops(self) -> None:
+        dropped = self.dropped
+        if dropped == self._reported or self.report is None:
+            return
+        now = monotonic()
+        if now < self._next_report:
+            return
+        self._next_report = now + self.report_interval
+        count, self._reported = dropped - self._reported, dropped
+        try:
+            self.report(self, count)
+        except Exception:
+            pass
+
+    def _write(self, chunk: list[bytes]) -> None:
+        data = b"".join(chunk)
+        try:
+            self.writer.write(data)
+        except Exception:
+            self.errors += len(chunk)
+            return
+        self.records += len(chunk)
+        self.bytes += len(data)
+
+    def _finish(self) -> None:
+        self.writer.close()
+
+    def _control(self, item: Any) -> None:
+        self._normal.append((monotonic(), item))
+        self._wake.set()
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Wait until everything queued so far is written."""
+        if not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._control(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Write what is queued, then stop the thread and close the writer."""
+        if self._thread.is_alive():
+            self._control(_STOP)
+            self._thread.join(timeout)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "records": self.records,
+            "bytes": self.bytes,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "pending": self.pending(),
+            "lag_ms": self.lag_ms(),
+        }
+
+    def __repr__(self) -> str:
+        return f"Sink({self.name!r}, {self.writer!r})"
+
+
+class HandlerSink(Sink):
+    """Sink that hands records to a :class:`logging.Handler` on its own thread.
+
+    Used for the file and console handlers of ``async_safe`` loggers, so a
+    slow console pipe no longer holds up file writes. The handler formats
+    on the writer thread and is flushed, not closed, when the sink stops.
+    Its ``format`` is wrapped to count the bytes it produces.
+    """
+
+    def __init__(
+        self, handler: logging.Handler, name: Optional[str] = None, **options: Any
+    ) -> None:
+        from .pipeline import sink_name
+
+        super().__init__(name or sink_name(handler), handler, None, **options)
+        original_format = handler.format
+        terminator = len(getattr(handler, "terminator", ""))
+        last: list[Any] = [None]
+
+        def counted_format(record: logging.LogRecord) -> str:
+            text = original_format(record)
+            # RotatingFileHandler formats once more in shouldRollover().
+            if record is not last[0]:
+                last[0] = record
+                self.bytes += len(text.encode("utf-8", "replace")) + terminator
+            return text
+
+        handler.format = counted_format  # type: ignore[method-assign]
+
+    def _write(self, chunk: list[logging.LogRecord]) -> None:
+        handle = self.writer.handle
+        for record in chunk:
+            handle(record)
+        self.records += len(chunk)
+
+    def _finish(self) -> None:
+        self.writer.flush()
+
+    def __repr__(self) -> str:
+        return f"HandlerSink({self.name!r})"
+
+
+class SinkQueue:
+    """Queue facade that lets a :class:`QueueHandler` feed a :class:`Router`.
+
+    ``put_nowait`` routes the prepared record straight into the per-sink
+    queues; ``qsize`` is the total backlog across sinks.
+    """
+
+    def __init__(self, router: "Router") -> None:
+        self.router = router
+
+    def put_nowait(self, record: logging.LogRecord) -> None:
+        self.router.handle(record)
+
+    put = put_nowait
+
+    def qsize(self) -> int:
+        return sum(sink.pending() for sink in self.router.sinks.values())
+
+
+class SinkQueueHandler(QueueHandler):
+    """:class:`QueueHandler` that passes records to a :class:`SinkQueue` unrendered.
+
+    The stock ``prepare`` formats the record and clears ``exc_info`` so it
+    can be pickled. Records fed to a :class:`SinkQueue` stay in-process and
+    every sink formats them itself, so only the arguments are merged into
+    the message; the exception and stack stay on the record for the sink's
+    formatter.
+    """
+
+    def handle(self, record: logging.LogRecord) -> Any:
+        # Sinks lock their own queues; without the handler lock here a full
+        # sink holds up only the threads logging to it.
+        rv = self.filter(record)
+        if isinstance(rv, logging.LogRecord):
+            record = rv
+        if rv:
+            self.emit(record)
+        return rv
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        record = copy.copy(record)
+        record.message = record.msg = message
+        record.args = None
+        return record
+
+
+def _field_predicate(fields: dict[str, Any]) -> Callable[[logging.LogRecord], bool]:
+    """Predicate for ``{field: value}``; a callable value tests the field value."""
+    tests = tuple(
+        (key, expected if callable(expected) else expected.__eq__)
+        for key, expected in fields.items()
+    )
+
+    def matches(record: logging.LogRecord) -> bool:
+        for key, test in tests:
+            value = record_field(record, key, _MISSING)
+            if value is _MISSING or not test(value):
+                return False
+        return True
+
+    return matches
+
+
+class Route:
+    """Send records matching every given condition to ``sinks``.
+
+    ``level``/``max_level`` bound the level, ``loggers`` matches a logger
+    name or any child of it (``"sqlalchemy"`` covers ``"sqlalchemy.engine"``)
+    and ``when`` is either a ``record -> bool`` callable or a dict of field
+    values (a callable value is applied to the field).
+    """
+
+    __slots__ = ("sinks", "level", "max_level", "loggers", "when")
+
+    def __init__(
+        self,
+        sinks: Iterable[str],
+        level: int = logging.NOTSET,
+        max_level: int = logging.CRITICAL,
+        loggers: Iterable[str] = (),
+        when: Union[None, dict[str, Any], Callable[[logging.LogRecord], Any]] = None,
+    ) -> None:
+        self.sinks = tuple(sinks)
+        self.level = level
+        self.max_level = max_level
+        self.loggers = tuple(loggers)
+        self.when = _field_predicate(when) if isinstance(when, dict) else when
+
+    def matches(self, record: logging.LogRecord) -> bool:
+        if not self.level <= record.levelno <= self.max_level:
+            return False
+        if self.loggers:
+            name = record.name
+            for prefix in self.loggers:
+                if name == prefix or name.startswith(prefix + "."):
+                    break
+            else:
+                return False
+        return self.when is None or bool(self.when(record))
+
+    def __repr__(self) -> str:
+        return f"Route({', '.join(self.sinks)}, level={self.level})"
+
+
+class Router(logging.Handler):
+    """Handler that formats once per format and fans the bytes out to sinks.
+
+    ``formatters`` maps a format key (``"text"``, ``"json"``, ...) to a
+    :class:`logging.Formatter`; each :class:`Sink` names the key it uses.
+    Sinks with no key (:class:`HandlerSink`) get the record itself.
+    """
+
+    def __init__(self, formatters: Optional[dict[Any, logging.Formatter]] = None):
+        super().__init__()
+        self.formatters: dict[Any, logging.Formatter] = dict(formatters or {})
+        self.sinks: dict[str, Sink] = {}
+        self.routes: list[Route] = []
+        self._table: tuple[tuple[Route, tuple[Sink, ...]], ...] = ()
+
+    def add_sink(self, sink: Sink) -> Sink:
+        if sink.format_key is not None and sink.format_key not in self.formatters:
+            raise KeyError(f"no formatter for {sink.format_key!r}")
+        if sink.report is None:
+            sink.report = self._report_drops
+        previous = self.sinks.get(sink.name)
+        self.sinks[sink.name] = sink
+        self._compile()
+        if previous is not None:
+            previous.close()
+        return sink
+
+    def remove_sink(self, name: str) -> Optional[Sink]:
+        """Detach the sink ``name`` and its routes; its queue is written first."""
+        sink = self.sinks.pop(name, None)
+        if sink is None:
+            return None
+        self.routes = [route for route in self.routes if route.sinks != (name,)]
+        self._compile()
+        sink.close()
+        return sink
+
+    def add_route(self, route: Route) -> Route:
+        unknown = [name for name in route.sinks if name not in self.sinks]
+        if unknown:
+            raise KeyError(f"unknown sink(s): {', '.join(unknown)}")
+        self.routes.append(route)
+        self._compile()
+        return route
+
+    def _compile(self) -> None:
+        # Replaced as a whole, so emit() never sees a half-updated table.
+        sinks = self.sinks
+        self._table = tuple(
+            (route, tuple(sinks[name] for name in route.sinks if name in sinks))
+            for route in self.routes
+        )
+
+    def handle(self, record: logging.LogRecord) -> Any:
+        # emit() takes the lock only to format; see there.
+        rv = self.filter(record)
+        if isinstance(rv, logging.LogRecord):
+            record = rv
+        if rv:
+            self.emit(record)
+        return rv
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            # Formatters run under the handler lock, but the records are
+            # queued after it is released: a full sink makes the threads
+            # logging to it wait without blocking records for other sinks.
+            with self.lock:
+                deliveries = self._encode(record)
+            levelno = record.levelno
+            for sink, item in deliveries:
+                sink.put(item, levelno)
+        except Exception:
+            self.handleError(record)
+
+    def _encode(self, record: logging.LogRecord) -> list[tuple[Sink, Any]]:
+        """The matching sinks, each with the bytes (or record) it receives."""
+        encoded: dict[Any, bytes] = {}
+        deliveries: list[tuple[Sink, Any]] = []
+        sent: set[Sink] = set()
+        for route, sinks in self._table:
+            if not route.matches(record):
+                continue
+            for sink in sinks:
+                if sink in sent:
+                    continue
+                sent.add(sink)
+                key = sink.format_key
+                if key is None:
+                    deliveries.append((sink, record))
+                    continue
+                data = encoded.get(key)
+                if data is None:
+                    text = self.formatters[key].format(record) + "\n"
+                    data = encoded[key] = text.encode("utf-8", "replace")
+                deliveries.append((sink, data))
+        return deliveries
+
+    def _report_drops(self, sink: Sink, count: int) -> None:
+        """Log dropped records as a WARNING, routed like any other record."""
+        record = logging.LogRecord(
+            "fast_logger.routing",
+            logging.WARNING,
+            __file__,
+            0,
+            "Sink %r dropped %d records because its queue was full",
+            (sink.name, count),
+            None,
+        )
+        record.sink = sink.name
+        record.dropped = count
+        self.handle(record)
+
+    def flush(self) -> None:
+        for sink in list(self.sinks.values()):
+            sink.flush()
+
+    def close(self) -> None:
+        for sink in list(self.sinks.values()):
+            sink.close()
+        super().close()
+
+    def handlers(self) -> list[logging.Handler]:
+        """Handlers behind :class:`HandlerSink` sinks."""
+        return [s.writer for s in self.sinks.values() if isinstance(s, HandlerSink)]
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {name: sink.stats() for name, sink in self.sinks.items()}
@@ -0,0 +1,391 @@
+"""
+fast_logger.runtime
+~~~~~~~~~~~~~~~~~~~
+Instrumentation of the interpreter itself.
+
+:class:`GCInstrumentation` times garbage collections through
+``gc.callbacks``. A collection can start inside any allocation, including
+one made while this thread holds a metrics or logging lock, so the
+callback itself only timestamps and pushes onto a
+:class:`queue.SimpleQueue` (which is reentrant). A small daemon thread
+turns those events into histograms, counters and pause alerts.
+
+:class:`LoopMonitor` watches an asyncio event loop for blocking code: a
+sentinel task measures scheduling lag and a watchdog thread captures the
+loop thread's stack while it is stuck.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gc
+import logging
+import sys
+import threading
+import time
+import traceback
+import weakref
+from queue import SimpleQueue
+from typing import Any, Optional
+
+from .fastapi import request_id_ctx_var
+
+_STOP = None  # queue sentinel
+
+
+class GCInstrumentation:
+    """Per-generation GC pause histograms, counters and slow-pause alerts.
+
+    Recorded in the logger's :class:`~fast_logger.metrics.MetricsRegistry`:
+
+    * ``gc.pause.gen0`` .. ``gc.pause.gen2`` — pause histograms (ms)
+    * ``fastlogger_gc_collections_total{generation}``
+    * ``fastlogger_gc_collected_total{generation}``
+    * ``fastlogger_gc_uncollectable_total{generation}``
+
+    Pauses of at least ``threshold_ms`` are logged with the correlation id
+    of the request that was running when the collection started.
+    """
+
+    def __init__(
+        self, logger: Any, threshold_ms: Optional[float] = 50.0, level: str = "WARNING"
+    ) -> None:
+        self.logger = logger
+        self.threshold_ms = threshold_ms
+        self.level = level.lower()
+        self._start = 0.0
+        self._events: SimpleQueue[Optional[tuple[Any, ...]]] = SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._series: dict[int, tuple[Any, Any, Any]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._callback in gc.callbacks
+
+    def enable(self) -> None:
+        if self.enabled:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="fast-logger-gc", daemon=True
+        )
+        self._thread.start()
+        gc.callbacks.append(self._callback)
+
+    def disable(self, timeout: Optional[float] = 5.0) -> None:
+        if self._callback in gc.callbacks:
+            gc.callbacks.remove(self._callback)
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._events.put(_STOP)
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def _callback(self, phase: str, info: dict[str, Any]) -> None:
+        if phase == "start":
+            self._start = time.perf_counter()
+            return
+        self._events.put(
+            (
+                info["generation"],
+                (time.perf_counter() - self._start) * 1000,
+                info["collected"],
+                info["uncollectable"],
+                request_id_ctx_var.get(),
+                threading.current_thread().name,
+            )
+        )
+
+    def _counters(self, generation: int) -> tuple[Any, Any, Any]:
+        series = self._series.get(generation)
+        if series is None:
+            registry = self.logger.metrics
+            gen = str(generation)
+            series = self._series[generation] = (
+                registry.counter(
+                    "fastlogger_gc_collections_total",
+                    "Garbage collections per generation.",
+                    generation=gen,
+                ),
+                registry.counter(
+                    "fastlogger_gc_collected_total",
+                    "Objects collected per generation.",
+                    generation=gen,
+                ),
+                registry.counter(
+                    "fastlogger_gc_uncollectable_total",
+                    "Uncollectable objects found per generation.",
+                    generation=gen,
+                ),
+            )
+        return series
+
+    def _run(self) -> None:
+        events = self._events
+        while True:
+            event = events.get()
+            if event is _STOP:
+                return
+            self.observe(*event)
+
+    def observe(
+        self,
+        generation: int,
+        pause_ms: float,
+        collected: int,
+        uncollectable: int,
+        correlation_id: str = "",
+        thread: str = "",
+    ) -> None:
+        """Record one finished collection (called from the worker thread)."""
+        collections, collected_total, uncollectable_total = self._counters(generation)
+        collections.inc()
+        collected_total.inc(collected)
+        uncollectable_total.inc(uncollectable)
+        self.logger.metrics.record(f"gc.pause.gen{generation}", pause_ms)
+        if self.threshold_ms is None or pause_ms < self.threshold_ms:
+            return
+        extra: dict[str, Any] = {
+            "gc_generation": generation,
+            "gc_pause_ms": round(pause_ms, 3),
+            "gc_collected": collected,
+            "gc_uncollectable": uncollectable,
+            "gc_thread": thread,
+        }
+        if correlation_id:
+            extra["correlation_id"] = correlation_id
+        self.logger._log(
+            self.level,
+            f"GC pause gen{generation} {pause_ms:.1f} ms "
+            f"(collected {collected}, uncollectable {uncollectable}) in {thread}",
+            extra=extra,
+        )
+
+    def stats(self) -> dict[str, Any]:
+        """Per-generation totals and the current pause-histogram window."""
+        snap = self.logger.metrics.snapshot()
+        out: dict[str, Any] = {
+            "enabled": self.enabled,
+            "thresholds": gc.get_threshold(),
+            "counts": gc.get_count(),
+        }
+        for generation in range(3):
+            collections, collected, uncollectable = self._counters(generation)
+            out[f"gen{generation}"] = {
+                "collections": collections.value,
+                "collected": collected.value,
+                "uncollectable": uncollectable.value,
+                "pause_ms": snap.get(f"gc.pause.gen{generation}", {"count": 0}),
+            }
+        return out
+
+
+_gc_instrumentation: Optional[GCInstrumentation] = None
+
+
+def set_gc_instrumentation(instrumentation: Optional[GCInstrumentation]) -> None:
+    """Install the process-wide GC instrumentation, disabling the old one."""
+    global _gc_instrumentation
+    previous, _gc_instrumentation = _gc_instrumentation, instrumentation
+    if previous is not None and previous is not instrumentation:
+        previous.disable()
+
+
+def gc_instrumentation() -> Optional[GCInstrumentation]:
+    return _gc_instrumentation
+
+
+class _SlowCallbackFilter(logging.Filter):
+    """Turns asyncio's debug-mode "Executing ... took" warnings into records."""
+
+    def __init__(self, monitor: "LoopMonitor") -> None:
+        super().__init__()
+        self.monitor = monitor
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        monitor = self.monitor
+        if (
+            record.thread != monitor.loop_thread
+            or not isinstance(record.msg, str)
+            or not record.msg.startswith("Executing %s took")
+            or not isinstance(record.args, tuple)
+            or len(record.args) != 2
+        ):
+            return True
+        handle, seconds = record.args
+        monitor.slow_callback(str(handle), float(seconds) * 1000)
+        return False  # handled; keep it off stderr
+
+
+class LoopMonitor:
+    """Loop-lag histogram, stall stacks and slow callbacks for one event loop.
+
+    * A sentinel task sleeps ``interval_ms`` at a time; how late it wakes up
+      is recorded as ``asyncio.lag`` in ``logger.metrics`` (reported in the
+      periodic metrics summary) and lags of ``threshold_ms`` or more are
+      logged.
+    * A watchdog thread notices when the sentinel has not run for
+      ``interval_ms + threshold_ms`` and logs the loop thread's stack from
+      ``sys._current_frames()`` while the blocking code is still running,
+      once per stall.
+    * With ``slow_callbacks=True`` the loop runs in debug mode with
+      ``slow_callback_duration = threshold_ms``; asyncio's warnings are
+      taken off the ``asyncio`` logger and recorded as
+      ``asyncio.slow_callback`` plus a structured record. Debug mode has a
+      noticeable cost of its own, so it is off by default.
+    """
+
+    def __init__(
+        self,
+        logger: Any,
+        loop: asyncio.AbstractEventLoop,
+        threshold_ms: float = 100.0,
+        interval_ms: float = 50.0,
+        slow_callbacks: bool = False,
+        capture_stack: bool = True,
+        level: str = "WARNING",
+    ) -> None:
+        self.logger = logger
+        self.loop = loop
+        self.threshold_ms = threshold_ms
+        self.interval_s = interval_ms / 1000
+        self.slow_callbacks = slow_callbacks
+        self.capture_stack = capture_stack
+        self.level = level.lower()
+        self.loop_thread: Optional[int] = None
+        self.max_lag_ms = 0.0
+        self.total_lag_ms = 0.0
+        self._heartbeat = time.monotonic()
+        self._stalled = False
+        self._task: Optional[asyncio.Task[None]] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+        self._filter: Optional[_SlowCallbackFilter] = None
+        self._saved_debug: Optional[tuple[bool, float]] = None
+        self.stalls = logger.metrics.counter(
+            "fastlogger_asyncio_stalls_total",
+            "Event loop stalls caught by the watchdog.",
+        )
+
+    def start(self) -> None:
+        loop = self.loop
+        if self.slow_callbacks:
+            self._saved_debug = (loop.get_debug(), loop.slow_callback_duration)
+            loop.slow_callback_duration = self.threshold_ms / 1000
+            self._filter = _SlowCallbackFilter(self)
+            logging.getLogger("asyncio").addFilter(self._filter)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._start_in_loop()
+        else:
+            loop.call_soon_threadsafe(self._start_in_loop)
+
+    def _start_in_loop(self) -> None:
+        self.loop_thread = threading.get_ident()
+        if self.slow_callbacks:
+            self.loop.set_debug(True)
+        self._heartbeat = time.monotonic()
+        self._task = self.loop.create_task(self._sentinel(), name="fast-logger-lag")
+        if self.capture_stack:
+            self._watchdog = threading.Thread(
+                target=self._watch, name="fast-logger-loop-watchdog", daemon=True
+            )
+            self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        task, self._task = self._task, None
+        if task is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(task.cancel)
+        if self._filter is not None:
+            logging.getLogger("asyncio").removeFilter(self._filter)
+            self._filter = None
+        if self._saved_debug is not None and not self.loop.is_closed():
+            debug, duration = self._saved_debug
+            self.loop.call_soon_threadsafe(self.loop.set_debug, debug)
+            self.loop.slow_callback_duration = duration
+            self._saved_debug = None
+        watchdog, self._watchdog = self._watchdog, None
+        if watchdog is not None and watchdog is not threading.current_thread():
+            watchdog.join(1.0)
+
+    def lag_so_far(self) -> float:
+        """Total lag recorded (ms), plus the stall in progress if there is one."""
+        pending = time.monotonic() - self._heartbeat - self.interval_s
+        return self.total_lag_ms + max(0.0, pending * 1000)
+
+    async def _sentinel(self) -> None:
+        loop = self.loop
+        interval = self.interval_s
+        record = self.logger.metrics.record
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self._heartbeat = time.monotonic()
+            self._stalled = False
+            record("asyncio.lag", lag_ms)
+            self.total_lag_ms += lag_ms
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+            if lag_ms >= self.threshold_ms:
+                self.logger._log(
+                    self.level,
+                    f"Event loop lag {lag_ms:.1f} ms",
+                    extra={"loop_lag_ms": round(lag_ms, 3)},
+                )
+
+    def _watch(self) -> None:
+        limit = self.interval_s + self.threshold_ms / 1000
+        period = max(0.005, min(self.interval_s, self.threshold_ms / 1000) / 2)
+        while not self._stop.wait(period):
+            blocked = time.monotonic() - self._heartbeat
+            if blocked < limit or self._stalled:
+                continue
+            self._stalled = True
+            self.stalls.inc()
+            frame = sys._current_frames().get(self.loop_thread or 0)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            task = asyncio.current_task(self.loop) if frame else None
+            extra: dict[str, Any] = {"loop_blocked_ms": round(blocked * 1000, 1)}
+            if task is not None:
+                extra["task"] = task.get_name()
+            self.logger._log(
+                self.level,
+                f"Event loop blocked for {blocked * 1000:.0f} ms"
+                + (f" in task {task.get_name()}" if task is not None else "")
+                + f"; loop thread stack:\n{stack}",
+                extra=extra,
+            )
+
+    def slow_callback(self, handle: str, duration_ms: float) -> None:
+        self.logger.metrics.record("asyncio.slow_callback", duration_ms)
+        self.logger._log(
+            self.level,
+            f"Slow asyncio callback {duration_ms:.1f} ms: {handle}",
+            extra={"callback": handle, "duration_ms": round(duration_ms, 3)},
+        )
+
+
+_loop_monitors: "weakref.WeakKeyDictionary[Any, LoopMonitor]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def set_loop_monitor(loop: Any, monitor: Optional[LoopMonitor]) -> None:
+    """Install ``monitor`` for ``loop``, stopping the one it replaces."""
+    previous = _loop_monitors.pop(loop, None)
+    if monitor is not None:
+        _loop_monitors[loop] = monitor
+    if previous is not None and previous is not monitor:
+        previous.stop()
+
+
+def loop_monitors() -> list[LoopMonitor]:
+    return list(_loop_monitors.values())
+
+
+def loop_monitor(loop: Any) -> Optional[LoopMonitor]:
+    return _loop_monitors.get(loop)
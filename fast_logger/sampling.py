@@ -0,0 +1,422 @@
+"""
+fast_logger.sampling
+~~~~~~~~~~~~~~~~~~~~
+Statistical stack sampling built on ``sys._current_frames()``.
+
+A timer thread periodically reads the stacks of the threads it is
+interested in and folds each one into a ``root;caller;leaf`` string. The
+folded stacks are counted in a bounded :class:`StackTable`, which renders
+them as collapsed-stack text (the input format of ``flamegraph.pl``,
+speedscope and friends) or as a top-N table of the hottest functions.
+
+Nothing here traces calls: the cost is a few frame walks per interval,
+independent of how often the profiled code runs. :class:`SamplingProfile`
+backs ``@profile(mode="sampling")``; :class:`BackgroundSampler` is the
+process-wide sampler behind ``logger.start_sampler()``.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import random
+import sys
+import threading
+import time
+from functools import lru_cache
+from types import CodeType, FrameType
+from typing import Any, Optional
+
+OTHER = "[other]"  # bucket for new stacks once a table is full
+
+
+@lru_cache(maxsize=4096)
+def frame_label(code: CodeType) -> str:
+    """``qualname (file.py:firstline)`` — one label per function, not per line."""
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def fold_stack(
+    frame: Optional[FrameType],
+    stop_code: Optional[CodeType] = None,
+    max_depth: int = 128,
+) -> Optional[str]:
+    """Fold ``frame`` and its callers into ``root;...;leaf``.
+
+    With ``stop_code`` the walk ends at (and includes) the first frame running
+    that code object; if no such frame is on the stack, ``None`` is returned.
+    """
+    labels = []
+    found = stop_code is None
+    while frame is not None and len(labels) < max_depth:
+        code = frame.f_code
+        labels.append(frame_label(code))
+        if code is stop_code:
+            found = True
+            break
+        frame = frame.f_back
+    if not found or not labels:
+        return None
+    labels.reverse()
+    return ";".join(labels)
+
+
+def jittered(interval_s: float) -> float:
+    """Randomise a sampling period by ±50%.
+
+    A fixed period phase-locks with the interpreter's GIL switch interval
+    and with periodic workloads, and then samples the same spot every time.
+    """
+    return interval_s * random.uniform(0.5, 1.5)
+
+
+class StackTable:
+    """Thread-safe, bounded counts of folded stacks.
+
+    At most ``max_stacks`` distinct stacks are kept; once full, samples of
+    unseen stacks are counted under ``[other]`` so memory stays fixed.
+    """
+
+    def __init__(self, max_stacks: int = 10_000) -> None:
+        self.max_stacks = max(1, max_stacks)
+        self.samples = 0
+        self._stacks: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stack: str, count: int = 1) -> None:
+        with self._lock:
+            stacks = self._stacks
+            if stack not in stacks and len(stacks) >= self.max_stacks:
+                stack = OTHER
+            stacks[stack] = stacks.get(stack, 0) + count
+            self.samples += count
+
+    def stacks(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._stacks)
+
+    def collapsed(self) -> str:
+        """Collapsed-stack text: one ``root;...;leaf count`` line per stack."""
+        return "".join(
+            f"{stack} {count}\n"
+            for stack, count in sorted(self.stacks().items(), key=lambda kv: -kv[1])
+        )
+
+    def top(self, n: int = 10) -> list[tuple[str, int, int]]:
+        """Return ``(function, self_samples, total_samples)`` for the hottest ``n``.
+
+        Self samples count stacks where the function is the leaf; total
+        samples count stacks where it appears anywhere (once per stack).
+        """
+        own: dict[str, int] = {}
+        total: dict[str, int] = {}
+        for stack, count in self.stacks().items():
+            frames = stack.split(";")
+            own[frames[-1]] = own.get(frames[-1], 0) + count
+            for label in set(frames):
+                total[label] = total.get(label, 0) + count
+        ranked = sorted(total, key=lambda k: (own.get(k, 0), total[k]), reverse=True)
+        return [(label, own.get(label, 0), total[label]) for label in ranked[:n]]
+
+    def format_top(self, n: int = 10) -> str:
+        samples = self.samples or 1
+        lines = ["   self%  total%  function"]
+        for label, own, total in self.top(n):
+            lines.append(
+                f"  {own * 100 / samples:5.1f}%  {total * 100 / samples:5.1f}%  {label}"
+            )
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    def __len__(self) -> int:
+        return len(self._stacks)
+
+
+class SamplingProfile:
+    """Aggregate sampling profile for one ``@profile(mode="sampling")`` function.
+
+    Calls register their thread as active; a daemon thread samples only
+    active threads every ``interval_ms`` and keeps the part of the stack
+    from the decorated function down. The thread parks while no call is
+    running. Samples from all calls accumulate in one :class:`StackTable`;
+    a report is logged every ``report_interval_s`` seconds (checked when a
+    call returns) or on demand with :meth:`emit`.
+
+    The sampler needs the GIL to read stacks, so against CPU-bound code it
+    cannot sample faster than ``sys.getswitchinterval()`` (5ms by default).
+    """
+
+    def __init__(
+        self,
+        logger: Any,
+        name: str,
+        code: CodeType,
+        interval_ms: float = 5.0,
+        report_interval_s: Optional[float] = 60.0,
+        top: int = 10,
+        level: str = "INFO",
+        max_stacks: int = 10_000,
+    ) -> None:
+        self.logger = logger
+        self.name = name
+        self.code = code
+        self.interval_s = max(interval_ms, 0.1) / 1000
+        self.report_interval_s = report_interval_s
+        self.top_n = top
+        self.level = level.lower()
+        self.table = StackTable(max_stacks)
+        self.calls = 0
+        self._active: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._next_report = (
+            time.monotonic() + report_interval_s if report_interval_s else math.inf
+        )
+
+    def enter(self) -> None:
+        tid = threading.get_ident()
+        with self._lock:
+            self._active[tid] = self._active.get(tid, 0) + 1
+            self.calls += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name=f"fast-logger-profile-{self.name}",
+                    daemon=True,
+                )
+                self._thread.start()
+        self._wake.set()
+
+    def exit(self) -> None:
+        tid = threading.get_ident()
+        with self._lock:
+            depth = self._active.get(tid, 1) - 1
+            if depth:
+                self._active[tid] = depth
+            else:
+                self._active.pop(tid, None)
+            if not self._active:
+                self._wake.clear()
+            due = time.monotonic() >= self._next_report
+            if due:
+                self._next_report = (
+                    time.monotonic() + self.report_interval_s
+                    if self.report_interval_s
+                    else math.inf
+                )
+        if due:
+            self.emit()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            self._wake.wait()
+            time.sleep(jittered(self.interval_s))
+            with self._lock:
+                active = list(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for tid in active:
+                if tid == me:
+                    continue
+                stack = fold_stack(frames.get(tid), self.code)
+                if stack is not None:
+                    self.table.add(stack)
+
+    def collapsed(self) -> str:
+        return self.table.collapsed()
+
+    def report(self) -> str:
+        return (
+            f"Sampling profile for {self.name}: {self.table.samples} samples "
+            f"({self.interval_s * 1000:g}ms) over {self.calls} calls\n"
+            + self.table.format_top(self.top_n)
+        )
+
+    def emit(self) -> None:
+        """Log the top-N table for everything sampled so far."""
+        if self.table.samples:
+            self.logger._log(self.level, self.report())
+
+    def reset(self) -> None:
+        self.table.clear()
+        with self._lock:
+            self.calls = 0
+
+
+# Leaf frames of threads parked in the stdlib; skipped unless include_idle.
+_IDLE_LEAVES = frozenset(
+    {
+        ("threading.py", "wait"),
+        ("threading.py", "_wait_for_tstate_lock"),
+        ("queue.py", "get"),
+        ("selectors.py", "select"),
+        ("socket.py", "accept"),
+        ("socketserver.py", "serve_forever"),
+    }
+)
+
+
+def _is_idle(frame: FrameType) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES
+
+
+class BackgroundSampler:
+    """Continuous, process-wide stack sampler.
+
+    A daemon thread samples every thread's stack ``hz`` times a second
+    (jittered) into a :class:`StackTable`. Every ``report_interval_s``
+    seconds, and on :meth:`stop`, the window is written to
+    ``<log dir>/<name>.<timestamp>.collapsed``, a top-N hotspot record is
+    logged and the table is cleared. Only the newest ``keep_files`` files
+    are kept.
+
+    Threads whose innermost frame is a stdlib wait (``Condition.wait``,
+    ``Queue.get``, ``select``) are skipped unless ``include_idle`` is set,
+    so idle pools do not drown out the threads doing work.
+    """
+
+    def __init__(
+        self,
+        logger: Any,
+        hz: float = 20.0,
+        report_interval_s: float = 60.0,
+        top: int = 20,
+        level: str = "INFO",
+        max_stacks: int = 10_000,
+        keep_files: int = 24,
+        include_idle: bool = False,
+    ) -> None:
+        self.logger = logger
+        self.interval_s = 1.0 / max(hz, 0.1)
+        self.report_interval_s = max(report_interval_s, 1.0)
+        self.top_n = top
+        self.level = level.lower()
+        self.keep_files = keep_files
+        self.include_idle = include_idle
+        self.table = StackTable(max_stacks)
+        self.files: list[str] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._window_start = time.time()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running and not self._stop.is_set():
+            return
+        # A fresh event per run: a thread still writing its last window after
+        # stop() keeps its own (set) event and exits on its own.
+        self._stop = threading.Event()
+        self._window_start = time.time()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(self._stop,),
+            name="fast-logger-sampler",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop sampling; the sampler thread writes the last window on its way out.
+
+        ``timeout=0`` returns without waiting (used from signal handlers).
+        """
+        thread = self._thread
+        self._stop.set()
+        if thread is None or timeout == 0 or thread is threading.current_thread():
+            return
+        thread.join(timeout)
+
+    def toggle(self) -> None:
+        if self.running and not self._stop.is_set():
+            self.stop(timeout=0)
+        else:
+            self.start()
+
+    def install_signal(self, signum: int) -> None:
+        """Toggle sampling when ``signum`` arrives (main thread only)."""
+        import signal
+
+        signal.signal(signum, lambda *_: self.toggle())
+
+    def _run(self, stop: threading.Event) -> None:
+        me = threading.get_ident()
+        deadline = time.monotonic() + self.report_interval_s
+        while not stop.wait(jittered(self.interval_s)):
+            self.sample(skip=me)
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.report_interval_s
+                self.flush()
+        self.flush()
+
+    def sample(self, skip: Optional[int] = None) -> None:
+        """Take one sample of every thread except ``skip``."""
+        for tid, frame in sys._current_frames().items():
+            if tid == skip or (not self.include_idle and _is_idle(frame)):
+                continue
+            stack = fold_stack(frame)
+            if stack is not None:
+                self.table.add(stack)
+
+    def report(self) -> str:
+        elapsed = time.time() - self._window_start
+        return (
+            f"Sampler hotspots: {self.table.samples} samples over {elapsed:.1f}s "
+            f"({1 / self.interval_s:g} Hz)\n" + self.table.format_top(self.top_n)
+        )
+
+    def flush(self) -> Optional[str]:
+        """Write and log the current window, then start a new one.
+
+        Returns the path of the collapsed file, or ``None`` if nothing was
+        sampled.
+        """
+        if not self.table.samples:
+            self._window_start = time.time()
+            return None
+        directory = self.logger._get_log_directory()
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = directory / f"{self.logger.name}.{stamp}.collapsed"
+        n = 1
+        while path.exists():
+            n += 1
+            path = directory / f"{self.logger.name}.{stamp}-{n}.collapsed"
+        path.write_text(self.table.collapsed(), encoding="utf-8")
+        self.logger._log(self.level, f"{self.report()}\nCollapsed stacks: {path}")
+        self.table.clear()
+        self._window_start = time.time()
+        self.files.append(str(path))
+        while len(self.files) > self.keep_files > 0:
+            try:
+                os.remove(self.files.pop(0))
+            except OSError:
+                pass
+        return str(path)
+
+
+_process_sampler: Optional[BackgroundSampler] = None
+_process_lock = threading.Lock()
+
+
+def set_process_sampler(sampler: Optional[BackgroundSampler]) -> None:
+    """Install ``sampler`` as the single process-wide sampler, stopping the old one."""
+    global _process_sampler
+    with _process_lock:
+        previous, _process_sampler = _process_sampler, sampler
+    if previous is not None and previous is not sampler:
+        previous.stop()
+
+
+def process_sampler() -> Optional[BackgroundSampler]:
+    return _process_sampler
@@ -0,0 +1,202 @@
+"""
+fast_logger.shedding
+~~~~~~~~~~~~~~~~~~~~
+Adaptive load shedding: raise a logger's level while its sinks fall behind.
+
+A :class:`LoadShedder` thread samples the logger's sink queues every
+``interval`` seconds, reading two signals:
+
+* fill — how full the fullest sink lane is (0.0 to 1.0 of
+  ``sink_queue_size``)
+* lag — the write latency, i.e. how long the oldest queued record has
+  waited
+
+When either signal is at or above its high mark and still growing, the
+effective level moves one step up the ladder (DEBUG → INFO → WARNING, capped
+at ``max_level``). The logger only steps back down once both signals have
+stayed at or under their low marks for ``cooldown_s``. Each step down needs
+another full cooldown, so a pipeline that keeps hovering near the limit does
+not flap between levels.
+
+The level is set on the underlying :class:`logging.Logger`.
+``FastLogger._log`` checks ``isEnabledFor`` before it merges context or
+masks secrets, and that check is a cached dict lookup which ``setLevel``
+invalidates, so a shed record costs one lookup. Every change is logged as a
+WARNING (or at the new level, if higher) with ``shed_*`` fields. The change
+is also counted in ``fastlogger_level_changes_total``, and the current level
+is exported as the ``fastlogger_effective_level`` gauge.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Optional
+
+_LADDER = (
+    logging.DEBUG,
+    logging.INFO,
+    logging.WARNING,
+    logging.ERROR,
+    logging.CRITICAL,
+)
+
+
+class LoadShedder:
+    """Background thread moving a logger's level with its sink backlog."""
+
+    def __init__(
+        self,
+        logger: Any,
+        router: Any,
+        max_level: int = logging.WARNING,
+        high_water: float = 0.5,
+        low_water: float = 0.1,
+        high_lag_ms: float = 500.0,
+        low_lag_ms: float = 50.0,
+        interval: float = 0.25,
+        cooldown_s: float = 5.0,
+    ) -> None:
+        self.logger = logger
+        self.router = router
+        self.base_level = logger.level
+        self.ladder = [self.base_level] + [
+            level for level in _LADDER if self.base_level < level <= max_level
+        ]
+        self.step = 0
+        self.high_water = high_water
+        self.low_water = low_water
+        self.high_lag_ms = high_lag_ms
+        self.low_lag_ms = low_lag_ms
+        self.interval = interval
+        self.cooldown_s = cooldown_s
+        self.changes = 0
+        self._last = (0.0, 0.0)
+        self._calm_since: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        metrics = logger.metrics
+        self._raised = metrics.counter(
+            "fastlogger_level_changes_total",
+            "Effective level changes made by load shedding.",
+            logger=logger.name,
+            direction="up",
+        )
+        self._lowered = metrics.counter(
+            "fastlogger_level_changes_total",
+            "Effective level changes made by load shedding.",
+            logger=logger.name,
+            direction="down",
+        )
+        metrics.gauge(
+            "fastlogger_effective_level",
+            "Level records must reach, raised while shedding load.",
+            logger=logger.name,
+        ).fn = lambda: self.level
+
+    @property
+    def level(self) -> int:
+        return self.ladder[self.step]
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="fast-logger-load-shedder", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop watching and restore the configured level."""
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+            self._thread = None
+        if self.step:
+            self._set(0, "stopped", *self._last)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def pressure(self) -> tuple[float, float]:
+        """Fill of the fullest sink lane and the longest sink lag in ms."""
+        sinks = list(self.router.sinks.values())
+        if not sinks:
+            return 0.0, 0.0
+        return max(s.fill() for s in sinks), max(s.lag_ms() for s in sinks)
+
+    def check(self, now: Optional[float] = None) -> int:
+        """Sample the sinks once and move the level if needed; returns it."""
+        now = time.monotonic() if now is None else now
+        fill, lag = self.pressure()
+        last_fill, last_lag = self._last
+        self._last = (fill, lag)
+        behind = (fill >= self.high_water and fill >= last_fill) or (
+            lag >= self.high_lag_ms and lag >= last_lag
+        )
+        if behind:
+            self._calm_since = None
+            if self.step < len(self.ladder) - 1:
+                self._set(self.step + 1, "behind", fill, lag)
+        elif fill <= self.low_water and lag <= self.low_lag_ms:
+            if self._calm_since is None:
+                self._calm_since = now
+            elif self.step and now - self._calm_since >= self.cooldown_s:
+                self._calm_since = now
+                self._set(self.step - 1, "recovered", fill, lag)
+        else:
+            self._calm_since = None
+        return self.level
+
+    def _set(self, step: int, reason: str, fill: float, lag: float) -> None:
+        previous = self.level
+        self.step = step
+        level = self.level
+        inner = self.logger._logger
+        if inner is not None:
+            inner.setLevel(level)
+        self.changes += 1
+        (self._raised if level > previous else self._lowered).inc()
+        old, new = logging.getLevelName(previous), logging.getLevelName(level)
+        notice = max(level, logging.WARNING)
+        self.logger._log(
+            logging.getLevelName(notice).lower(),
+            f"Load shedding: level {old} -> {new} ({reason}; "
+            f"queue {fill:.0%} full, lag {lag:.0f}ms)",
+            extra={
+                "shed_level": new,
+                "shed_previous_level": old,
+                "shed_reason": reason,
+                "queue_fill": round(fill, 3),
+                "queue_lag_ms": round(lag, 1),
+            },
+        )
+
+
+_shedders: dict[str, LoadShedder] = {}
+
+
+def set_load_shedder(name: str, shedder: Optional[LoadShedder]) -> None:
+    """Install ``shedder`` for the logger ``name``, stopping the one it replaces."""
+    previous = _shedders.pop(name, None)
+    if shedder is not None:
+        _shedders[name] = shedder
+    if previous is not None and previous is not shedder:
+        previous.stop()
+
+
+def load_shedder(name: str) -> Optional[LoadShedder]:
+    return _shedders.get(name)
+
+
+def load_shedders() -> list[LoadShedder]:
+    return list(_shedders.values())
@@ -0,0 +1,310 @@
+"""
+fast_logger.spans
+~~~~~~~~~~~~~~~~~
+A small, dependency-free span tracer.
+
+Spans carry 128-bit trace ids and 64-bit span ids; the active span lives in
+a :class:`~contextvars.ContextVar`, so nesting follows ``with`` blocks and
+is inherited by asyncio tasks. Sampling is decided once per trace at the
+root span and inherited by its children. Finished spans go into a bounded
+ring buffer and can be written as Chrome Trace Event JSON (open it in
+Perfetto or ``chrome://tracing``) or as an OTLP/JSON
+``ExportTraceServiceRequest``.
+
+The unsampled path allocates nothing: a root span that loses the sampling
+roll enters a shared scope that only marks the context as unsampled, and
+its children return a shared no-op scope.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Optional, Union
+
+_UNSAMPLED: Any = object()  # context marker for a trace that lost the roll
+
+_current: ContextVar[Any] = ContextVar("fast_logger_span", default=None)
+
+
+class Span:
+    """One finished or in-progress operation."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "status",
+        "thread_id",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: int,
+        span_id: int,
+        parent_id: int,
+        attributes: Optional[dict[str, Any]],
+    ) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attributes = attributes if attributes is not None else {}
+        self.status = ""  # "" (unset), "ok" or "error: <message>"
+        self.thread_id = threading.get_ident()
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6 if self.end_ns else 0.0
+
+    @property
+    def trace_hex(self) -> str:
+        return f"{self.trace_id:032x}"
+
+    @property
+    def span_hex(self) -> str:
+        return f"{self.span_id:016x}"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def set_status(self, status: str) -> None:
+        self.status = status
+
+    def __repr__(self) -> str:
+        return f"<Span {self.name} {self.trace_hex}/{self.span_hex}>"
+
+
+class NoopSpan:
+    """Stand-in yielded for unsampled spans; every method does nothing."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes: Any) -> None:
+        pass
+
+    def set_status(self, status: str) -> None:
+        pass
+
+    def __bool__(self) -> bool:
+        return False
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class _NoopScope:
+    """Scope for children of an unsampled trace: the marker is already set."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> NoopSpan:
+        return NOOP_SPAN
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+class _UnsampledRootScope:
+    """Scope for an unsampled root: only ever entered with no span active."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> NoopSpan:
+        _current.set(_UNSAMPLED)
+        return NOOP_SPAN
+
+    def __exit__(self, *exc: Any) -> None:
+        _current.set(None)
+
+
+_NOOP_SCOPE = _NoopScope()
+_UNSAMPLED_ROOT = _UnsampledRootScope()
+
+
+class _SpanScope:
+    __slots__ = ("tracer", "span", "token")
+
+    def __init__(self, tracer: "Tracer", span: Span) -> None:
+        self.tracer = tracer
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        span = self.span
+        span.end_ns = time.time_ns()
+        if exc is not None:
+            span.status = f"error: {exc_type.__name__}: {exc}"
+            span.attributes["exception.type"] = exc_type.__name__
+        _current.reset(self.token)
+        self.tracer._finish(span)
+
+
+def current_span() -> Optional[Span]:
+    """The active sampled span in this context, if any."""
+    span = _current.get()
+    return span if isinstance(span, Span) else None
+
+
+class Tracer:
+    """Creates spans and keeps the last ``capacity`` finished ones."""
+
+    def __init__(
+        self, service_name: str, sample_rate: float = 1.0, capacity: int = 10_000
+    ) -> None:
+        self.service_name = service_name
+        self.sample_rate = sample_rate
+        self.enabled = False
+        self.dropped = 0
+        self.buffer: deque[Span] = deque(maxlen=max(1, capacity))
+        self._random = random.random
+        self._bits = random.getrandbits
+
+    def configure(self, sample_rate: float, capacity: int) -> None:
+        self.sample_rate = sample_rate
+        if capacity != self.buffer.maxlen:
+            self.buffer = deque(self.buffer, maxlen=max(1, capacity))
+
+    def span(
+        self, name: str, attributes: Optional[dict[str, Any]] = None
+    ) -> Union[_SpanScope, _NoopScope, _UnsampledRootScope]:
+        """Return a context manager for a span named ``name``."""
+        parent = _current.get()
+        if parent is None:
+            rate = self.sample_rate
+            if rate < 1.0 and (rate <= 0.0 or self._random() >= rate):
+                return _UNSAMPLED_ROOT
+            span = Span(name, self._bits(128) or 1, self._bits(64) or 1, 0, attributes)
+        elif parent is _UNSAMPLED:
+            return _NOOP_SCOPE
+        else:
+            span = Span(
+                name, parent.trace_id, self._bits(64) or 1, parent.span_id, attributes
+            )
+        return _SpanScope(self, span)
+
+    def _finish(self, span: Span) -> None:
+        buffer = self.buffer
+        if len(buffer) == buffer.maxlen:
+            self.dropped += 1
+        buffer.append(span)
+
+    def spans(self, clear: bool = False) -> list[Span]:
+        """Finished spans, oldest first; ``clear=True`` empties the buffer."""
+        if not clear:
+            return list(self.buffer)
+        out = []
+        buffer = self.buffer
+        while True:
+            try:
+                out.append(buffer.popleft())
+            except IndexError:
+                return out
+
+    # -- export ---------------------------------------------------------------
+
+    def export_chrome_trace(self, path: str, clear: bool = True) -> str:
+        """Write finished spans as Chrome Trace Event JSON; returns ``path``."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(chrome_trace(self.spans(clear)), f, default=str)
+        return path
+
+    def export_otlp_json(self, path: str, clear: bool = True) -> str:
+        """Write finished spans as one OTLP/JSON request; returns ``path``."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(otlp_json(self.spans(clear), self.service_name), f)
+        return path
+
+
+def chrome_trace(spans: list[Span]) -> dict[str, Any]:
+    """Chrome Trace Event format: one complete ("X") event per span."""
+    pid = os.getpid()
+    events = []
+    for span in spans:
+        args = dict(span.attributes)
+        args["trace_id"] = span.trace_hex
+        args["span_id"] = span.span_hex
+        if span.parent_id:
+            args["parent_id"] = f"{span.parent_id:016x}"
+        if span.status:
+            args["status"] = span.status
+        events.append(
+            {
+                "name": span.name,
+                "cat": "span",
+                "ph": "X",
+                "ts": span.start_ns / 1000,
+                "dur": max(span.end_ns - span.start_ns, 0) / 1000,
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": args,
+            }
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}  # int64 is a string in OTLP/JSON
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()]
+
+
+def otlp_json(spans: list[Span], service_name: str) -> dict[str, Any]:
+    """OTLP/JSON ``ExportTraceServiceRequest`` for ``spans``."""
+    out = []
+    for span in spans:
+        item: dict[str, Any] = {
+            "traceId": span.trace_hex,
+            "spanId": span.span_hex,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": _otlp_attributes(span.attributes),
+        }
+        if span.parent_id:
+            item["parentSpanId"] = f"{span.parent_id:016x}"
+        if span.status.startswith("error"):
+            item["status"] = {"code": 2, "message": span.status[7:]}
+        elif span.status == "ok":
+            item["status"] = {"code": 1}
+        out.append(item)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": _otlp_attributes({"service.name": service_name})
+                },
+                "scopeSpans": [{"scope": {"name": "fast_logger"}, "spans": out}],
+            }
+        ]
+    }
@@ -1,13 +1,31 @@
 """
 Timeline Gantt Chart Generator for fast-logger.
 Run with: python -m fast_logger.timeline <path_to_json_log>
+
+``logger.timeline()`` / ``logger.async_timeline()`` attach a ``timeline``
+field to their START and END records::
+
+    {"event": "end", "id": 7, "parent": 3, "title": "db", "lane": "task:req-1",
+     "start_ns": 118220113, "end_ns": 118250542}
+
+``id``/``parent`` give the nesting (the parent is the enclosing block in the
+same context), ``lane`` the thread or asyncio task that ran it and the
+``*_ns`` fields a monotonic clock. :func:`collect_timeline` reads a JSON log
+or ``.fl`` session in one streaming pass: only blocks that are still open,
+the first ``limit`` blocks for the chart and a capped per-path summary are
+held in memory, so files with hundreds of thousands of events are fine.
+Older logs with only the ``Timeline [title] START/END`` text are still
+understood, paired per title and thread.
 """
 
 import sys
 import json
 import argparse
+import itertools
+import threading
+from contextvars import ContextVar
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Dict, Any, Optional
 
 try:
     from rich.console import Console
@@ -16,118 +34,280 @@ try:
 except ImportError:
     Console = None  # type: ignore
 
+_OTHER = "[other]"
 
-def generate_gantt(log_path: str) -> None:
-    path = Path(log_path)
-    if not path.exists():
-        print(f"Error: Log file {path} not found.")
-        return
+# ---------------------------------------------------------------------------
+# Emitting side
+# ---------------------------------------------------------------------------
 
-    if Console is None:
-        print("Rich is required for the timeline visualization (pip install rich)")
-        return
+_parent_block: ContextVar[int] = ContextVar("fast_logger_timeline", default=0)
+_block_ids = itertools.count(1)
 
-    console = Console()
 
-    # Store events: {title: {"start": ts, "end": ts}}
-    events: Dict[str, Dict[str, float]] = {}
+def current_lane() -> str:
+    """``task:<name>`` inside an asyncio task, otherwise ``thread:<name>``."""
+    if "asyncio" in sys.modules:
+        import asyncio
+
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is not None:
+            return f"task:{task.get_name()}"
+    return f"thread:{threading.current_thread().name}"
+
+
+class TimelineBlock:
+    """One ``timeline()`` block; becomes the parent of blocks opened inside it."""
+
+    __slots__ = ("id", "parent", "title", "lane", "start_ns", "end_ns", "_token")
+
+    def __init__(self, title: str, start_ns: int) -> None:
+        self.id = next(_block_ids)
+        self.parent = _parent_block.get()
+        self.title = title
+        self.lane = current_lane()
+        self.start_ns = start_ns
+        self.end_ns = 0
+        self._token = _parent_block.set(self.id)
+
+    def close(self, end_ns: int) -> None:
+        self.end_ns = end_ns
+        try:
+            _parent_block.reset(self._token)
+        except ValueError:  # closed from another context
+            _parent_block.set(self.parent)
+
+    def fields(self, event: str) -> Dict[str, Any]:
+        fields: Dict[str, Any] = {
+            "event": event,
+            "id": self.id,
+            "parent": self.parent,
+            "title": self.title,
+            "lane": self.lane,
+            "start_ns": self.start_ns,
+        }
+        if event == "end":
+            fields["end_ns"] = self.end_ns
+        return fields
+
+
+# ---------------------------------------------------------------------------
+# Reading side
+# ---------------------------------------------------------------------------
+
+
+class TimelineRow:
+    __slots__ = ("title", "path", "lane", "depth", "start_ns", "end_ns", "seq")
+
+    def __init__(
+        self, title: str, path: str, lane: str, depth: int, start_ns: int, seq: int
+    ) -> None:
+        self.title = title
+        self.path = path
+        self.lane = lane
+        self.depth = depth
+        self.start_ns = start_ns
+        self.end_ns = 0
+        self.seq = seq
+
+    @property
+    def duration_s(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+
+class TimelineData:
+    """Result of :func:`collect_timeline`."""
+
+    def __init__(self) -> None:
+        self.rows: list[TimelineRow] = []  # first ``limit`` blocks, start order
+        self.lanes: list[str] = []
+        self.paths: Dict[str, list[float]] = {}  # path -> [count, total_s, max_s]
+        self.blocks = 0
+        self.unfinished = 0
+
+    def record(self, row: TimelineRow, limit: int, max_paths: int) -> None:
+        self.blocks += 1
+        if row.seq < limit:
+            self.rows.append(row)
+            if row.lane not in self.lanes:
+                self.lanes.append(row.lane)
+        path = row.path
+        if path not in self.paths and len(self.paths) >= max_paths:
+            path = _OTHER
+        stats = self.paths.setdefault(path, [0, 0.0, 0.0])
+        duration = row.duration_s
+        stats[0] += 1
+        stats[1] += duration
+        if duration > stats[2]:
+            stats[2] = duration
 
+
+def _legacy_ns(ts: Any) -> Optional[int]:
     from datetime import datetime
 
-    with open(path, "r", encoding="utf-8") as f:
+    try:
+        return int(datetime.fromisoformat(str(ts)).timestamp() * 1e9)
+    except (ValueError, TypeError):
+        return None
+
+
+def collect_timeline(
+    log_path: str, limit: int = 200, max_paths: int = 1000
+) -> TimelineData:
+    """Pair START/END records from a JSON log in a single streaming pass."""
+    data = TimelineData()
+    open_blocks: Dict[Any, TimelineRow] = {}
+    legacy: Dict[tuple[str, str], list[TimelineRow]] = {}
+    seq = itertools.count()
+
+    with open(log_path, "r", encoding="utf-8") as f:
         for line in f:
-            if not line.strip():
+            # Cheap pre-filter: most lines are not timeline records.
+            if "Timeline [" not in line:
                 continue
             try:
-                data = json.loads(line)
-                msg = data.get("message", "")
-                if msg.startswith("Timeline [") and (
-                    "] START" in msg or "] END" in msg
-                ):
-                    ts_str = data.get("timestamp", "")
-                    try:
-                        dt = datetime.fromisoformat(ts_str)
-                        current_ts = dt.timestamp()
-                    except (ValueError, TypeError):
-                        continue
-
-                    # Parse title
-                    start_idx = msg.find("[") + 1
-                    end_idx = msg.find("]")
-                    title = msg[start_idx:end_idx]
-
-                    if title not in events:
-                        events[title] = {}
-
-                    if "] START" in msg:
-                        events[title]["start"] = current_ts
-                    elif "] END" in msg:
-                        events[title]["end"] = current_ts
-
+                record = json.loads(line)
             except json.JSONDecodeError:
                 continue
+            if not isinstance(record, dict):
+                continue
+            block = record.get("timeline")
+            if isinstance(block, dict):
+                key = (record.get("process"), block.get("id"))
+                if block.get("event") == "start":
+                    parent = open_blocks.get((key[0], block.get("parent")))
+                    title = str(block.get("title", ""))
+                    open_blocks[key] = TimelineRow(
+                        title,
+                        f"{parent.path} > {title}" if parent else title,
+                        str(block.get("lane", "")),
+                        parent.depth + 1 if parent else 0,
+                        int(block.get("start_ns", 0)),
+                        next(seq),
+                    )
+                    continue
+                row = open_blocks.pop(key, None)
+                if row is None:  # START fell outside the file
+                    title = str(block.get("title", ""))
+                    row = TimelineRow(
+                        title,
+                        title,
+                        str(block.get("lane", "")),
+                        0,
+                        int(block.get("start_ns", 0)),
+                        next(seq),
+                    )
+                row.end_ns = int(block.get("end_ns", row.start_ns))
+                data.record(row, limit, max_paths)
+                continue
 
-    valid_events = []
-    min_ts = float("inf")
-    max_ts = 0.0
+            # Plain "Timeline [title] START/END" lines from older versions.
+            msg = str(record.get("message", ""))
+            if not msg.startswith("Timeline ["):
+                continue
+            ts = _legacy_ns(record.get("timestamp", ""))
+            if ts is None:
+                continue
+            title = msg[len("Timeline [") : msg.find("]")]
+            lane = f"thread:{record.get('threadName', '')}"
+            stack = legacy.setdefault((lane, title), [])
+            if "] START" in msg:
+                depth = sum(len(s) for (ln, _), s in legacy.items() if ln == lane)
+                stack.append(TimelineRow(title, title, lane, depth, ts, next(seq)))
+            elif "] END" in msg and stack:
+                row = stack.pop()
+                row.end_ns = ts
+                data.record(row, limit, max_paths)
 
-    for title, times in events.items():
-        start = times.get("start")
-        end = times.get("end")
-        if start is not None and end is not None:
-            valid_events.append({"title": title, "start": start, "end": end})
-            min_ts = min(min_ts, start)
-            max_ts = max(max_ts, end)
+    data.unfinished = len(open_blocks) + sum(len(s) for s in legacy.values())
+    data.rows.sort(key=lambda r: r.seq)
+    return data
 
-    if not valid_events:
+
+def generate_gantt(log_path: str, limit: int = 200) -> None:
+    path = Path(log_path)
+    if not path.exists():
+        print(f"Error: Log file {path} not found.")
+        return
+
+    if Console is None:
+        print("Rich is required for the timeline visualization (pip install rich)")
+        return
+
+    console = Console()
+    data = collect_timeline(str(path), limit=limit)
+
+    if not data.rows:
         console.print("[yellow]No timeline events found in log.[/yellow]")
         return
 
-    total_duration = max_ts - min_ts
-    if total_duration == 0:
-        total_duration = 1.0  # prevent division by zero
+    min_ns = min(r.start_ns for r in data.rows)
+    max_ns = max(r.end_ns for r in data.rows)
+    total_duration = (max_ns - min_ns) or 1  # prevent division by zero
 
-    table = Table(title="Execution Timeline (Gantt)")
+    title = "Execution Timeline (Gantt)"
+    if data.blocks > len(data.rows):
+        title += f" — first {len(data.rows)} of {data.blocks} blocks"
+    table = Table(title=title)
+    multi_lane = len(data.lanes) > 1
+    if multi_lane:
+        table.add_column("Lane", style="magenta", no_wrap=True)
     table.add_column("Task", style="cyan", no_wrap=True)
     table.add_column("Duration (s)", justify="right", style="green")
     table.add_column("Timeline", width=50)
 
-    valid_events.sort(key=lambda x: float(str(x["start"])))
-
-    for ev in valid_events:
-        ev_title = str(ev["title"])
-        ev_start = float(str(ev["start"]))
-        ev_end = float(str(ev["end"]))
-
-        start_offset = ev_start - min_ts
-        duration = ev_end - ev_start
-
+    lane_order = {lane: i for i, lane in enumerate(data.lanes)}
+    total_chars = 40
+    for ev in sorted(data.rows, key=lambda r: (lane_order[r.lane], r.seq)):
         # Calculate percentage representation for the bar chart
-        start_pct = start_offset / total_duration
-        width_pct = duration / total_duration
-
-        # Create a visual bar using spaces and blocks
-        total_chars = 40
+        start_pct = (ev.start_ns - min_ns) / total_duration
+        width_pct = (ev.end_ns - ev.start_ns) / total_duration
         empty_prefix = int(start_pct * total_chars)
         bar_chars = max(1, int(width_pct * total_chars))
 
         bar_text = Text()
         bar_text.append(" " * empty_prefix)
-        bar_text.append("█" * bar_chars, style="blue")
+        bar_text.append("█" * bar_chars, style="blue" if ev.depth == 0 else "cyan")
 
-        table.add_row(ev_title, f"{duration:.3f}", bar_text)
+        cells = [ev.lane] if multi_lane else []
+        cells += ["  " * ev.depth + ev.title, f"{ev.duration_s:.3f}", bar_text]
+        table.add_row(*cells)
 
     console.print(table)
 
+    summary = Table(title="Timeline Summary")
+    summary.add_column("Block", style="cyan")
+    summary.add_column("Count", justify="right")
+    summary.add_column("Total (s)", justify="right", style="green")
+    summary.add_column("Mean (ms)", justify="right")
+    summary.add_column("Max (ms)", justify="right")
+    ranked = sorted(data.paths.items(), key=lambda kv: kv[1][1], reverse=True)
+    for block_path, (count, total, longest) in ranked[:limit]:
+        summary.add_row(
+            block_path,
+            f"{int(count)}",
+            f"{total:.3f}",
+            f"{total / count * 1000:.1f}",
+            f"{longest * 1000:.1f}",
+        )
+    console.print(summary)
+    if data.unfinished:
+        console.print(f"[yellow]{data.unfinished} block(s) never finished.[/yellow]")
+
 
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Generate a Gantt chart timeline from fast-logger JSON logs."
     )
     parser.add_argument("log_file", help="Path to the .log (JSON) file")
+    parser.add_argument(
+        "--limit", type=int, default=200, help="Blocks to draw (default: 200)"
+    )
     args = parser.parse_args()
 
-    generate_gantt(args.log_file)
+    generate_gantt(args.log_file, limit=args.limit)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,204 @@
+"""
+fast_logger.tracing
+~~~~~~~~~~~~~~~~~~~
+Call-site machinery behind :meth:`FastLogger.trace`.
+
+Each decorated function gets one :class:`TraceSite` holding its settings.
+Arguments are only rendered when a line is actually emitted, and then
+through :mod:`reprlib` so a large DataFrame or request body costs a bounded
+string instead of a full ``repr()``. When per-call lines are suppressed by
+sampling or a slow-call threshold, durations are recorded in the logger's
+:class:`~fast_logger.metrics.MetricsRegistry` instead. While a
+:class:`~fast_logger.flame.CallRecorder` is installed every call is also
+pushed onto its call-tree stack, whatever the level or sample rate.
+"""
+
+from __future__ import annotations
+
+import inspect
+import logging
+import random
+import reprlib
+import time
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from . import flame
+
+
+def make_repr(max_arg_len: int) -> reprlib.Repr:
+    """Build a :class:`reprlib.Repr` capping each rendered argument."""
+    r = reprlib.Repr()
+    r.maxstring = max_arg_len
+    r.maxother = max_arg_len
+    r.maxlong = max_arg_len
+    r.maxlist = r.maxtuple = r.maxset = r.maxfrozenset = r.maxdeque = 8
+    r.maxdict = 6
+    r.maxlevel = 3
+    return r
+
+
+class TraceSite:
+    """Settings for one ``@trace``-decorated function."""
+
+    __slots__ = (
+        "logger",
+        "name",
+        "level",
+        "levelno",
+        "sample_rate",
+        "slow_ms",
+        "metric",
+        "label",
+        "_repr",
+    )
+
+    def __init__(
+        self,
+        logger: Any,
+        name: str,
+        metric: str,
+        level: str,
+        sample_rate: float,
+        slow_ms: Optional[float],
+        max_arg_len: int,
+    ) -> None:
+        self.logger = logger
+        self.name = name
+        self.level = level.lower()
+        self.levelno = logging.getLevelName(level.upper())
+        if not isinstance(self.levelno, int):
+            self.levelno = logging.DEBUG
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        # Only aggregate when some calls go unlogged; the default keeps the
+        # historical one-line-in, one-line-out behaviour with no extra work.
+        self.metric: Optional[str] = (
+            metric if sample_rate < 1.0 or slow_ms is not None else None
+        )
+        self.label = metric  # frame name in call-tree flamegraphs
+        self._repr = make_repr(max_arg_len)
+
+    def render(self, args: tuple[Any, ...], kwargs: dict[str, Any]) -> str:
+        r = self._repr.repr
+        parts = [r(a) for a in args]
+        parts.extend(f"{k}={r(v)}" for k, v in kwargs.items())
+        return ", ".join(parts)
+
+    def enter(self, args: tuple[Any, ...], kwargs: dict[str, Any]) -> bool:
+        """Decide whether this call is logged and emit the entry line if so."""
+        inner = self.logger._logger
+        if inner is None or not inner.isEnabledFor(self.levelno):
+            return False
+        rate = self.sample_rate
+        if rate < 1.0 and (rate <= 0.0 or random.random() >= rate):
+            return False
+        if self.slow_ms is None:
+            self.logger._log(
+                self.level, f"Entering {self.name}({self.render(args, kwargs)})"
+            )
+        return True
+
+    def exit(
+        self,
+        sampled: bool,
+        elapsed_ms: float,
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        error: Optional[BaseException],
+        frame: Optional[flame.CallFrame] = None,
+    ) -> None:
+        if self.metric is not None:
+            self.logger.metrics.record(self.metric, elapsed_ms)
+        if not sampled:
+            return
+        suffix = f" raised {type(error).__name__}" if error is not None else ""
+        extra = {"call": frame.fields()} if frame is not None else {}
+        if self.slow_ms is None:
+            self.logger._log(
+                self.level,
+                f"Exiting {self.name} (Time: {elapsed_ms:.2f} ms){suffix}",
+                extra=extra,
+            )
+        elif elapsed_ms >= self.slow_ms:
+            self.logger._log(
+                self.level,
+                f"Slow call {self.name}({self.render(args, kwargs)}) "
+                f"(Time: {elapsed_ms:.2f} ms){suffix}",
+                extra=extra,
+            )
+
+
+def wrap(f: Callable[..., Any], site: TraceSite) -> Callable[..., Any]:
+    """Return a wrapper for ``f`` matching its kind (sync, coroutine, async gen)."""
+    perf_counter = time.perf_counter
+
+    if inspect.isasyncgenfunction(f):
+
+        @wraps(f)
+        async def agen_wrapper(*args: Any, **kwargs: Any) -> Any:
+            # Timed from first iteration to exhaustion, consumer time included.
+            sampled = site.enter(args, kwargs)
+            calls = flame._recorder
+            frame = calls.enter(site.label) if calls is not None else None
+            start = perf_counter()
+            error: Optional[BaseException] = None
+            try:
+                async for item in f(*args, **kwargs):
+                    yield item
+            except BaseException as exc:
+                error = exc
+                raise
+            finally:
+                elapsed = perf_counter() - start
+                if frame is not None:
+                    calls.exit(frame, elapsed)  # type: ignore[union-attr]
+                site.exit(sampled, elapsed * 1000, args, kwargs, error, frame)
+
+        return agen_wrapper
+
+    if inspect.iscoroutinefunction(f):
+
+        @wraps(f)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            sampled = site.enter(args, kwargs)
+            calls = flame._recorder
+            if not sampled and site.metric is None and calls is None:
+                return await f(*args, **kwargs)
+            frame = calls.enter(site.label) if calls is not None else None
+            start = perf_counter()
+            error: Optional[BaseException] = None
+            try:
+                return await f(*args, **kwargs)
+            except BaseException as exc:
+                error = exc
+                raise
+            finally:
+                elapsed = perf_counter() - start
+                if frame is not None:
+                    calls.exit(frame, elapsed)  # type: ignore[union-attr]
+                site.exit(sampled, elapsed * 1000, args, kwargs, error, frame)
+
+        return async_wrapper
+
+    @wraps(f)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        sampled = site.enter(args, kwargs)
+        calls = flame._recorder
+        if not sampled and site.metric is None and calls is None:
+            return f(*args, **kwargs)
+        frame = calls.enter(site.label) if calls is not None else None
+        start = perf_counter()
+        error: Optional[BaseException] = None
+        try:
+            return f(*args, **kwargs)
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            elapsed = perf_counter() - start
+            if frame is not None:
+                calls.exit(frame, elapsed)  # type: ignore[union-attr]
+            site.exit(sampled, elapsed * 1000, args, kwargs, error, frame)
+
+    return wrapper
@@ -0,0 +1,498 @@
+"""
+fast_logger.waterfall
+~~~~~~~~~~~~~~~~~~~~~
+Per-request waterfalls rebuilt from a JSON log, grouped by ``correlation_id``.
+
+:func:`analyze` streams the log once. Records that carry a correlation id
+(or access lines with a ``[id]`` prefix) are classified into operations:
+
+* ``sql``   — ``SQL … → Xms`` / ``Slow SQL Xms …`` (dbapi) and SQLAlchemy lines
+* ``redis`` — ``Redis <cmd> → Xms`` / ``… FAILED (Xms)``
+* ``http``  — outgoing ``requests`` calls (``Response: 200 (took Xms)``)
+* ``span``  — ``timeline()`` blocks (the structured ``timeline`` field)
+* ``code``  — ``@trace`` / ``timer()`` exits with a ``call`` field
+
+A request ends at its access record (WSGI, Django or FastAPI middleware),
+after which it is folded into the summary and dropped. Only open requests
+are held in memory, in least-recently-seen order: one that has been quiet
+for ``idle_s`` seconds of log time is closed as incomplete, and when more
+than ``max_open`` are still active the oldest is spilled to one of
+``partitions`` temporary files hashed by correlation id. Spilled requests
+are rebuilt one partition at a time after the pass, so a multi-GB log
+needs memory for ``max_open`` requests plus its largest partition.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import os
+import re
+import shutil
+import tempfile
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import IO, Any, Iterable, Optional
+
+CATEGORIES = ("sql", "redis", "http", "span", "code")
+IO_CATEGORIES = ("sql", "redis", "http")  # never nested in one another
+_OTHER = "[other]"
+
+_SQL = re.compile(r"^SQL (?P<label>.*) → (?P<ms>[\d.]+)ms rows=")
+_SLOW_SQL = re.compile(r"^Slow SQL (?P<ms>[\d.]+)ms .*?\| (?P<label>.*)$", re.S)
+_SQLALCHEMY = re.compile(r"^Query executed in (?P<ms>[\d.]+)ms")
+_REDIS = re.compile(
+    r"^Redis (?P<label>.*?) (?:→ (?P<ms>[\d.]+)ms|FAILED \((?P<fms>[\d.]+)ms\))"
+)
+_HTTP_REQUEST = re.compile(r"^Request: (?P<label>\S+ \S+)")
+_HTTP_RESPONSE = re.compile(r"^Response: (?P<status>\d+) \(took (?P<ms>[\d.]+)ms\)")
+_ACCESS = re.compile(
+    r"^\[(?P<id>[^\]]+)\] [→✗] (?P<method>\S+) (?P<path>\S+) "
+    r"(?:(?P<status>\d{3})|EXCEPTION .*?) \((?P<ms>[\d.]+)ms\)",
+    re.S,
+)
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(record: dict[str, Any]) -> Optional[tuple[Any, ...]]:
+    """Turn one JSON record into an event tuple, or ``None`` if unrelated.
+
+    Events are ``("op", ts, ms, category, label)``, ``("end", ts, ms,
+    method, path, status, db_queries, db_ms)`` for access records,
+    ``("http", ts, label)`` (an outgoing request whose response follows) or
+    ``("mark", ts)`` for any other record.
+    """
+    ts = _timestamp(record.get("timestamp"))
+    if ts is None:
+        return None
+    if "http_status" in record and "duration_ms" in record:
+        return (
+            "end",
+            ts,
+            float(record["duration_ms"]),
+            str(record.get("http_method", "")),
+            str(record.get("http_path", "")),
+            int(record["http_status"]),
+            int(record.get("db_queries", 0)),
+            float(record.get("db_time_ms", 0.0)),
+        )
+    call = record.get("call")
+    if isinstance(call, dict) and "stack" in call:
+        label = str(call["stack"]).rsplit(";", 1)[-1]
+        return ("op", ts, call.get("wall_us", 0) / 1000, "code", label)
+    block = record.get("timeline")
+    if isinstance(block, dict):
+        if block.get("event") != "end":
+            return ("mark", ts)
+        ms = (block.get("end_ns", 0) - block.get("start_ns", 0)) / 1e6
+        return ("op", ts, ms, "span", str(block.get("title", "")))
+
+    message = str(record.get("message", ""))
+    m = _ACCESS.match(message)
+    if m:
+        status = int(m["status"]) if m["status"] else 500
+        return ("end", ts, float(m["ms"]), m["method"], m["path"], status, 0, 0.0)
+    m = _SQL.match(message) or _SLOW_SQL.match(message)
+    if m:
+        return ("op", ts, float(m["ms"]), "sql", m["label"])
+    m = _SQLALCHEMY.match(message)
+    if m:
+        return ("op", ts, float(m["ms"]), "sql", "query")
+    m = _REDIS.match(message)
+    if m:
+        command = m["label"].split(" ", 1)[0].upper()
+        return ("op", ts, float(m["ms"] or m["fms"]), "redis", command)
+    m = _HTTP_REQUEST.match(message)
+    if m:
+        return ("http", ts, m["label"])
+    m = _HTTP_RESPONSE.match(message)
+    if m:
+        return ("op", ts, float(m["ms"]), "http", f"HTTP {m['status']}")
+    return ("mark", ts)
+
+
+def request_id(record: dict[str, Any]) -> Optional[str]:
+    cid = record.get("correlation_id")
+    if cid:
+        return str(cid)
+    message = record.get("message")
+    if isinstance(message, str) and message.startswith("["):
+        m = _ACCESS.match(message)
+        if m:
+            return m["id"]
+    return None
+
+
+class Op:
+    """One timed operation inside a request."""
+
+    __slots__ = ("start", "ms", "category", "label")
+
+    def __init__(self, start: float, ms: float, category: str, label: str) -> None:
+        self.start = start
+        self.ms = ms
+        self.category = category
+        self.label = label
+
+
+class RequestTrace:
+    """Everything seen so far for one correlation id."""
+
+    __slots__ = (
+        "cid",
+        "first",
+        "last",
+        "ms",
+        "method",
+        "path",
+        "status",
+        "complete",
+        "ops",
+        "dropped",
+        "totals",
+        "_pending_http",
+    )
+
+    def __init__(self, cid: str) -> None:
+        self.cid = cid
+        self.first = 0.0
+        self.last = 0.0
+        self.ms = 0.0
+        self.method = ""
+        self.path = ""
+        self.status = 0
+        self.complete = False
+        self.ops: list[Op] = []
+        self.dropped = 0
+        self.totals: dict[str, list[float]] = {}  # category -> [count, ms]
+        self._pending_http = ""
+
+    @property
+    def start(self) -> float:
+        if self.complete:
+            return min(self.first, self.last - self.ms / 1000)
+        return self.first
+
+    def apply(self, event: tuple[Any, ...], max_ops: int) -> None:
+        kind, ts = event[0], event[1]
+        if kind == "op":
+            ms, category, label = event[2], event[3], event[4]
+            if category == "http" and self._pending_http:
+                label = f"{self._pending_http} → {label[5:]}"
+                self._pending_http = ""
+            start = ts - ms / 1000
+            self._seen(start)
+            total = self.totals.setdefault(category, [0, 0.0])
+            total[0] += 1
+            total[1] += ms
+            if len(self.ops) < max_ops:
+                self.ops.append(Op(start, ms, category, label))
+            else:
+                self.dropped += 1
+        elif kind == "end":
+            self.ms, self.method, self.path, self.status = event[2:6]
+            self.complete = True
+            # Middlewares count every query even when query lines are sampled.
+            queries, db_ms = event[6], event[7]
+            sql = self.totals.get("sql")
+            if queries and (sql is None or sql[0] < queries):
+                self.totals["sql"] = [queries, max(db_ms, sql[1] if sql else 0.0)]
+        elif kind == "http":
+            self._pending_http = event[2]
+        self._seen(ts)
+
+    def _seen(self, ts: float) -> None:
+        if not self.first or ts < self.first:
+            self.first = ts
+        if ts > self.last:
+            self.last = ts
+
+    def finish(self) -> None:
+        """Settle the duration of a request that never logged an access line."""
+        if not self.complete:
+            self.ms = (self.last - self.first) * 1000
+
+    def events(self) -> Iterable[tuple[Any, ...]]:
+        """Events that rebuild this trace when applied to a fresh one."""
+        yield ("mark", self.first)
+        yield ("mark", self.last)
+        if self._pending_http:
+            yield ("http", self.last, self._pending_http)
+        counted: dict[str, list[float]] = {}
+        for op in self.ops:
+            yield ("op", op.start + op.ms / 1000, op.ms, op.category, op.label)
+            total = counted.setdefault(op.category, [0, 0.0])
+            total[0] += 1
+            total[1] += op.ms
+        for category, (count, ms) in self.totals.items():
+            seen = counted.get(category, [0, 0.0])
+            if count > seen[0]:
+                yield ("sum", self.first, category, count - seen[0], ms - seen[1])
+        if self.complete:
+            end = (self.last, self.ms, self.method, self.path, self.status, 0, 0.0)
+            yield ("end", *end)
+
+    def apply_sum(self, event: tuple[Any, ...]) -> None:
+        total = self.totals.setdefault(event[2], [0, 0.0])
+        total[0] += event[3]
+        total[1] += event[4]
+        self.dropped += int(event[3])
+
+
+class RequestsReport:
+    """Result of :func:`analyze`."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.incomplete = 0
+        self.spilled = 0
+        self.total_ms = 0.0
+        self.categories: dict[str, list[float]] = {}  # category -> [count, ms]
+        self.labels: dict[tuple[str, str], list[float]] = {}
+        self.slowest: list[RequestTrace] = []  # slowest first
+
+    @property
+    def unattributed_ms(self) -> float:
+        """Request time not spent in SQL, Redis or outgoing HTTP calls."""
+        io = sum(self.categories.get(c, (0, 0.0))[1] for c in IO_CATEGORIES)
+        return max(self.total_ms - io, 0.0)
+
+
+class _Collector:
+    def __init__(self, top: int, max_labels: int) -> None:
+        self.report = RequestsReport()
+        self.top = top
+        self.max_labels = max_labels
+        self._heap: list[tuple[float, int, RequestTrace]] = []
+        self._seq = itertools.count()
+
+    def add(self, trace: RequestTrace) -> None:
+        trace.finish()
+        report = self.report
+        report.requests += 1
+        if not trace.complete:
+            report.incomplete += 1
+        report.total_ms += trace.ms
+        for category, (count, ms) in trace.totals.items():
+            total = report.categories.setdefault(category, [0, 0.0])
+            total[0] += count
+            total[1] += ms
+        labels = report.labels
+        for op in trace.ops:
+            key = (op.category, op.label)
+            if key not in labels and len(labels) >= self.max_labels:
+                key = (op.category, _OTHER)
+            total = labels.setdefault(key, [0, 0.0])
+            total[0] += 1
+            total[1] += op.ms
+        item = (trace.ms, next(self._seq), trace)
+        if len(self._heap) < self.top:
+            heapq.heappush(self._heap, item)
+        elif self.top and item[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, item)
+
+    def result(self) -> RequestsReport:
+        self.report.slowest = [t for _, _, t in sorted(self._heap, reverse=True)]
+        return self.report
+
+
+class _Spill:
+    """Hash-partitioned temporary files for requests evicted while active."""
+
+    def __init__(self, partitions: int, directory: Optional[str]) -> None:
+        self.partitions = max(1, partitions)
+        self.root = tempfile.mkdtemp(prefix="fastlogger-requests-", dir=directory)
+        self.files: dict[int, IO[str]] = {}
+        self.ids: set[str] = set()
+
+    def write(self, cid: str, event: tuple[Any, ...]) -> None:
+        n = zlib.crc32(cid.encode("utf-8", "replace")) % self.partitions
+        f = self.files.get(n)
+        if f is None:
+            path = os.path.join(self.root, f"{n:04d}.jsonl")
+            f = self.files[n] = open(path, "w", encoding="utf-8")
+        f.write(json.dumps([cid, *event], ensure_ascii=False) + "\n")
+
+    def replay(self, collector: _Collector, max_ops: int) -> None:
+        for f in self.files.values():
+            f.close()
+        for n in sorted(self.files):
+            traces: dict[str, RequestTrace] = {}
+            path = os.path.join(self.root, f"{n:04d}.jsonl")
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    cid, *event = json.loads(line)
+                    trace = traces.get(cid)
+                    if trace is None:
+                        trace = traces[cid] = RequestTrace(cid)
+                    if event[0] == "sum":
+                        trace.apply_sum(tuple(event))
+                    else:
+                        trace.apply(tuple(event), max_ops)
+            for trace in traces.values():
+                collector.add(trace)
+            os.remove(path)
+
+    def close(self) -> None:
+        for f in self.files.values():
+            f.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def analyze(
+    lines: Iterable[str],
+    top: int = 10,
+    max_open: int = 10_000,
+    idle_s: float = 300.0,
+    max_ops: int = 500,
+    max_labels: int = 1000,
+    partitions: int = 64,
+    spill_dir: Optional[str] = None,
+) -> RequestsReport:
+    """Group JSON log ``lines`` by correlation id and summarise each request.
+
+    ``top`` slowest requests keep their first ``max_ops`` operations for the
+    waterfall; all others are reduced to per-category and per-label totals
+    (at most ``max_labels`` labels, the rest under ``[other]``).
+    """
+    collector = _Collector(top, max_labels)
+    open_requests: OrderedDict[str, RequestTrace] = OrderedDict()
+    spill: Optional[_Spill] = None
+    try:
+        for line in lines:
+            if '"timestamp"' not in line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            cid = request_id(record)
+            if cid is None:
+                continue
+            event = classify(record)
+            if event is None:
+                continue
+
+            if spill is not None and cid in spill.ids:
+                spill.write(cid, event)
+                continue
+            trace = open_requests.get(cid)
+            if trace is None:
+                trace = open_requests[cid] = RequestTrace(cid)
+            else:
+                open_requests.move_to_end(cid)
+            trace.apply(event, max_ops)
+            if trace.complete:
+                del open_requests[cid]
+                collector.add(trace)
+
+            now = event[1]
+            while open_requests:
+                oldest = next(iter(open_requests.values()))
+                if now - oldest.last < idle_s:
+                    break
+                del open_requests[oldest.cid]
+                collector.add(oldest)
+            while len(open_requests) > max_open:
+                _, evicted = open_requests.popitem(last=False)
+                if spill is None:
+                    spill = _Spill(partitions, spill_dir)
+                spill.ids.add(evicted.cid)
+                for spilled_event in evicted.events():
+                    spill.write(evicted.cid, spilled_event)
+
+        for trace in open_requests.values():
+            collector.add(trace)
+        if spill is not None:
+            collector.report.spilled = len(spill.ids)
+            spill.replay(collector, max_ops)
+    finally:
+        if spill is not None:
+            spill.close()
+    return collector.result()
+
+
+def analyze_file(path: str, **options: Any) -> RequestsReport:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return analyze(f, **options)
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+
+def _share(ms: float, total: float) -> str:
+    return f"{ms * 100 / total:5.1f}%" if total else "    -"
+
+
+def format_waterfall(trace: RequestTrace, width: int = 40) -> str:
+    """Text waterfall: one bar per operation, offset from the request start."""
+    start = trace.start
+    span_ms = max(trace.ms, (trace.last - start) * 1000, 0.001)
+    what = f"{trace.method} {trace.path} {trace.status}" if trace.complete else "?"
+    lines = [f"[{trace.cid}] {what} {trace.ms:.1f}ms"]
+    for op in sorted(trace.ops, key=lambda o: o.start):
+        offset = max((op.start - start) * 1000, 0.0)
+        lead = min(int(offset / span_ms * width), width - 1)
+        bar = max(1, min(int(op.ms / span_ms * width), width - lead))
+        lines.append(
+            f"  {offset:8.1f}ms {' ' * lead}{'█' * bar}{' ' * (width - lead - bar)}"
+            f" {op.ms:8.2f}ms  {op.category:<5} {op.label[:60]}"
+        )
+    if trace.dropped:
+        lines.append(f"  … {trace.dropped} more operations")
+    return "\n".join(lines)
+
+
+def format_report(report: RequestsReport, waterfalls: int = 3, labels: int = 10) -> str:
+    total = report.total_ms
+    lines = [
+        f"{report.requests} requests ({report.incomplete} without an access record"
+        f", {report.spilled} spilled), {total:.1f}ms total"
+    ]
+    if not report.requests:
+        return lines[0]
+
+    lines.append("\nTime by category (share of request time; other = not I/O):")
+    for category in CATEGORIES:
+        if category in report.categories:
+            count, ms = report.categories[category]
+            lines.append(
+                f"  {category:<8} {_share(ms, total)} {ms:12.1f}ms  {int(count)} ops"
+            )
+    unattributed = report.unattributed_ms
+    lines.append(f"  {'other':<8} {_share(unattributed, total)} {unattributed:12.1f}ms")
+
+    ranked = sorted(report.labels.items(), key=lambda kv: kv[1][1], reverse=True)
+    if ranked:
+        lines.append(f"\nTop {min(labels, len(ranked))} operations by total time:")
+        for (category, label), (count, ms) in ranked[:labels]:
+            lines.append(
+                f"  {ms:12.1f}ms  {int(count):6d}x  {category:<5} {label[:70]}"
+            )
+
+    lines.append(f"\nSlowest {len(report.slowest)} requests:")
+    for trace in report.slowest:
+        parts = " ".join(
+            f"{c}={int(trace.totals[c][0])}/{trace.totals[c][1]:.1f}ms"
+            for c in CATEGORIES
+            if c in trace.totals
+        )
+        what = f"{trace.method} {trace.path} {trace.status}" if trace.complete else "?"
+        lines.append(f"  {trace.ms:10.1f}ms  [{trace.cid}] {what}  {parts}")
+
+    for trace in report.slowest[:waterfalls]:
+        lines.append("")
+        lines.append(format_waterfall(trace))
+    return "\n".join(lines)
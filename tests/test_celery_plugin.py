@@ -0,0 +1,195 @@
+"""Tests for the Celery plugin using stand-ins for ``celery.signals``."""
+
+import sys
+import tempfile
+import time
+import types
+import unittest.mock as mock
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Iterator
+
+import pytest
+
+from fast_logger import FastLogger
+from fast_logger.plugins.celery import TaskMonitor, _reset_monitors_in_child
+
+
+class _Signal:
+    def __init__(self) -> None:
+        self.receivers: list[Callable[..., Any]] = []
+
+    def connect(self, func: Callable[..., Any], weak: bool = True) -> None:
+        self.receivers.append(func)
+
+    def send(self, **kwargs: Any) -> None:
+        for receiver in self.receivers:
+            receiver(**kwargs)
+
+
+@pytest.fixture
+def signals() -> Iterator[SimpleNamespace]:
+    sigs = SimpleNamespace(
+        **{
+            name: _Signal()
+            for name in (
+                "before_task_publish",
+                "task_prerun",
+                "task_postrun",
+                "task_failure",
+                "task_retry",
+                "task_revoked",
+            )
+        }
+    )
+    celery_mod = types.ModuleType("celery")
+    celery_mod.signals = sigs  # type: ignore[attr-defined]
+    with mock.patch.dict(sys.modules, {"celery": celery_mod, "celery.signals": sigs}):
+        yield sigs
+
+
+def make_logger() -> FastLogger:
+    return FastLogger("celery_test", base_path=tempfile.mkdtemp(), console_output=False)
+
+
+def read_log(logger: FastLogger) -> str:
+    return (Path(str(logger.base_path)) / "logs" / "celery_test.log").read_text()
+
+
+def _task(name: str, **request: Any) -> SimpleNamespace:
+    request.setdefault("retries", 0)
+    return SimpleNamespace(name=name, request=SimpleNamespace(**request))
+
+
+def test_task_lifecycle_feeds_histograms(signals: SimpleNamespace) -> None:
+    logger = make_logger()
+    monitor = logger.patch_celery(SimpleNamespace(), summary_interval_s=3600)
+    assert isinstance(monitor, TaskMonitor)
+
+    headers: dict[str, Any] = {}
+    signals.before_task_publish.send(headers=headers)
+    assert "fl_sent_at" in headers
+
+    task = _task("app.add", fl_sent_at=headers["fl_sent_at"] - 0.05)
+    signals.task_prerun.send(task_id="t1", task=task)
+    signals.task_postrun.send(task_id="t1", task=task, state="SUCCESS")
+
+    snap = monitor.snapshot()["app.add"]
+    assert snap["succeeded"] == 1
+    assert snap["runtime_ms"]["count"] == 1
+    assert snap["queue_wait_ms"]["p50"] >= 40.0
+    assert monitor.inflight == 0
+    # No per-task INFO lines any more
+    assert "app.add" not in read_log(logger)
+    logger.stop()
+
+
+def test_queue_wait_uses_eta(signals: SimpleNamespace) -> None:
+    logger = make_logger()
+    monitor = logger.patch_celery(SimpleNamespace())
+    eta = (datetime.now(timezone.utc) - timedelta(seconds=2)).isoformat()
+    task = _task("app.later", eta=eta)
+    signals.task_prerun.send(task_id="t1", task=task)
+    assert monitor.snapshot()["app.later"]["queue_wait_ms"]["p50"] >= 1900
+    logger.stop()
+
+
+def test_failures_and_retries(signals: SimpleNamespace) -> None:
+    logger = make_logger()
+    monitor = logger.patch_celery(SimpleNamespace())
+    task = _task("app.flaky", retries=2)
+    signals.task_prerun.send(task_id="t1", task=task)
+    signals.task_retry.send(
+        request=SimpleNamespace(id="t1"), reason="boom", sender=task
+    )
+    signals.task_failure.send(task_id="t1", exception=ValueError("bad"), sender=task)
+    signals.task_postrun.send(task_id="t1", task=task, state="FAILURE")
+
+    snap = monitor.snapshot()["app.flaky"]
+    assert (snap["failed"], snap["retried"], snap["succeeded"]) == (1, 1, 0)
+    assert snap["retries"]["max"] == 2
+    log = read_log(logger)
+    assert "Task Failed: app.flaky [t1] ValueError: bad" in log
+    assert "Task Retrying: app.flaky [t1]" in log
+    logger.stop()
+
+
+def test_inflight_state_is_bounded(signals: SimpleNamespace) -> None:
+    logger = make_logger()
+    monitor = logger.patch_celery(SimpleNamespace(), max_inflight=3, ttl_s=3600)
+    for i in range(10):
+        signals.task_prerun.send(task_id=f"t{i}", task=_task("app.lost"))
+    assert monitor.inflight == 3
+    assert monitor.expired == 7
+
+    signals.task_revoked.send(request=SimpleNamespace(id="t9"))
+    assert monitor.inflight == 2 and monitor.revoked == 1
+    logger.stop()
+
+
+def test_ttl_expiry() -> None:
+    logger = make_logger()
+    monitor = TaskMonitor(logger, ttl_s=0.0)
+    monitor.started("a", "app.x", None)
+    monitor.started("b", "app.x", None)
+    assert monitor.inflight == 1  # "a" aged out when "b" arrived
+    logger.stop()
+
+
+def test_periodic_summary(signals: SimpleNamespace) -> None:
+    logger = make_logger()
+    logger.patch_celery(SimpleNamespace(), summary_interval_s=0)
+    task = _task("app.add")
+    signals.task_prerun.send(task_id="t1", task=task)
+    signals.task_postrun.send(task_id="t1", task=task, state="SUCCESS")
+    log = read_log(logger)
+    assert "Celery tasks | inflight=0" in log
+    assert "app.add | ok=1 failed=0 retried=0 | run n=1" in log
+    logger.stop()
+
+
+def test_summary_timer_reports_revoked_without_finished_tasks(
+    signals: SimpleNamespace,
+) -> None:
+    logger = make_logger()
+    monitor = logger.patch_celery(SimpleNamespace(), summary_interval_s=0.05)
+    assert monitor.running
+    signals.task_prerun.send(task_id="t1", task=_task("app.slow"))
+    signals.task_revoked.send(request=SimpleNamespace(id="t1"))
+    deadline = time.monotonic() + 2
+    while "Celery tasks" not in read_log(logger) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert "Celery tasks | inflight=0 expired=0 revoked=1" in read_log(logger)
+    logger.stop()
+    assert not monitor.running
+
+
+def test_stop_emits_last_summary(signals: SimpleNamespace) -> None:
+    logger = make_logger()
+    logger.patch_celery(SimpleNamespace(), summary_interval_s=3600)
+    task = _task("app.add")
+    signals.task_prerun.send(task_id="t1", task=task)
+    signals.task_postrun.send(task_id="t1", task=task, state="SUCCESS")
+    assert "Celery tasks" not in read_log(logger)
+    logger.stop()
+    assert "app.add | ok=1" in read_log(logger)
+
+
+def test_fork_reset_clears_state() -> None:
+    logger = make_logger()
+    monitor = TaskMonitor(logger)
+    monitor.started("a", "app.x", None)
+    _reset_monitors_in_child()
+    assert monitor.inflight == 0
+    assert monitor.snapshot() == {}
+    logger.stop()
+
+
+def test_idempotent(signals: SimpleNamespace) -> None:
+    logger = make_logger()
+    app = SimpleNamespace()
+    assert logger.patch_celery(app) is not None
+    assert logger.patch_celery(app) is None
+    assert len(signals.task_prerun.receivers) == 1
+    logger.stop()
@@ -0,0 +1,249 @@
+"""Tests for carrying the logging context into executors and processes."""
+
+import asyncio
+import json
+import pickle
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextvars import copy_context
+from pathlib import Path
+from typing import Any
+
+from fast_logger import FastLogger
+from fast_logger.context import (
+    ContextExecutor,
+    LogContext,
+    contextualize,
+    current_fields,
+    current_scope,
+    initializer,
+    run_in_executor,
+    snapshot,
+)
+from fast_logger.fastapi import request_id_ctx_var
+
+
+def current_request_id() -> str:
+    return request_id_ctx_var.get()
+
+
+class TestLogContext:
+    def test_snapshot_is_compact_and_immutable(self) -> None:
+        def capture() -> LogContext:
+            assert not snapshot()
+            request_id_ctx_var.set("req-1")
+            return snapshot()
+
+        context = copy_context().run(capture)
+        assert context.items == (("request_id", "req-1"),)
+        assert pickle.loads(pickle.dumps(context)) == context
+        assert len(pickle.dumps(context)) < 100
+        try:
+            context.items = ()  # type: ignore[misc]
+        except AttributeError:
+            pass
+        else:
+            raise AssertionError("LogContext is mutable")
+
+        assert context.run(current_request_id) == "req-1"
+        assert request_id_ctx_var.get() == ""
+
+    def test_thread_pool_records_keep_correlation_id(self) -> None:
+        base = tempfile.mkdtemp()
+        logger = FastLogger(
+            "test_context", base_path=base, console_output=False, json_format=True
+        )
+
+        def work(i: int) -> str:
+            logger.info(f"work {i}")
+            return request_id_ctx_var.get()
+
+        def handle() -> list[str]:
+            request_id_ctx_var.set("req-2")
+            with ContextExecutor(ThreadPoolExecutor(2)) as pool:
+                return list(pool.map(work, range(4)))
+
+        assert copy_context().run(handle) == ["req-2"] * 4
+        log = Path(base) / "logs" / "test_context.log"
+        records = [json.loads(line) for line in log.read_text().splitlines()]
+        assert {r["correlation_id"] for r in records} == {"req-2"}
+
+    def test_run_in_executor_shim(self) -> None:
+        async def main() -> tuple[str, str]:
+            request_id_ctx_var.set("req-3")
+            loop = asyncio.get_running_loop()
+            with ThreadPoolExecutor(1) as pool:
+                threaded = await run_in_executor(pool, current_request_id)
+                plain = await loop.run_in_executor(pool, current_request_id)
+            return threaded, plain
+
+        assert asyncio.run(main()) == ("req-3", "")
+
+    def test_process_pool(self) -> None:
+        def handle() -> tuple[str, str]:
+            request_id_ctx_var.set("req-4")
+            with ContextExecutor(ProcessPoolExecutor(1)) as pool:
+                per_task = pool.submit(current_request_id).result()
+            with ProcessPoolExecutor(
+                1, initializer=initializer, initargs=(snapshot(),)
+            ) as pool:
+                per_worker = pool.submit(current_request_id).result()
+            return per_task, per_worker
+
+        assert copy_context().run(handle) == ("req-4", "req-4")
+
+
+class TestContextualize:
+    def make_logger(self, base: str, name: str, **kwargs: Any) -> FastLogger:
+        return FastLogger(name, base_path=base, console_output=False, **kwargs)
+
+    def test_scopes_nest_and_reach_every_logger(self) -> None:
+        base = tempfile.mkdtemp()
+        json_logger = self.make_logger(base, "ctx_json", json_format=True)
+        text_logger = self.make_logger(base, "ctx_text")
+
+        with json_logger.contextualize(user_id=42, tenant="acme"):
+            with contextualize(tenant="beta", step="charge") as scope:
+                json_logger.info("inner")
+                text_logger.info("inner")
+                json_logger.info("clash", extra={"user_id": 7})
+                assert scope.parent is not None and scope.fields == {
+                    "tenant": "beta",
+                    "step": "charge",
+                }
+            json_logger.info("outer")
+        json_logger.info("outside")
+        assert current_fields() == {}
+
+        lines = (Path(base) / "logs" / "ctx_json.log").read_text().splitlines()
+        records = [json.loads(line) for line in lines]
+        fields = [
+            {k: r.get(k) for k in ("user_id", "tenant", "step") if k in r}
+            for r in records
+        ]
+        assert fields == [
+            {"user_id": 42, "tenant": "beta", "step": "charge"},
+            {"user_id": 7, "tenant": "beta", "step": "charge"},
+            {"user_id": 42, "tenant": "acme"},
+            {},
+        ]
+        text = (Path(base) / "logs" / "ctx_text.log").read_text()
+        assert "  user_id=42\n  tenant=beta\n  step=charge" in text
+
+    def test_decorator_sync_async_and_executors(self) -> None:
+        @contextualize(job="sync")
+        def sync_job() -> dict[str, Any]:
+            return current_fields()
+
+        @contextualize(job="async")
+        async def async_job() -> dict[str, Any]:
+            await asyncio.sleep(0)
+            return current_fields()
+
+        assert sync_job() == {"job": "sync"}
+        assert asyncio.run(async_job()) == {"job": "async"}
+        assert current_scope() is None
+
+        with contextualize(batch=3):
+            context = snapshot()
+            with ContextExecutor(ProcessPoolExecutor(1)) as pool:
+                remote = pool.submit(current_fields).result()
+        assert remote == {"batch": 3}
+        scope = pickle.loads(pickle.dumps(context)).get("fast_logger_context")
+        assert scope.merged == {"batch": 3}
+
+    def test_shared_instance_across_threads_and_tasks(self) -> None:
+        scope = contextualize(job="shared")
+        barrier = threading.Barrier(2)
+
+        def worker() -> dict[str, Any]:
+            with scope:
+                barrier.wait()  # both threads are inside before either leaves
+                inside = current_fields()
+                barrier.wait()
+            return {"inside": inside, "after": current_fields()}
+
+        with ThreadPoolExecutor(2) as pool:
+            results = [f.result() for f in [pool.submit(worker) for _ in range(2)]]
+        assert results == [{"inside": {"job": "shared"}, "after": {}}] * 2
+
+        async def task(event: asyncio.Event) -> dict[str, Any]:
+            with scope:
+                await event.wait()
+            return current_fields()
+
+        async def main() -> list[dict[str, Any]]:
+            first, second = asyncio.Event(), asyncio.Event()
+            tasks = [asyncio.create_task(task(e)) for e in (first, second)]
+            await asyncio.sleep(0)
+            first.set()  # the first-entered task leaves first
+            await asyncio.sleep(0)
+            second.set()
+            return list(await asyncio.gather(*tasks))
+
+        assert asyncio.run(main()) == [{}, {}]
+        with scope:
+            with scope:
+                assert current_scope().parent.fields == {"job": "shared"}
+            assert current_fields() == {"job": "shared"}
+        assert current_scope() is None
+
+    def test_closed_scopes_leave_no_context_entries(self) -> None:
+        def run() -> tuple[int, int]:
+            before = len(copy_context())
+            for i in range(1000):
+                with contextualize(i=i):
+                    with contextualize(j=i):
+                        pass
+            return before, len(copy_context())
+
+        before, after = copy_context().run(run)
+        assert after == before
+
+    def test_scope_caches_serialised_fields(self) -> None:
+        with contextualize(a=1, b=object()) as outer:
+            with contextualize(c="x") as inner:
+                assert inner.merged is inner.merged
+                assert inner.text.splitlines()[0] == "  a=1"
+                fragment = inner.json_fragment
+                assert fragment is inner.json_fragment
+                assert json.loads("{" + fragment + "}")["c"] == "x"
+            assert outer.fields == {"a": 1, "b": outer.fields["b"]}
+
+
+class TestBoundFragments:
+    def test_bound_and_scope_fields_share_one_cached_node(self) -> None:
+        base = tempfile.mkdtemp()
+        logger = FastLogger(
+            "ctx_bound", base_path=base, console_output=False, json_format=True
+        )
+        bound = logger.bind(user="u1", tenant="acme")
+        assert bound._context_node() is bound._bound_node
+        assert logger._context_node() is None
+
+        with contextualize(tenant="beta", step="s1"):
+            node = bound._context_node()
+            assert node is not None and node is bound._context_node()
+            assert node.merged == {"tenant": "acme", "step": "s1", "user": "u1"}
+            bound.info("scoped")
+            bound.info("clash", extra={"user": "call", "step": "call"})
+        bound.info("plain", extra={"n": 1})
+
+        lines = (Path(base) / "logs" / "ctx_bound.log").read_text().splitlines()
+        records = [json.loads(line) for line in lines]
+        keys = ("user", "tenant", "step", "n")
+        assert [{k: r[k] for k in keys if k in r} for r in records] == [
+            {"user": "u1", "tenant": "acme", "step": "s1"},
+            {"user": "u1", "tenant": "acme", "step": "call"},
+            {"user": "u1", "tenant": "acme", "n": 1},
+        ]
+
+    def test_text_suffix_is_prebuilt(self, tmp_path: Path) -> None:
+        logger = FastLogger("ctx_bound_text", base_path=str(tmp_path))
+        bound = logger.bind(a=1, b="two")
+        node = bound._bound_node
+        assert node is not None and node.text == "  a=1\n  b=two"
+        bound.info("hello", extra={"c": 3})
+        text = (tmp_path / "logs" / "ctx_bound_text.log").read_text()
+        assert "hello\n\n  a=1\n  b=two\n  c=3\n" in text
@@ -0,0 +1,168 @@
+"""Tests for the generic DB-API 2.0 plugin, exercised with the stdlib sqlite3."""
+
+import sqlite3
+import tempfile
+import types
+from pathlib import Path
+
+from fast_logger import FastLogger
+from fast_logger.plugins.dbapi import InstrumentedCursor
+from fast_logger.plugins._stats import (
+    RequestStats,
+    StatementTable,
+    fingerprint_sql,
+    request_stats_ctx_var,
+)
+
+
+def make_logger(**kwargs: object) -> FastLogger:
+    tmpdir = tempfile.mkdtemp()
+    return FastLogger(
+        "dbapi_test", base_path=tmpdir, console_output=False, level="DEBUG", **kwargs
+    )
+
+
+def read_log(logger: FastLogger) -> str:
+    return (Path(str(logger.base_path)) / "logs" / "dbapi_test.log").read_text()
+
+
+class TestFingerprint:
+    def test_literals_collapse(self) -> None:
+        a = fingerprint_sql("SELECT * FROM users WHERE id = 42 AND name = 'bob'")
+        b = fingerprint_sql("SELECT *  FROM users\n WHERE id = 7 AND name = 'o''neil'")
+        assert a == b == "SELECT * FROM users WHERE id = ? AND name = ?"
+
+    def test_placeholder_lists_collapse(self) -> None:
+        assert fingerprint_sql("SELECT 1 FROM t WHERE id IN (?, ?, ?)") == (
+            "SELECT ? FROM t WHERE id IN (...)"
+        )
+        assert fingerprint_sql("SELECT * FROM t1 WHERE a = $1") == (
+            "SELECT * FROM t1 WHERE a = $1"
+        )
+
+
+class TestStatementTable:
+    def test_bounded_lru(self) -> None:
+        table = StatementTable(max_entries=2)
+        table.record("a", 1.0)
+        table.record("b", 1.0)
+        table.record("a", 1.0)
+        table.record("c", 1.0)  # evicts "b", the least recently used
+        keys = {row["statement"] for row in table.snapshot()}
+        assert keys == {"a", "c"}
+        assert table.evicted == 1
+
+
+class TestDBAPIPlugin:
+    def test_connection_is_timed_and_fingerprinted(self) -> None:
+        logger = make_logger()
+        conn = logger.patch_dbapi(sqlite3.connect(":memory:"))
+        conn.execute("CREATE TABLE t (id INTEGER, name TEXT)")
+        cur = conn.cursor()
+        cur.executemany("INSERT INTO t VALUES (?, ?)", [(1, "a"), (2, "b"), (3, "c")])
+        for i in range(3):
+            assert cur.execute("SELECT name FROM t WHERE id = ?", (i,)) is cur
+            cur.fetchall()
+
+        rows = {row["statement"]: row for row in conn.query_stats.snapshot()}
+        select = rows["SELECT name FROM t WHERE id = ?"]
+        assert select["count"] == 3
+        assert select["rows"] == 2  # ids 1 and 2 matched, 0 did not
+        assert rows["INSERT INTO t VALUES (...)"]["rows"] == 3
+        assert "SQL SELECT name FROM t WHERE id = ?" in read_log(logger)
+        logger.stop()
+
+    def test_iteration_counts_rows(self) -> None:
+        logger = make_logger()
+        conn = logger.patch_dbapi(sqlite3.connect(":memory:"), sample_rate=0.0)
+        assert [r for r in conn.execute("SELECT 1 UNION ALL SELECT 2")] == [(1,), (2,)]
+        assert conn.query_stats.snapshot()[0]["rows"] == 2
+        logger.stop()
+
+    def test_proxies_forward_attributes_and_keywords(self) -> None:
+        class PsycopgStyleCursor:
+            def __init__(self, cursor: sqlite3.Cursor) -> None:
+                self.cursor = cursor
+                self.rowcount = -1
+                self.prepared: object = None
+
+            def execute(
+                self, query: str, params: object = (), *, prepare: object = None
+            ) -> "PsycopgStyleCursor":
+                self.prepared = prepare
+                self.cursor.execute(query, params)  # type: ignore[arg-type]
+                return self
+
+            def fetchone(self) -> object:
+                return self.cursor.fetchone()
+
+        logger = make_logger()
+        conn = logger.patch_dbapi(sqlite3.connect(":memory:"), sample_rate=0.0)
+        conn.row_factory = sqlite3.Row
+        cur = conn.cursor()
+        cur.arraysize = 100
+        assert cur._cursor.arraysize == 100 and cur.arraysize == 100
+        assert cur.execute("SELECT ? AS x", (5,)).fetchone()["x"] == 5
+
+        wrapped = InstrumentedCursor(
+            PsycopgStyleCursor(sqlite3.connect(":memory:").cursor()), cur._inst
+        )
+        wrapped.execute("SELECT ?", params=(1,), prepare=True)
+        assert wrapped.prepared is True and wrapped.fetchone() == (1,)
+        logger.stop()
+
+    def test_errors_are_recorded(self) -> None:
+        logger = make_logger()
+        conn = logger.patch_dbapi(sqlite3.connect(":memory:"), sample_rate=0.0)
+        try:
+            conn.execute("SELECT * FROM missing_table")
+        except sqlite3.OperationalError:
+            pass
+        assert conn.query_stats.snapshot()[0]["errors"] == 1
+        logger.stop()
+
+    def test_slow_query_threshold_logs_warning(self) -> None:
+        logger = make_logger()
+        conn = logger.patch_dbapi(
+            sqlite3.connect(":memory:"), sample_rate=0.0, slow_query_ms=0.0
+        )
+        conn.execute("SELECT 1")
+        assert "Slow SQL" in read_log(logger)
+        logger.stop()
+
+    def test_sampling_suppresses_per_query_lines(self) -> None:
+        logger = make_logger()
+        conn = logger.patch_dbapi(sqlite3.connect(":memory:"), sample_rate=0.0)
+        conn.execute("SELECT 1")
+        assert "SQL SELECT" not in read_log(logger)
+        assert conn.query_stats.snapshot()[0]["count"] == 1
+        logger.stop()
+
+    def test_module_and_connect_function(self) -> None:
+        logger = make_logger()
+        fake_module = types.ModuleType("fake_driver")
+        fake_module.connect = sqlite3.connect  # type: ignore[attr-defined]
+        logger.use("dbapi", fake_module)
+        logger.use("dbapi", fake_module)  # idempotent
+        conn = fake_module.connect(":memory:")  # type: ignore[attr-defined]
+        conn.execute("SELECT 1")
+        assert len(fake_module.connect.query_stats) == 1  # type: ignore[attr-defined]
+
+        connect = logger.patch_dbapi(sqlite3.connect)
+        assert connect(":memory:").execute("SELECT 2").fetchone() == (2,)
+        logger.stop()
+
+    def test_request_level_summary(self) -> None:
+        logger = make_logger()
+        conn = logger.patch_dbapi(sqlite3.connect(":memory:"), sample_rate=0.0)
+        stats = RequestStats()
+        token = request_stats_ctx_var.set(stats)
+        try:
+            conn.execute("SELECT 1")
+            conn.execute("SELECT 2")
+        finally:
+            request_stats_ctx_var.reset(token)
+        assert stats.db_count == 2
+        assert stats.slowest_statement == "SELECT ?"
+        assert stats.summary().startswith(" db=2q/")
+        logger.stop()
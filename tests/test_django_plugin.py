@@ -0,0 +1,117 @@
+"""Tests for the Django plugin against an in-memory SQLite settings module."""
+
+import json
+import sys
+import tempfile
+import types
+import unittest.mock as mock
+from pathlib import Path
+
+import pytest
+
+from fast_logger import FastLogger
+
+
+def make_logger() -> FastLogger:
+    return FastLogger(
+        "django_test",
+        base_path=tempfile.mkdtemp(),
+        console_output=False,
+        json_format=True,
+    )
+
+
+def read_records(logger: FastLogger) -> list[dict]:
+    path = Path(str(logger.base_path)) / "logs" / "django_test.log"
+    return [json.loads(line) for line in path.read_text().splitlines() if line]
+
+
+def test_missing_django_warns() -> None:
+    logger = make_logger()
+    with mock.patch.dict(sys.modules, {"django": None, "django.conf": None}):
+        logger.use("django")
+    assert "'django' library not found" in read_records(logger)[-1]["message"]
+    logger.stop()
+
+
+@pytest.fixture(scope="module")
+def django_client():  # type: ignore[no-untyped-def]
+    django = pytest.importorskip("django")
+    from django.conf import settings
+
+    urls = types.ModuleType("fl_django_test_urls")
+    sys.modules[urls.__name__] = urls
+    if not settings.configured:
+        settings.configure(
+            DEBUG=False,
+            SECRET_KEY="test",
+            ALLOWED_HOSTS=["testserver"],
+            ROOT_URLCONF=urls.__name__,
+            DATABASES={
+                "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}
+            },
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+            },
+            MIDDLEWARE=[],
+            INSTALLED_APPS=[],
+        )
+    logger = make_logger()
+    logger.use("django", n_plus_one=5)  # must run before the handler is built
+    django.setup()
+
+    from django.core.cache import cache
+    from django.db import connection
+    from django.http import HttpResponse
+    from django.test import Client
+    from django.urls import path
+
+    def one_query(request):  # type: ignore[no-untyped-def]
+        with connection.cursor() as cur:
+            cur.execute("SELECT 1")
+        cache.set("k", 1)
+        cache.get("k")
+        cache.get("missing")
+        return HttpResponse("ok")
+
+    def n_plus_one(request):  # type: ignore[no-untyped-def]
+        with connection.cursor() as cur:
+            for i in range(6):
+                cur.execute("SELECT %s", [i])
+        return HttpResponse("ok")
+
+    urls.urlpatterns = [  # type: ignore[attr-defined]
+        path("one", one_query),
+        path("loop", n_plus_one),
+    ]
+    yield logger, Client()
+    logger.stop()
+
+
+def test_access_record_has_db_and_cache(django_client) -> None:  # type: ignore
+    logger, client = django_client
+    response = client.get("/one", HTTP_X_REQUEST_ID="dj-1")
+    assert response["X-Request-ID"] == "dj-1"
+    record = read_records(logger)[-1]
+    assert record["http_status"] == 200
+    assert record["db_queries"] == 1
+    assert record["db_slowest_statement"] == "SELECT ?"
+    assert (record["cache_hits"], record["cache_misses"]) == (1, 1)
+    assert record["correlation_id"] == "dj-1"
+
+
+def test_n_plus_one_is_flagged(django_client) -> None:  # type: ignore
+    logger, client = django_client
+    client.get("/loop")
+    record = read_records(logger)[-1]
+    assert record["level"] == "WARNING"
+    assert record["db_top_repeat_count"] == 6
+    assert "possible N+1: 6× SELECT %s" in record["message"]
+
+
+def test_query_stats_table(django_client) -> None:  # type: ignore
+    from fast_logger.plugins.django import query_stats
+
+    table = query_stats()
+    assert table is not None
+    assert any(row["statement"] == "SELECT %s" for row in table.snapshot())
@@ -0,0 +1,102 @@
+"""Tests for call-tree recording and flamegraph export."""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from fast_logger import FastLogger
+from fast_logger.flame import call_recorder, read_stacks, render_svg
+
+
+def make_logger(tmp_path: Path, level: str = "DEBUG") -> FastLogger:
+    return FastLogger(
+        "test_flame",
+        base_path=str(tmp_path),
+        console_output=False,
+        json_format=True,
+        level=level,
+    )
+
+
+class TestCallRecorder:
+    def test_self_time_per_stack(self, tmp_path: Path) -> None:
+        # DEBUG trace lines are off: calls are recorded without being logged.
+        logger = make_logger(tmp_path, level="INFO")
+        recorder = logger.record_calls()
+
+        @logger.trace
+        def leaf() -> None:
+            time.sleep(0.01)
+
+        @logger.trace
+        def outer() -> None:
+            leaf()
+            with logger.timer("block", aggregate=True):
+                time.sleep(0.01)
+
+        outer()
+        stacks = recorder.table.stacks()
+        prefix = f"{__name__}.TestCallRecorder.test_self_time_per_stack.<locals>."
+        root = prefix + "outer"
+        assert set(stacks) == {root, f"{root};{prefix}leaf", f"{root};block"}
+        assert stacks[f"{root};{prefix}leaf"] >= 9_000
+        assert stacks[root] < 5_000  # children's time is not self time
+        logger.stop()
+        assert call_recorder() is None
+        assert list((tmp_path / "logs").glob("test_flame.calls-*.collapsed"))
+
+    def test_async_tasks_keep_separate_stacks(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+        recorder = logger.record_calls()
+
+        @logger.trace
+        async def child(name: str) -> None:
+            with logger.timer(name):
+                await asyncio.sleep(0.001)
+
+        async def main() -> None:
+            await asyncio.gather(child("a"), child("b"))
+
+        asyncio.run(main())
+        labels = {s.split(";")[-1] for s in recorder.table.stacks()}
+        assert labels == {f"{child.__module__}.{child.__qualname__}", "a", "b"}
+        assert all(s.count(";") <= 1 for s in recorder.table.stacks())
+        logger.record_calls(enabled=False)
+        assert call_recorder() is None
+
+    def test_exit_lines_rebuild_the_graph(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+        recorder = logger.record_calls()
+
+        @logger.trace
+        def work() -> int:
+            with logger.timer("inner"):
+                return 1
+
+        for _ in range(3):
+            work()
+        expected = recorder.table.stacks()
+        logger.record_calls(enabled=False)
+        log_file = tmp_path / "logs" / "test_flame.log"
+        records = [json.loads(line) for line in open(log_file)]
+        assert sum("call" in r for r in records) == 6
+        with open(log_file) as f:
+            assert read_stacks(f) == expected
+
+    def test_svg_and_cli(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        svg = render_svg({"main;a<b>": 30, "main;c": 10, "main": 0}, title="t")
+        assert svg.startswith("<svg") and svg.rstrip().endswith("</svg>")
+        assert "a&lt;b&gt; (30 us, 75.00%)" in svg
+
+        collapsed = tmp_path / "in.collapsed"
+        collapsed.write_text("main;a 3\nmain;b 1\nnot a stack\n")
+        from fast_logger.cli import main
+
+        argv = ["fastlogger", "flame", str(collapsed), "--svg"]
+        monkeypatch.setattr(sys, "argv", argv)
+        main()
+        assert (tmp_path / "in.svg").read_text().count("<g>") == 4
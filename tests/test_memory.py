@@ -0,0 +1,99 @@
+"""Tests for tracemalloc-based @memprofile."""
+
+import asyncio
+import tracemalloc
+from pathlib import Path
+
+from fast_logger import FastLogger
+from fast_logger.memory import format_bytes, read_rss
+
+
+def make_logger(tmp_path: Path) -> FastLogger:
+    return FastLogger("test_memory", base_path=str(tmp_path), console_output=False)
+
+
+def read_log(tmp_path: Path) -> str:
+    return (tmp_path / "logs" / "test_memory.log").read_text()
+
+
+class TestMemProfile:
+    def test_reports_net_peak_and_lines(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+        kept: list[bytearray] = []
+
+        @logger.memprofile(top=3)
+        def leak() -> None:
+            kept.append(bytearray(2 * 1024 * 1024))
+            scratch = bytearray(4 * 1024 * 1024)
+            del scratch
+
+        leak()
+        content = read_log(tmp_path)
+        net = int(content.split("mem_net_bytes=")[1].split()[0])
+        peak = int(content.split("mem_peak_bytes=")[1].split()[0])
+        assert 2 * 1024 * 1024 <= net < 3 * 1024 * 1024
+        assert peak >= 6 * 1024 * 1024
+        assert "Memory profile for" in content
+        assert "test_memory.py:" in content
+        assert not tracemalloc.is_tracing()
+
+    def test_every_and_threshold(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+
+        @logger.memprofile(every=3, threshold_mb=1, top=0)
+        def small() -> list[int]:
+            return [0] * 10
+
+        for _ in range(7):
+            small()
+        assert small.memprofile.calls == 7  # type: ignore[attr-defined]
+        assert small.memprofile.sampled == 3  # type: ignore[attr-defined]
+        assert "Memory profile" not in read_log(tmp_path)
+
+    def test_leaves_existing_tracing_alone(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+
+        @logger.memprofile()
+        async def fetch() -> bytes:
+            await asyncio.sleep(0)
+            return bytes(1024 * 1024)
+
+        tracemalloc.start()
+        try:
+            asyncio.run(fetch())
+            assert tracemalloc.is_tracing()
+        finally:
+            tracemalloc.stop()
+        assert "Memory profile for TestMemProfile" in read_log(tmp_path)
+
+    def test_format_bytes(self) -> None:
+        assert format_bytes(512) == "512 B"
+        assert format_bytes(1536) == "1.5 KiB"
+        assert format_bytes(-3 * 1024 * 1024) == "-3.0 MiB"
+
+
+class TestHeapWatcher:
+    def test_logs_growing_sites_and_dumps(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+        leak: list[list[bytes]] = []
+        watcher = logger.watch_heap(interval=3600, top=3, rss_growth_mb=0.001)
+        try:
+            leak.append([bytes(1000) for _ in range(2000)])
+            record = watcher.check()
+        finally:
+            logger.stop()
+        assert not watcher.running
+        assert not tracemalloc.is_tracing()
+        top = record["heap_top_growth"][0]
+        assert top["site"].startswith("test_memory.py:")
+        assert top["size_diff"] >= 2_000_000
+        assert record["heap_growth_since_baseline_bytes"] >= 2_000_000
+        content = read_log(tmp_path)
+        assert "Heap watch: traced" in content
+        if watcher.baseline_rss is not None:  # /proc is Linux-only
+            assert watcher.dumps
+            assert "Growth since baseline" in Path(watcher.dumps[0]).read_text()
+
+    def test_read_rss(self) -> None:
+        rss = read_rss()
+        assert rss is None or rss > 0
@@ -0,0 +1,246 @@
+"""Tests for fast_logger.metrics."""
+
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+from fast_logger import FastLogger
+from fast_logger.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    bucket_bounds,
+    bucket_index,
+    format_summary,
+)
+
+
+class TestHistogram:
+    def test_bucket_bounds_contain_value(self) -> None:
+        for value in (1.0, 1.5, 7.3, 1000.0, 123456.789):
+            lower, upper = bucket_bounds(bucket_index(value))
+            assert lower <= value < upper
+
+    def test_percentiles_within_relative_error(self) -> None:
+        rng = random.Random(7)
+        values = sorted(rng.expovariate(1 / 20) for _ in range(20_000))
+        hist = Histogram()
+        for v in values:
+            hist.record(v)
+        for q in (50, 90, 99):
+            exact = values[int(len(values) * q / 100) - 1]
+            assert abs(hist.percentile(q) - exact) / exact < 0.05
+        assert hist.snapshot()["max"] == round(values[-1], 3)
+
+    def test_memory_is_bounded(self) -> None:
+        hist = Histogram()
+        for i in range(50_000):
+            hist.record(i * 0.37)
+        assert len(hist._buckets) < 400
+
+    def test_merge_and_reset(self) -> None:
+        a, b = Histogram(), Histogram()
+        a.record(1.0)
+        b.record(3.0)
+        a.merge(b)
+        assert a.count == 2 and a.max == 3.0 and a.min == 1.0
+        a.reset()
+        assert a.snapshot() == {"count": 0}
+        assert format_summary(a.snapshot()) == "n=0"
+
+    def test_count_resolution(self) -> None:
+        hist = Histogram(resolution=1)
+        for retries in (0, 0, 0, 3):
+            hist.record(retries)
+        assert hist.percentile(50) == 0.0
+        assert hist.percentile(100) == 3.0
+
+    def test_drain(self) -> None:
+        hist = Histogram()
+        hist.record(2.0)
+        drained = hist.drain()
+        assert drained.count == 1 and drained.max == 2.0
+        assert hist.count == 0
+
+
+class TestMetricsRegistry:
+    def test_threads_record_into_separate_shards(self) -> None:
+        registry = MetricsRegistry()
+
+        def worker() -> None:
+            for i in range(1000):
+                registry.record("op", i * 0.01)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        registry.record("op", 5.0)
+
+        snap = registry.snapshot()
+        assert snap["op"]["count"] == 4001
+        # Finished threads are folded into the retired shard.
+        assert len(registry._shards) == 1
+
+    def test_snapshot_reset_starts_new_window(self) -> None:
+        registry = MetricsRegistry()
+        registry.record("a", 1.0)
+        assert registry.snapshot(reset=True)["a"]["count"] == 1
+        assert registry.snapshot()["a"] == {"count": 0}
+
+    def test_periodic_summary(self) -> None:
+        base = tempfile.mkdtemp()
+        logger = FastLogger(
+            "test_metrics_summary",
+            base_path=base,
+            console_output=False,
+            metrics_interval_s=0.05,
+        )
+        log = Path(base) / "logs" / "test_metrics_summary.log"
+        for _ in range(2):
+            with logger.timer("db.load", aggregate=True):
+                pass
+        deadline = time.monotonic() + 2
+        while "Metrics (" not in log.read_text() and time.monotonic() < deadline:
+            time.sleep(0.01)  # no further record() is needed to emit
+        assert "db.load | n=2 p50=" in log.read_text()
+        assert logger.metrics.snapshot()["db.load"]["count"] == 0
+
+        logger.metrics.record("db.load", 1.0)
+        logger.stop()
+        assert "db.load | n=1 p50=" in log.read_text()
+        assert not logger.metrics.running
+
+    def test_finished_thread_shards_are_folded(self) -> None:
+        registry = MetricsRegistry()
+        for _ in range(50):
+            thread = threading.Thread(target=registry.record, args=("req", 1.0))
+            thread.start()
+            thread.join()
+        # Each new shard retires the previous thread's one.
+        assert len(registry._shards) <= 1
+        assert registry.snapshot()["req"]["count"] == 50
+
+    def test_no_summary_by_default(self) -> None:
+        base = tempfile.mkdtemp()
+        logger = FastLogger("test_metrics_quiet", base_path=base, console_output=False)
+        logger.metrics.record("db.load", 1.0)
+        logger.metrics.record("db.load", 2.0)
+        content = (Path(base) / "logs" / "test_metrics_quiet.log").read_text()
+        assert "Metrics (" not in content
+        assert logger.metrics.snapshot()["db.load"]["count"] == 2
+
+
+def test_timer_aggregate_does_not_log_per_block() -> None:
+    base = tempfile.mkdtemp()
+    logger = FastLogger("test_timer_aggregate", base_path=base, console_output=False)
+    for _ in range(10):
+        with logger.timer("render", aggregate=True):
+            pass
+    content = (Path(base) / "logs" / "test_timer_aggregate.log").read_text()
+    assert "render" not in content
+    assert logger.bind(user="x").metrics.snapshot()["render"]["count"] == 10
+
+
+class TestCountersAndExport:
+    def test_striped_counter_is_exact(self) -> None:
+        counter = Counter()
+
+        def worker() -> None:
+            for _ in range(10_000):
+                counter.inc()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert counter.value == 80_000
+
+    def test_gauge(self) -> None:
+        gauge = Gauge()
+        gauge.inc(5)
+        gauge.dec(2)
+        assert gauge.value == 3
+        gauge.set(10)
+        assert gauge.value == 10
+        assert Gauge(fn=lambda: 42).value == 42
+
+    def test_series_are_shared_and_typed(self) -> None:
+        registry = MetricsRegistry()
+        a = registry.counter("jobs_total", queue="q1")
+        assert registry.counter("jobs_total", queue="q1") is a
+        a.inc(3)
+        registry.gauge("depth", fn=lambda: 7)
+        snap = registry.snapshot()
+        assert snap['jobs_total{queue="q1"}'] == 3
+        assert snap["depth"] == 7
+        try:
+            registry.gauge("jobs_total")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("type clash not detected")
+
+    def test_prometheus_text(self) -> None:
+        registry = MetricsRegistry()
+        registry.counter("hits_total", "Cache hits.", cache='a"b').inc()
+        registry.record("db.load", 2.0)
+        registry.snapshot(reset=True)  # histogram totals survive windows
+        registry.record("db.load", 4.0)
+        text = registry.render_prometheus()
+        assert "# HELP hits_total Cache hits." in text
+        assert "# TYPE hits_total counter" in text
+        assert 'hits_total{cache="a\\"b"} 1' in text
+        assert "# TYPE fastlogger_timer_milliseconds summary" in text
+        assert 'fastlogger_timer_milliseconds_count{name="db.load"} 2' in text
+        assert 'fastlogger_timer_milliseconds_sum{name="db.load"} 6' in text
+
+    def test_http_endpoint(self) -> None:
+        registry = MetricsRegistry()
+        registry.counter("up").inc()
+        server = registry.serve(port=0)
+        try:
+            assert registry.serve() is server
+            port = server.server_address[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+                assert resp.headers["Content-Type"].startswith("text/plain")
+                assert "up 1" in resp.read().decode()
+        finally:
+            registry.stop_server()
+
+
+def test_records_are_counted_per_level() -> None:
+    logger = FastLogger(
+        "test_record_counts", base_path=tempfile.mkdtemp(), console_output=False
+    )
+    logger.info("a")
+    logger.bind(user="u").error("b")
+    logger.debug("filtered out by level")
+    snap = logger.metrics.snapshot()
+    series = 'fastlogger_records_total{{level="{}",logger="test_record_counts"}}'
+    assert snap[series.format("INFO")] >= 1
+    assert snap[series.format("ERROR")] == 1
+    assert not any('level="DEBUG"' in key for key in snap)
+
+
+def test_plugins_feed_the_registry() -> None:
+    logger = FastLogger(
+        "test_plugin_metrics", base_path=tempfile.mkdtemp(), console_output=False
+    )
+    conn = logger.patch_dbapi(sqlite3.connect(":memory:"), sample_rate=0.0)
+    conn.execute("SELECT 1")
+    try:
+        conn.execute("SELECT * FROM missing")
+    except sqlite3.OperationalError:
+        pass
+    snap = logger.metrics.snapshot()
+    assert snap['fastlogger_plugin_calls_total{plugin="dbapi"}'] == 2
+    assert snap['fastlogger_plugin_errors_total{plugin="dbapi"}'] == 1
+    assert snap["plugin.dbapi"]["count"] == 2
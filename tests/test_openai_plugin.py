@@ -0,0 +1,193 @@
+"""Tests for the OpenAI plugin using stubbed sync and async clients."""
+
+import asyncio
+import sys
+import tempfile
+import time
+import unittest.mock as mock
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Iterator
+
+import pytest
+
+from fast_logger import FastLogger
+from fast_logger.plugins.openai import (
+    UsageAggregator,
+    _aggregators,
+    _estimate_cost,
+    _resolve_rates,
+    usage_aggregator,
+)
+
+
+def make_logger() -> FastLogger:
+    return FastLogger("openai_test", base_path=tempfile.mkdtemp(), console_output=False)
+
+
+def read_log(logger: FastLogger) -> str:
+    return (Path(str(logger.base_path)) / "logs" / "openai_test.log").read_text()
+
+
+def _usage(prompt: int, completion: int) -> SimpleNamespace:
+    return SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion)
+
+
+def _chunk(content: str = "", usage: Any = None) -> SimpleNamespace:
+    delta = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=usage)
+
+
+class _Completions:
+    def create(self, **kwargs: Any) -> Any:
+        if kwargs.get("stream"):
+            return iter([_chunk("Hel"), _chunk("lo"), _chunk(usage=_usage(5, 2))])
+        return SimpleNamespace(usage=_usage(100, 50))
+
+
+class _AsyncCompletions:
+    async def create(self, **kwargs: Any) -> Any:
+        if kwargs.get("stream"):
+
+            async def gen() -> AsyncIterator[Any]:
+                for piece in ("a", "b", "c"):
+                    yield _chunk(piece)
+
+            return gen()
+        return SimpleNamespace(usage=_usage(10, 20))
+
+
+class OpenAI:
+    def __init__(self) -> None:
+        self.chat = SimpleNamespace(completions=_Completions())
+
+
+class AsyncOpenAI:
+    def __init__(self) -> None:
+        self.chat = SimpleNamespace(completions=_AsyncCompletions())
+
+
+class TestRateResolution:
+    def test_longest_prefix_wins(self) -> None:
+        assert _resolve_rates("gpt-4o-mini-2024-07-18") == (0.15, 0.60)
+        assert _resolve_rates("gpt-4o-2024-08-06") == (2.50, 10.00)
+        assert _resolve_rates("o1-mini") == (3.00, 12.00)
+
+    def test_resolution_is_cached(self) -> None:
+        _resolve_rates.cache_clear()
+        _estimate_cost("gpt-4", 1, 1)
+        _estimate_cost("gpt-4", 2, 2)
+        assert _resolve_rates.cache_info().hits >= 1
+
+
+class TestClientPatching:
+    def test_sync_client(self) -> None:
+        logger = make_logger()
+        client = OpenAI()
+        logger.patch_openai(client)
+        logger.patch_openai(client)  # idempotent
+        client.chat.completions.create(model="gpt-4o", messages=[])
+        assert "OpenAI gpt-4o | in=100 out=50 tokens" in read_log(logger)
+        assert usage_aggregator(logger).snapshot()["gpt-4o"]["calls"] == 1
+        logger.stop()
+
+    def test_sync_stream_reports_ttft_and_usage(self) -> None:
+        logger = make_logger()
+        client = OpenAI()
+        logger.patch_openai(client)
+        stream = client.chat.completions.create(model="gpt-4o-mini", stream=True)
+        assert len(list(stream)) == 3
+        log = read_log(logger)
+        assert "in=5 out=2 tokens" in log
+        assert "ttft=" in log and "tok/s" in log
+        logger.stop()
+
+    def test_async_client_and_stream(self) -> None:
+        logger = make_logger()
+        client = AsyncOpenAI()
+        logger.patch_openai(client, log_calls=False)
+
+        async def run() -> list[Any]:
+            await client.chat.completions.create(model="gpt-4", messages=[])
+            stream = await client.chat.completions.create(model="gpt-4", stream=True)
+            return [chunk async for chunk in stream]
+
+        assert len(asyncio.run(run())) == 3
+        snap = usage_aggregator(logger).snapshot()["gpt-4"]
+        assert snap["calls"] == 2
+        assert snap["input_tokens"] == 10
+        assert snap["output_tokens"] == 23  # 20 reported + 3 streamed deltas
+        assert "OpenAI gpt-4 |" not in read_log(logger)
+        logger.stop()
+
+    def test_failures_are_counted(self) -> None:
+        logger = make_logger()
+        client = OpenAI()
+
+        def boom(**kwargs: Any) -> Any:
+            raise RuntimeError("rate limited")
+
+        client.chat.completions.create = boom  # type: ignore[method-assign]
+        logger.patch_openai(client)
+        with pytest.raises(RuntimeError):
+            client.chat.completions.create(model="gpt-4o")
+        assert usage_aggregator(logger).snapshot()["gpt-4o"]["errors"] == 1
+        assert "FAILED" in read_log(logger)
+        logger.stop()
+
+
+def test_missing_library_leaves_no_aggregator() -> None:
+    logger = make_logger()
+    with mock.patch.dict(sys.modules, {"openai": None}):
+        logger.patch_openai()
+    assert logger not in _aggregators
+    assert "openai' library not found" in read_log(logger)
+    logger.stop()
+
+
+class TestUsageAggregator:
+    def test_window_rollover_emits_summary(self) -> None:
+        logger = make_logger()
+        agg = UsageAggregator(logger, window_s=0.0)
+        agg.record("gpt-4o", 1000, 500, 12.0)
+        log = read_log(logger)
+        assert "OpenAI usage" in log
+        assert "gpt-4o | calls=1 errors=0" in log
+        assert agg.snapshot() == {}
+        logger.stop()
+
+    def test_timer_and_stop_emit_idle_windows(self) -> None:
+        logger = make_logger()
+        agg = UsageAggregator(logger, window_s=0.05)
+        agg.start()
+        agg.record("gpt-4o", 10, 5, 1.0)
+        deadline = time.monotonic() + 2
+        while "OpenAI usage" not in read_log(logger) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert "gpt-4o | calls=1" in read_log(logger)
+        agg.stop()
+        assert not agg.running
+
+        client = OpenAI()
+        logger.patch_openai(client, window_s=3600, log_calls=False)
+        client.chat.completions.create(model="gpt-4", messages=[])
+        logger.stop()
+        assert "gpt-4 | calls=1" in read_log(logger)
+
+    def test_flush_without_calls_is_silent(self) -> None:
+        logger = make_logger()
+        UsageAggregator(logger).flush()
+        assert "OpenAI usage" not in read_log(logger)
+        logger.stop()
+
+
+def test_stream_proxy_is_iterator() -> None:
+    logger = make_logger()
+    client = OpenAI()
+    logger.patch_openai(client, log_calls=False)
+    stream: Iterator[Any] = client.chat.completions.create(model="x", stream=True)
+    next(stream)
+    with stream:  # type: ignore[attr-defined]
+        pass
+    assert usage_aggregator(logger).snapshot()["x"]["output_tokens"] == 1
+    logger.stop()
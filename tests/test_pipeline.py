@@ -0,0 +1,83 @@
+"""Tests for logging pipeline self-instrumentation."""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from fast_logger import FastLogger
+from fast_logger.cli import _parse_prometheus, cmd_stats
+
+
+def make_logger(name: str, **kwargs: object) -> FastLogger:
+    return FastLogger(
+        name, base_path=tempfile.mkdtemp(), console_output=False, **kwargs
+    )
+
+
+class TestPipelineInstrumentation:
+    def test_disabled_by_default(self) -> None:
+        logger = make_logger("test_pipeline_off")
+        handler = logger.get_logger().handlers[0]
+        assert "_log" not in logger.__dict__
+        assert "emit" not in handler.__dict__
+        assert logger.pipeline_stats()["sinks"] == {}
+
+    def test_counts_records_and_bytes_per_sink(self) -> None:
+        logger = make_logger("test_pipeline_sync")
+        logger.instrument_pipeline()
+        for i in range(20):
+            logger.info(f"message {i}")
+        stats = logger.pipeline_stats()
+        sink = stats["sinks"]["file:test_pipeline_sync.log"]
+        log_file = Path(logger.base_path or "") / "logs" / "test_pipeline_sync.log"
+        assert sink["records"] == 20
+        assert sink["bytes"] == log_file.stat().st_size
+        assert sink["emit_ms"]["count"] == 20
+        assert sink["flush_ms"]["count"] == 20
+        assert stats["preprocess_ms"]["count"] == 20
+
+    def test_disable_swaps_code_paths_back(self) -> None:
+        logger = make_logger("test_pipeline_toggle")
+        bound = logger.bind(user="u1")
+        logger.instrument_pipeline()
+        later = logger.bind(user="u2")
+        assert "_log" in bound.__dict__ and "_log" in later.__dict__
+        logger.instrument_pipeline(False)
+        handler = logger.get_logger().handlers[0]
+        for obj in (logger, bound, later):
+            assert "_log" not in obj.__dict__
+        assert not {"format", "emit", "flush"} & set(handler.__dict__)
+        bound.info("still works")
+
+    def test_queue_high_water(self) -> None:
+        logger = make_logger("test_pipeline_async", async_safe=True)
+        logger.instrument_pipeline()
+        for i in range(200):
+            logger.info(f"queued {i}")
+        time.sleep(0.2)
+        stats = logger.pipeline_stats()
+        logger.stop()
+        assert stats["queue"]["high_water"] >= 1
+        assert stats["sinks"]["queue"]["records"] == 200
+        assert stats["sinks"]["file:test_pipeline_async.log"]["records"] == 200
+
+
+def test_stats_live_renders_endpoint(capsys: object) -> None:
+    logger = make_logger("test_pipeline_live")
+    logger.instrument_pipeline()
+    logger.info("hello")
+    server = logger.metrics.serve(port=0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        samples = _parse_prometheus(logger.metrics.render_prometheus())
+        sink = ("sink", "file:test_pipeline_live.log")
+        assert samples[("fastlogger_sink_records_total", (sink,))] == 1
+        cmd_stats(
+            argparse.Namespace(live=True, url=url, interval=0.0, count=1, file=None)
+        )
+    finally:
+        logger.stop()
+    out = capsys.readouterr().out  # type: ignore[attr-defined]
+    assert "file:test_pipeline_live.log" in out
+    assert "preprocess p99" in out
@@ -165,3 +165,16 @@ class TestCorePatchMethods:
         result = logger.use("flask", FakeApp())
         assert result is logger  # fluent interface
         logger.stop()
+
+    def test_use_forwards_options(self) -> None:
+        from fast_logger.plugins.openai import usage_aggregator
+
+        from types import SimpleNamespace
+
+        logger = make_logger()
+        client = SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kw: None))
+        )
+        logger.use("openai", client=client, window_s=5.0, log_calls=False)
+        assert usage_aggregator(logger).window_s == 5.0
+        logger.stop()
@@ -0,0 +1,108 @@
+"""Tests for interpreter instrumentation (GC pauses, asyncio loop lag)."""
+
+import asyncio
+import gc
+import time
+from pathlib import Path
+
+from fast_logger import FastLogger
+from fast_logger.fastapi import request_id_ctx_var
+from fast_logger.runtime import GCInstrumentation
+
+
+def make_logger(tmp_path: Path) -> FastLogger:
+    return FastLogger("test_runtime", base_path=str(tmp_path), console_output=False)
+
+
+def read_log(tmp_path: Path) -> str:
+    return (tmp_path / "logs" / "test_runtime.log").read_text()
+
+
+class TestGCInstrumentation:
+    def test_full_collection_is_recorded_with_correlation_id(
+        self, tmp_path: Path
+    ) -> None:
+        logger = make_logger(tmp_path)
+        logger.instrument_gc(threshold_ms=0)
+        token = request_id_ctx_var.set("req-gc")
+        try:
+            gc.collect()
+        finally:
+            request_id_ctx_var.reset(token)
+        logger.sysinfo()
+        logger.instrument_gc(enabled=False)  # drains pending events
+        assert not any(
+            isinstance(getattr(cb, "__self__", None), GCInstrumentation)
+            for cb in gc.callbacks
+        )
+
+        snap = logger.metrics.snapshot()
+        assert snap["gc.pause.gen2"]["count"] >= 1
+        assert snap['fastlogger_gc_collections_total{generation="2"}'] >= 1
+        content = read_log(tmp_path)
+        assert "GC pause gen2" in content
+        assert "correlation_id=req-gc" in content
+        assert '"gen2": {' in content  # sysinfo section
+
+    def test_threshold_suppresses_short_pauses(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+        gc_hooks = logger.instrument_gc(threshold_ms=100)
+        try:
+            gc_hooks.observe(0, 1.5, collected=10, uncollectable=0)
+            gc_hooks.observe(2, 150.0, collected=5000, uncollectable=1)
+            stats = logger.gc_stats()
+        finally:
+            logger.stop()
+        assert logger.gc_stats() == {}
+        assert stats["gen2"]["uncollectable"] >= 1
+        content = read_log(tmp_path)
+        assert "GC pause gen0 1.5 ms" not in content
+        assert "GC pause gen2 150.0 ms (collected 5000, uncollectable 1)" in content
+
+
+def blocking_call() -> None:
+    time.sleep(0.25)
+
+
+class TestLoopMonitor:
+    def test_blocking_code_is_caught(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+
+        async def handler() -> None:
+            await asyncio.sleep(0)
+            blocking_call()
+
+        async def main() -> None:
+            logger.instrument_asyncio(
+                threshold_ms=50, interval_ms=10, slow_callbacks=True
+            )
+            await asyncio.sleep(0.03)
+            async with logger.async_timeline("request"):
+                await asyncio.create_task(handler(), name="req-7")
+            await asyncio.sleep(0.05)
+            logger.stop()
+
+        asyncio.run(main())
+        lag = logger.metrics.snapshot()["asyncio.lag"]
+        assert lag["count"] >= 3
+        assert lag["max"] >= 150
+        content = read_log(tmp_path)
+        assert "Event loop blocked for" in content
+        assert "in task req-7" in content
+        assert "in blocking_call" in content  # stack captured mid-stall
+        assert "Event loop lag" in content
+        assert "Slow asyncio callback" in content
+        end = content.split("Timeline [request] END (")[1].split(")")[0]
+        assert float(end.split("loop lag ")[1].rstrip("ms")) >= 150
+
+    def test_quiet_loop_logs_nothing(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+
+        async def main() -> None:
+            monitor = logger.instrument_asyncio(threshold_ms=200, interval_ms=5)
+            await asyncio.sleep(0.05)
+            logger.instrument_asyncio(enabled=False)
+            assert monitor.max_lag_ms < 200
+
+        asyncio.run(main())
+        assert "Event loop" not in read_log(tmp_path)
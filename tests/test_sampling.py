@@ -0,0 +1,138 @@
+"""Tests for stack sampling and @profile(mode="sampling")."""
+
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from fast_logger import FastLogger
+from fast_logger.sampling import OTHER, BackgroundSampler, StackTable, fold_stack
+
+
+def make_logger(name: str) -> FastLogger:
+    return FastLogger(name, base_path=tempfile.mkdtemp(), console_output=False)
+
+
+# Frame labels use co_qualname where it exists (3.11+) and co_name before.
+LOCALS = "<locals>." if sys.version_info >= (3, 11) else ""
+
+
+def busy(ms: float) -> int:
+    end = time.perf_counter() + ms / 1000
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+
+class TestStackTable:
+    def test_fold_stack_stops_at_code(self) -> None:
+        def outer() -> Optional[str]:
+            return inner()
+
+        def inner() -> Optional[str]:
+            return fold_stack(sys._getframe(), outer.__code__)
+
+        stack = outer()
+        assert stack is not None
+        frames = stack.split(";")
+        assert len(frames) == 2
+        assert frames[0].split(" ")[0].endswith(f"{LOCALS}outer")
+        assert frames[1].split(" ")[0].endswith(f"{LOCALS}inner")
+        assert fold_stack(sys._getframe(), busy.__code__) is None
+
+    def test_bounded_and_rendered(self) -> None:
+        table = StackTable(max_stacks=2)
+        table.add("main;a", 3)
+        table.add("main;b")
+        table.add("main;c")
+        assert len(table) == 3  # two stacks plus the overflow bucket
+        assert table.stacks()[OTHER] == 1
+        assert table.collapsed().splitlines()[0] == "main;a 3"
+        top = table.top(2)
+        assert top[0] == ("main;a".split(";")[-1], 3, 3)
+        assert "self%" in table.format_top()
+
+
+class TestSamplingProfile:
+    def test_aggregates_across_calls(self) -> None:
+        logger = make_logger("test_sampling_profile")
+
+        @logger.profile(mode="sampling", interval_ms=2, report_interval_s=None)
+        def handler() -> int:
+            return busy(40)
+
+        for _ in range(5):
+            handler()
+        profiler = handler.profiler  # type: ignore[attr-defined]
+        assert profiler.calls == 5
+        assert profiler.table.samples > 0
+        for line in profiler.collapsed().splitlines():
+            assert line.split(" ")[0].endswith(f"{LOCALS}handler")
+        profiler.emit()
+        log = Path(logger.base_path or "") / "logs" / "test_sampling_profile.log"
+        assert "Sampling profile for" in log.read_text()
+
+    def test_unknown_mode(self) -> None:
+        logger = make_logger("test_sampling_mode")
+        with pytest.raises(ValueError):
+            logger.profile(mode="tracing")
+
+
+class TestBackgroundSampler:
+    def test_writes_collapsed_file_and_report(self) -> None:
+        logger = make_logger("test_background_sampler")
+        logger.start_sampler(hz=200)
+        busy(300)
+        path = logger.stop_sampler()
+        assert path is not None and path.endswith(".collapsed")
+        assert "busy (test_sampling.py" in Path(path).read_text()
+        log = Path(logger.base_path or "") / "logs" / "test_background_sampler.log"
+        content = log.read_text()
+        assert "Sampler hotspots:" in content
+        assert path in content
+
+    def test_idle_threads_are_skipped(self) -> None:
+        logger = make_logger("test_sampler_idle")
+        ready, release = threading.Event(), threading.Event()
+
+        def parked() -> None:
+            ready.set()
+            release.wait()
+
+        thread = threading.Thread(target=parked)
+        thread.start()
+        ready.wait()
+        try:
+            quiet = BackgroundSampler(logger)
+            quiet.sample()
+            loud = BackgroundSampler(logger, include_idle=True)
+            loud.sample()
+        finally:
+            release.set()
+            thread.join()
+        assert not any("parked" in s for s in quiet.table.stacks())
+        assert any("parked" in s for s in loud.table.stacks())
+
+    @pytest.mark.skipif(not hasattr(signal, "SIGUSR2"), reason="POSIX only")
+    def test_signal_toggles(self) -> None:
+        logger = make_logger("test_sampler_signal")
+        previous = signal.getsignal(signal.SIGUSR2)
+        try:
+            sampler = logger.start_sampler(signum=signal.SIGUSR2, paused=True)
+            assert not sampler.running
+            os.kill(os.getpid(), signal.SIGUSR2)
+            time.sleep(0.05)
+            assert sampler.running
+            os.kill(os.getpid(), signal.SIGUSR2)
+            time.sleep(0.05)
+            assert not sampler.running
+        finally:
+            signal.signal(signal.SIGUSR2, previous)
+            logger.stop()
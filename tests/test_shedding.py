@@ -0,0 +1,119 @@
+"""Tests for adaptive load shedding."""
+
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from fast_logger import FastLogger
+from fast_logger.shedding import load_shedder
+
+
+class BlockingWriter:
+    def __init__(self) -> None:
+        self.release = threading.Event()
+        self.data = b""
+
+    def write(self, data: bytes) -> None:
+        self.release.wait(5)
+        self.data += data
+
+    def close(self) -> None:
+        pass
+
+
+def make_logger(tmp_path: Path, name: str, **kwargs: Any) -> FastLogger:
+    return FastLogger(
+        name,
+        base_path=str(tmp_path),
+        console_output=False,
+        level="DEBUG",
+        json_format=True,
+        sink_queue_size=100,
+        **kwargs,
+    )
+
+
+class TestLoadShedding:
+    def test_raises_and_recovers_with_hysteresis(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path, "shed_ladder")
+        writer = BlockingWriter()
+        sink = logger.add_sink("slow", writer)
+        shedder = logger.shed_load(interval=60, cooldown_s=1.0)
+        logger.debug("first")
+        time.sleep(0.05)  # the writer is now blocked
+        for i in range(60):
+            logger.debug(f"d{i}")
+
+        assert shedder.check(now=0.0) == logging.INFO
+        queued = sink.pending()
+        for i in range(100):
+            logger.debug(f"shed {i}")
+        assert sink.pending() == queued
+        assert shedder.check(now=0.1) == logging.WARNING
+        assert shedder.check(now=0.2) == logging.WARNING  # top of the ladder
+        logger.info("shed too")
+
+        writer.release.set()
+        assert sink.flush(timeout=2)
+        assert shedder.check(now=1.0) == logging.WARNING  # calm from here
+        assert shedder.check(now=1.5) == logging.WARNING
+        assert shedder.check(now=2.1) == logging.INFO
+        assert shedder.check(now=2.5) == logging.INFO  # each step waits again
+        assert shedder.check(now=3.2) == logging.DEBUG
+        logger.debug("back")
+        logger.stop()
+
+        records = [json.loads(line) for line in writer.data.splitlines()]
+        messages = [r["message"] for r in records]
+        assert "shed 0" not in messages and "shed too" not in messages
+        assert messages[-1] == "back"
+        changes = [
+            (r["shed_previous_level"], r["shed_level"], r["shed_reason"])
+            for r in records
+            if "shed_level" in r
+        ]
+        assert changes == [
+            ("DEBUG", "INFO", "behind"),
+            ("INFO", "WARNING", "behind"),
+            ("WARNING", "INFO", "recovered"),
+            ("INFO", "DEBUG", "recovered"),
+        ]
+        prometheus = logger.metrics.render_prometheus()
+        assert (
+            'fastlogger_level_changes_total{direction="up",logger="shed_ladder"} 2'
+            in prometheus
+        )
+
+    def test_stop_restores_level_and_needs_sinks(self, tmp_path: Path) -> None:
+        plain = make_logger(tmp_path, "shed_plain")
+        with pytest.raises(ValueError):
+            plain.shed_load()
+
+        logger = make_logger(tmp_path, "shed_stop", async_safe=True)
+        shedder = logger.shed_load(interval=60, high_lag_ms=0.0)
+        assert load_shedder("shed_stop") is shedder
+        logger.info("queued")
+        shedder.check()
+        assert logger.get_logger().level == logging.INFO
+        logger.stop()
+        assert load_shedder("shed_stop") is None
+        assert logger.get_logger().level == logging.DEBUG
+
+    def test_disabled_levels_skip_preparation(self, tmp_path: Path) -> None:
+        logger = FastLogger("shed_guard", base_path=str(tmp_path), console_output=False)
+        bound = logger.bind(user="u1")
+
+        def prepare(message: str, kwargs: dict[str, Any]) -> str:
+            raise AssertionError("disabled record was prepared")
+
+        for target in (logger, bound):
+            target._prepare = prepare  # type: ignore[method-assign]
+            target.debug("skipped", extra={"n": 1})
+        logger.instrument_pipeline()
+        bound.debug("skipped")
+        logger.instrument_pipeline(False)
@@ -0,0 +1,105 @@
+"""Tests for the built-in span tracer."""
+
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from fast_logger import FastLogger
+from fast_logger.spans import NOOP_SPAN, current_span
+
+
+def make_logger(tmp_path: Path, **tracing: float) -> FastLogger:
+    logger = FastLogger("test_spans", base_path=str(tmp_path), console_output=False)
+    logger.enable_tracing(**tracing)  # type: ignore[arg-type]
+    return logger
+
+
+class TestSpans:
+    def test_nesting_attributes_and_errors(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+        with logger.span("request", route="/users") as root:
+            assert current_span() is root
+            with pytest.raises(KeyError):
+                with logger.bind(user="u1").span("db") as child:
+                    child.set_attribute("rows", 3)
+                    raise KeyError("id")
+        assert current_span() is None
+
+        child, root = logger._tracer.spans()
+        assert child.trace_id == root.trace_id
+        assert child.parent_id == root.span_id
+        assert root.parent_id == 0
+        assert root.attributes == {"route": "/users"}
+        assert child.attributes["rows"] == 3
+        assert child.status.startswith("error: KeyError")
+        assert root.end_ns >= child.end_ns >= child.start_ns >= root.start_ns
+
+    def test_head_sampling_is_per_trace(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path, sample_rate=0.0)
+        with logger.span("root") as root:
+            with logger.span("child") as child:
+                assert child is NOOP_SPAN
+        assert root is NOOP_SPAN
+        assert current_span() is None
+        assert logger._tracer.spans() == []
+
+        logger.enable_tracing(sample_rate=0.5)
+        for _ in range(200):
+            with logger.span("root"):
+                with logger.span("child"):
+                    pass
+        spans = logger._tracer.spans()
+        assert 0 < len(spans) < 400
+        assert len(spans) % 2 == 0  # children always follow their root
+
+    def test_asyncio_tasks_inherit_parent(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+
+        async def work(i: int) -> None:
+            with logger.span("work", i=i):
+                await asyncio.sleep(0)
+
+        async def main() -> None:
+            with logger.span("batch"):
+                await asyncio.gather(*(work(i) for i in range(3)))
+
+        asyncio.run(main())
+        *children, root = logger._tracer.spans()
+        assert len(children) == 3
+        assert {c.parent_id for c in children} == {root.span_id}
+
+    def test_buffer_is_bounded(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path, capacity=5)
+        for i in range(8):
+            with logger.span(f"op{i}"):
+                pass
+        names = [s.name for s in logger._tracer.spans()]
+        assert names == [f"op{i}" for i in range(3, 8)]
+        assert logger._tracer.dropped == 3
+
+    def test_exports(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+        with logger.span("root", attempt=2, ok=True):
+            with logger.span("child"):
+                pass
+        spans = logger._tracer.spans()
+        chrome = json.loads(Path(logger.export_chrome_trace()).read_text())
+        events = chrome["traceEvents"]
+        assert [e["name"] for e in events] == ["child", "root"]
+        assert events[0]["ph"] == "X"
+        assert events[0]["args"]["parent_id"] == events[1]["args"]["span_id"]
+        assert logger._tracer.spans() == []  # export drains the buffer
+
+        logger._tracer.buffer.extend(spans)
+        otlp = json.loads(Path(logger.export_otlp_json()).read_text())
+        resource = otlp["resourceSpans"][0]
+        assert resource["resource"]["attributes"][0]["value"] == {
+            "stringValue": "test_spans"
+        }
+        child, root = resource["scopeSpans"][0]["spans"]
+        assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+        assert child["parentSpanId"] == root["spanId"]
+        assert {"key": "attempt", "value": {"intValue": "2"}} in root["attributes"]
+        assert {"key": "ok", "value": {"boolValue": True}} in root["attributes"]
@@ -0,0 +1,103 @@
+"""Tests for structured timeline events and the streaming collector."""
+
+import asyncio
+import json
+from pathlib import Path
+
+from fast_logger import FastLogger
+from fast_logger.timeline import collect_timeline
+
+
+def make_logger(tmp_path: Path) -> FastLogger:
+    return FastLogger(
+        "test_timeline", base_path=str(tmp_path), console_output=False, json_format=True
+    )
+
+
+def log_path(tmp_path: Path) -> str:
+    return str(tmp_path / "logs" / "test_timeline.log")
+
+
+class TestTimeline:
+    def test_records_carry_nesting_and_lane(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+        with logger.timeline("job"):
+            with logger.timeline("step"):
+                pass
+        records = [json.loads(line) for line in open(log_path(tmp_path))]
+        events = [r["timeline"] for r in records if "timeline" in r]
+        assert [(e["event"], e["title"]) for e in events] == [
+            ("start", "job"),
+            ("start", "step"),
+            ("end", "step"),
+            ("end", "job"),
+        ]
+        job, step = events[0], events[1]
+        assert step["parent"] == job["id"] and job["parent"] == 0
+        assert job["lane"] == "thread:MainThread"
+        assert events[3]["end_ns"] >= events[2]["end_ns"] >= step["start_ns"]
+        assert records[0]["message"] == "Timeline [job] START"
+
+    def test_text_output_omits_structured_fields(self, tmp_path: Path) -> None:
+        logger = FastLogger("timeline_text", base_path=str(tmp_path))
+        logger.add_sink("json", "timeline_text.jsonl", format="json")
+        with logger.bind(job="j1").timeline("job"):
+            pass
+        logger.stop()
+        text = (tmp_path / "logs" / "timeline_text.log").read_text()
+        assert "Timeline [job] START" in text and "job=j1" in text
+        assert "timeline=" not in text
+        sink = tmp_path / "logs" / "timeline_text.jsonl"
+        records = [json.loads(line) for line in open(sink)]
+        assert [r["timeline"]["event"] for r in records] == ["start", "end"]
+        assert records[0]["message"] == "Timeline [job] START"
+
+    def test_repeated_and_concurrent_blocks(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+
+        async def request(i: int) -> None:
+            async with logger.async_timeline("request"):
+                async with logger.async_timeline("db"):
+                    await asyncio.sleep(0.001 * i)
+
+        async def main() -> None:
+            await asyncio.gather(
+                *(asyncio.create_task(request(i), name=f"req-{i}") for i in range(3))
+            )
+
+        asyncio.run(main())
+        data = collect_timeline(log_path(tmp_path))
+        assert data.blocks == 6 and data.unfinished == 0
+        assert data.lanes == ["task:req-0", "task:req-1", "task:req-2"]
+        assert data.paths["request > db"][0] == 3
+        assert {r.depth for r in data.rows if r.title == "db"} == {1}
+
+    def test_bounded_rows_and_legacy_lines(self, tmp_path: Path) -> None:
+        path = tmp_path / "mixed.log"
+        with open(path, "w") as f:
+            for i in range(50):
+                for event in ("start", "end"):
+                    block = {
+                        "event": event,
+                        "id": i,
+                        "parent": 0,
+                        "title": "t",
+                        "lane": "thread:w",
+                        "start_ns": i * 1000,
+                        "end_ns": i * 1000 + 10,
+                    }
+                    message = f"Timeline [t] {event.upper()}"
+                    f.write(json.dumps({"message": message, "timeline": block}) + "\n")
+            for ts, message in (
+                ("2026-07-11T00:00:00", "Timeline [old] START"),
+                ("2026-07-11T00:00:01", "Timeline [old] START"),
+                ("2026-07-11T00:00:02", "Timeline [old] END"),
+                ("2026-07-11T00:00:04", "Timeline [old] END"),
+            ):
+                f.write(json.dumps({"timestamp": ts, "message": message}) + "\n")
+
+        data = collect_timeline(str(path), limit=10)
+        assert data.blocks == 52
+        assert len(data.rows) == 10
+        count, total, longest = data.paths["old"]
+        assert count == 2 and total == 5.0 and longest == 4.0
@@ -0,0 +1,126 @@
+"""Tests for the sampling-aware @trace decorator."""
+
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+
+from fast_logger import FastLogger
+
+
+def make_logger(tmp_path: Path, level: str = "DEBUG") -> FastLogger:
+    return FastLogger(
+        "test_tracing", level=level, base_path=str(tmp_path), console_output=False
+    )
+
+
+def read_log(tmp_path: Path) -> str:
+    return (tmp_path / "logs" / "test_tracing.log").read_text()
+
+
+class TestTrace:
+    def test_arguments_are_truncated(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+
+        @logger.trace(max_arg_len=20)
+        def handle(body: str, rows: list[int]) -> int:
+            return len(body)
+
+        handle("x" * 10_000, rows=list(range(1000)))
+        content = read_log(tmp_path)
+        assert "x" * 100 not in content
+        assert "..." in content
+        assert "rows=[0, 1, 2" in content
+
+    def test_disabled_level_skips_rendering(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path, level="INFO")
+
+        class Loud:
+            def __repr__(self) -> str:
+                raise AssertionError("repr should not be called")
+
+        @logger.trace()
+        def f(x: object) -> int:
+            return 1
+
+        assert f(Loud()) == 1
+        assert "Entering" not in read_log(tmp_path)
+
+    def test_coroutine_is_timed_when_awaited(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+
+        @logger.trace()
+        async def fetch(n: int) -> int:
+            await asyncio.sleep(0.02)
+            return n
+
+        assert asyncio.run(fetch(3)) == 3
+        content = read_log(tmp_path)
+        assert "Entering fetch(3)" in content
+        elapsed = float(content.split("Exiting fetch (Time: ")[1].split(" ms")[0])
+        assert elapsed >= 15
+
+    def test_async_generator(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+
+        @logger.trace()
+        async def numbers(n: int):  # type: ignore[no-untyped-def]
+            for i in range(n):
+                yield i
+
+        async def consume() -> list[int]:
+            return [i async for i in numbers(3)]
+
+        assert asyncio.run(consume()) == [0, 1, 2]
+        assert "Exiting numbers (Time:" in read_log(tmp_path)
+
+    def test_sampled_out_calls_feed_histogram(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+
+        @logger.trace(sample_rate=0.0)
+        def work() -> None:
+            pass
+
+        for _ in range(50):
+            work()
+        assert "Entering work" not in read_log(tmp_path)
+        stats = logger.trace_stats()
+        key = next(k for k in stats if k.endswith("work"))
+        assert stats[key]["count"] == 50
+
+    def test_slower_than_threshold(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+
+        @logger.trace(slower_than_ms=10)
+        def maybe_slow(delay: float) -> None:
+            time.sleep(delay)
+
+        maybe_slow(0)
+        maybe_slow(0.02)
+        content = read_log(tmp_path)
+        assert "Entering" not in content
+        assert "Slow call maybe_slow(0.02)" in content
+        assert "maybe_slow(0)" not in content
+
+    def test_exception_is_reported(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+
+        @logger.trace()
+        def boom() -> None:
+            raise ValueError("nope")
+
+        with pytest.raises(ValueError):
+            boom()
+        assert "raised ValueError" in read_log(tmp_path)
+
+    def test_bound_logger_shares_stats(self, tmp_path: Path) -> None:
+        logger = make_logger(tmp_path)
+        bound = logger.bind(user="u1")
+
+        @bound.trace(sample_rate=0.0)
+        def g() -> None:
+            pass
+
+        g()
+        assert any(k.endswith(".g") for k in logger.trace_stats())
@@ -0,0 +1,126 @@
+"""Tests for per-request waterfalls grouped by correlation id."""
+
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
+from wsgiref.util import setup_testing_defaults
+
+from fast_logger import FastLogger
+from fast_logger.waterfall import analyze, analyze_file, format_report
+
+EPOCH = datetime(2026, 7, 11, tzinfo=timezone.utc)
+
+
+def line(cid: str, t: float, message: str, **fields: Any) -> str:
+    stamp = (EPOCH + timedelta(seconds=t)).isoformat()
+    record = {"timestamp": stamp, "message": message, "correlation_id": cid}
+    return json.dumps({**record, **fields}) + "\n"
+
+
+def request_lines(cid: str, t0: float, slow_ms: float) -> list[str]:
+    return [
+        line(cid, t0 + 0.001, "SQL SELECT * FROM users WHERE id = ? → 1.00ms rows=1"),
+        line(cid, t0 + 0.002, "Redis GET session:1 → 0.5ms"),
+        line(cid, t0 + 0.003, "Request: GET https://api/x"),
+        line(cid, t0 + 0.003 + slow_ms / 1000, f"Response: 200 (took {slow_ms}ms)"),
+        line(
+            cid,
+            t0 + 0.004 + slow_ms / 1000,
+            f"[{cid}] → GET /x 200 ({4 + slow_ms:.1f}ms)",
+        ),
+    ]
+
+
+class TestWaterfall:
+    def test_groups_and_ranks_requests(self) -> None:
+        lines = request_lines("a", 1.0, 5.0) + request_lines("b", 2.0, 50.0)
+        lines.insert(2, line("", 1.5, "unrelated"))
+        report = analyze(lines, top=1)
+
+        assert report.requests == 2 and report.incomplete == 0
+        assert report.categories["sql"] == [2, 2.0]
+        assert report.categories["redis"] == [2, 1.0]
+        assert report.categories["http"] == [2, 55.0]
+        (slowest,) = report.slowest
+        assert (slowest.cid, slowest.path, slowest.status) == ("b", "/x", 200)
+        assert slowest.ms == 54.0
+        assert [op.category for op in slowest.ops] == ["sql", "redis", "http"]
+        assert slowest.ops[2].label == "GET https://api/x → 200"
+        assert report.labels[("redis", "GET")] == [2, 1.0]
+        assert "[b] GET /x 200 54.0ms" in format_report(report)
+
+    def test_spill_matches_in_memory(self) -> None:
+        # 40 concurrent requests whose records are fully interleaved.
+        per_request = [request_lines(f"r{i}", 1.0 + i * 0.0001, i) for i in range(40)]
+        lines = [rows[k] for k in range(5) for rows in per_request]
+        expected = analyze(lines, top=5)
+
+        spill_dir = tempfile.mkdtemp()
+        report = analyze(lines, top=5, max_open=4, partitions=3, spill_dir=spill_dir)
+        assert report.spilled == 36
+        assert report.requests == 40 and report.incomplete == 0
+        assert report.categories == expected.categories
+        assert [t.cid for t in report.slowest] == [t.cid for t in expected.slowest]
+        assert len(report.slowest[0].ops) == 3
+        assert os.listdir(spill_dir) == []
+
+    def test_idle_requests_close_as_incomplete(self) -> None:
+        lines = [
+            line("job", 1.0, "SQL SELECT 1 → 2.00ms rows=1"),
+            line("job", 3.0, "done"),
+            line(
+                "web",
+                400.0,
+                "[web] → GET / 200 (9.0ms)",
+                http_method="GET",
+                http_path="/",
+                http_status=200,
+                duration_ms=9.0,
+                db_queries=4,
+                db_time_ms=6.5,
+            ),
+        ]
+        report = analyze(lines, idle_s=60)
+        assert report.requests == 2 and report.incomplete == 1
+        job = next(t for t in report.slowest if t.cid == "job")
+        assert not job.complete and round(job.ms) == 2002
+        web = next(t for t in report.slowest if t.cid == "web")
+        assert web.totals["sql"] == [4, 6.5]  # from the access record
+
+    def test_wsgi_log_end_to_end(self) -> None:
+        base = tempfile.mkdtemp()
+        logger = FastLogger(
+            "waterfall",
+            base_path=base,
+            console_output=False,
+            json_format=True,
+            level="DEBUG",
+        )
+        db = logger.patch_dbapi(sqlite3)
+        conn = db.connect(":memory:")
+
+        def app(environ: dict, start_response: Callable[..., Any]) -> list[bytes]:
+            for _ in range(int(environ["PATH_INFO"][1:])):
+                conn.execute("SELECT 1")
+            time.sleep(0.002)
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return [b"ok"]
+
+        wsgi = logger.patch_wsgi(app)
+        for n in (1, 3, 2):
+            environ: dict[str, Any] = {"PATH_INFO": f"/{n}"}
+            setup_testing_defaults(environ)
+            body = wsgi(environ, lambda *a: None)
+            b"".join(body)
+            body.close()
+        logger.stop()
+
+        report = analyze_file(str(Path(base) / "logs" / "waterfall.log"))
+        assert report.requests == 3 and report.incomplete == 0
+        assert report.categories["sql"][0] == 6
+        assert report.slowest[0].method == "GET"
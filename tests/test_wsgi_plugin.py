@@ -0,0 +1,119 @@
+"""Tests for the WSGI access-log middleware, driven by a local WSGI client."""
+
+import json
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+from fast_logger import FastLogger
+from fast_logger.fastapi import request_id_ctx_var
+from fast_logger.plugins._stats import request_stats_ctx_var
+from fast_logger.plugins.wsgi import FastLoggerWSGIMiddleware
+
+
+def make_logger(**kwargs: Any) -> FastLogger:
+    return FastLogger(
+        "wsgi_test", base_path=tempfile.mkdtemp(), console_output=False, **kwargs
+    )
+
+
+def read_log(logger: FastLogger) -> str:
+    return (Path(str(logger.base_path)) / "logs" / "wsgi_test.log").read_text()
+
+
+def call(app: Callable[..., Any], **environ: Any) -> tuple[str, dict[str, str], bytes]:
+    setup_testing_defaults(environ)
+    captured: dict[str, Any] = {}
+
+    def start_response(status: str, headers: list, exc_info: Optional[Any] = None):
+        captured["status"], captured["headers"] = status, dict(headers)
+
+    body = app(environ, start_response)
+    try:
+        data = b"".join(body)
+    finally:
+        if hasattr(body, "close"):
+            body.close()
+    return captured["status"], captured["headers"], data
+
+
+def hello_app(environ: dict, start_response: Callable[..., Any]) -> list[bytes]:
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"hello"]
+
+
+def test_access_record_and_correlation_header() -> None:
+    logger = make_logger(json_format=True)
+    app = logger.patch_wsgi(hello_app)
+    status, headers, body = call(app, PATH_INFO="/hi", HTTP_X_REQUEST_ID="req-7")
+
+    assert (status, body) == ("200 OK", b"hello")
+    assert headers["X-Request-ID"] == "req-7"
+    record = json.loads(read_log(logger).strip().splitlines()[-1])
+    assert record["http_status"] == 200
+    assert record["http_path"] == "/hi"
+    assert record["response_bytes"] == 5
+    assert record["correlation_id"] == "req-7"
+    assert request_id_ctx_var.get() == ""  # reset after the response closed
+    assert request_stats_ctx_var.get() is None
+    logger.stop()
+
+
+def test_streamed_body_is_timed_and_sees_correlation_id() -> None:
+    logger = make_logger(json_format=True)
+    seen: list[str] = []
+
+    def streaming_app(
+        environ: dict, start_response: Callable[..., Any]
+    ) -> Iterator[bytes]:
+        start_response("200 OK", [])
+        for part in (b"a", b"bb", b"ccc"):
+            seen.append(request_id_ctx_var.get())
+            yield part
+
+    app = logger.patch_wsgi(streaming_app)
+    _, headers, body = call(app)
+    assert body == b"abbccc"
+    assert seen == [headers["X-Request-ID"]] * 3
+    record = json.loads(read_log(logger).strip().splitlines()[-1])
+    assert record["response_bytes"] == 6
+    logger.stop()
+
+
+def test_2xx_sampling_keeps_errors() -> None:
+    logger = make_logger()
+
+    def not_found(environ: dict, start_response: Callable[..., Any]) -> list[bytes]:
+        start_response("404 Not Found", [])
+        return [b""]
+
+    call(logger.patch_wsgi(hello_app, sample_2xx=0.0), PATH_INFO="/ok")
+    call(logger.patch_wsgi(not_found, sample_2xx=0.0), PATH_INFO="/missing")
+    log = read_log(logger)
+    assert "/ok" not in log
+    assert "GET /missing 404" in log and "WARNING" in log
+    logger.stop()
+
+
+def test_exceptions_are_logged_and_reraised() -> None:
+    logger = make_logger()
+
+    def broken(environ: dict, start_response: Callable[..., Any]) -> list[bytes]:
+        raise RuntimeError("kaboom")
+
+    with pytest.raises(RuntimeError):
+        call(logger.patch_wsgi(broken))
+    assert "EXCEPTION RuntimeError: kaboom" in read_log(logger)
+    assert request_id_ctx_var.get() == ""
+    logger.stop()
+
+
+def test_idempotent_wrapping() -> None:
+    logger = make_logger()
+    app = logger.patch_wsgi(hello_app)
+    assert isinstance(app, FastLoggerWSGIMiddleware)
+    assert logger.patch_wsgi(app) is app
+    logger.stop()